@@ -0,0 +1,112 @@
+"""
+Per-request overhead of the SUTRA middleware, measured in-process.
+
+Calls the ASGI stack directly (no sockets, no HTTP client) so the numbers
+are the middleware's own cost. Compares a bare app, the same app wrapped
+in a no-op Starlette BaseHTTPMiddleware (the floor SUTRA used to pay
+before any of its own checks), the app wrapped in SUTRAMiddleware, and
+SUTRA rejecting a flood from one client with 429s.
+
+    python benchmarks/sutra_middleware.py [requests]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import statistics
+import sys
+import time
+
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from samma.sutra.config import SUTRASettings
+from samma.sutra.middleware import SUTRAMiddleware
+
+
+async def app(scope, receive, send):
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"text/plain")],
+    })
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+class NoOpMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        return await call_next(request)
+
+
+def make_scope(i: int, flood: bool = False) -> dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/test",
+        "raw_path": b"/api/test",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"testserver"),
+            (b"x-agent-id", b"agent-%d" % (i % 100)),
+        ],
+        "client": ("10.9.9.9" if flood else f"10.0.{i % 250}.{i % 200}", 50000),
+        "server": ("testserver", 80),
+    }
+
+
+async def measure(asgi, requests: int, flood: bool = False) -> list[float]:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    timings = []
+    for i in range(requests):
+        scope = make_scope(i, flood)
+        start = time.perf_counter()
+        await asgi(scope, receive, send)
+        timings.append((time.perf_counter() - start) * 1e6)
+    return timings
+
+
+def report(name: str, timings: list[float], baseline: list[float] | None) -> None:
+    timings = sorted(timings)
+    p50 = statistics.median(timings)
+    p99 = timings[int(len(timings) * 0.99)]
+    line = f"{name:<28} p50 {p50:7.1f}us  p99 {p99:7.1f}us"
+    if baseline is not None:
+        base = sorted(baseline)
+        line += f"  overhead p50 {p50 - statistics.median(base):6.1f}us"
+        line += f"  p99 {p99 - base[int(len(base) * 0.99)]:6.1f}us"
+    print(line)
+
+
+async def main(requests: int) -> None:
+    settings = SUTRASettings(
+        rate_limit_per_ip=10**9,
+        rate_limit_per_agent=10**9,
+        tls_warn=False,
+        log_requests=False,
+    )
+    stacks = {
+        "bare app": app,
+        "BaseHTTPMiddleware no-op": NoOpMiddleware(app),
+        "SUTRAMiddleware": SUTRAMiddleware(app, settings=settings),
+    }
+    for asgi in stacks.values():
+        await measure(asgi, min(requests, 1000))  # warm up
+    baseline = await measure(app, requests)
+    report("bare app", baseline, None)
+    for name, asgi in list(stacks.items())[1:]:
+        report(name, await measure(asgi, requests), baseline)
+    rejecting = SUTRAMiddleware(app, settings=settings.model_copy(update={"rate_limit_per_ip": 1}))
+    await measure(rejecting, min(requests, 1000), flood=True)
+    report("SUTRAMiddleware 429 flood", await measure(rejecting, requests, flood=True), baseline)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000))
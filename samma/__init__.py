@@ -14,6 +14,7 @@ Layers:
 
 from samma._version import __version__
 from samma.exceptions import SammaError
+from samma.identity import RequestIdentity, configure_identity_headers, get_identity
 from samma.types import AgentIdentity, LayerStatus, SecurityEvent
 
 # SUTRA (Layer 1)
@@ -35,6 +36,9 @@ __all__ = [
     "__version__",
     "SammaError",
     "AgentIdentity",
+    "RequestIdentity",
+    "configure_identity_headers",
+    "get_identity",
     "LayerStatus",
     "SecurityEvent",
     "SUTRASettings",
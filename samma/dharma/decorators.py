@@ -6,8 +6,9 @@ import functools
 from typing import Callable
 
 from samma.dharma.permissions import Permission
-from samma.dharma.dependencies import _policy_engine, _agent_header, _agent_type_header
+from samma.dharma.dependencies import get_policy_engine
 from samma.exceptions import PermissionDeniedError
+from samma.identity import get_identity
 
 
 def dharma_protected(*permissions: Permission) -> Callable:
@@ -31,17 +32,17 @@ def dharma_protected(*permissions: Permission) -> Callable:
             request = kwargs.get("request")
             if request is None:
                 for arg in args:
-                    if hasattr(arg, "headers"):
+                    if hasattr(arg, "scope"):
                         request = arg
                         break
 
-            if request is not None and _policy_engine is not None:
-                agent_id = request.headers.get(_agent_header)
-                agent_type = request.headers.get(_agent_type_header)
+            policy_engine = get_policy_engine()
+            if request is not None and policy_engine is not None:
+                agent_id, agent_type, _ = get_identity(request.scope)
 
                 if agent_id and agent_type:
                     for perm in permissions:
-                        if not _policy_engine.check(agent_id, agent_type, perm):
+                        if not policy_engine.check(agent_id, agent_type, perm):
                             raise PermissionDeniedError(
                                 f"Agent {agent_id} ({agent_type}) lacks permission: {perm.value}"
                             )
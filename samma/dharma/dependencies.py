@@ -8,13 +8,12 @@ from typing import Any, Callable, Optional
 from samma.dharma.permissions import Permission
 from samma.dharma.policy import PolicyEngine
 from samma.exceptions import PermissionDeniedError
+from samma.identity import configure_identity_headers, get_identity
 
 logger = logging.getLogger("samma.dharma.deps")
 
 # Module-level policy engine — set by SammaSuit.activate_dharma()
 _policy_engine: Optional[PolicyEngine] = None
-_agent_header: str = "x-agent-id"
-_agent_type_header: str = "x-agent-type"
 
 
 def set_policy_engine(engine: PolicyEngine) -> None:
@@ -23,11 +22,14 @@ def set_policy_engine(engine: PolicyEngine) -> None:
     _policy_engine = engine
 
 
+def get_policy_engine() -> Optional[PolicyEngine]:
+    """Return the global policy engine, or None if DHARMA is not activated."""
+    return _policy_engine
+
+
 def set_headers(agent_header: str, agent_type_header: str) -> None:
-    """Configure which HTTP headers carry agent identity."""
-    global _agent_header, _agent_type_header
-    _agent_header = agent_header
-    _agent_type_header = agent_type_header
+    """Configure which HTTP headers carry agent identity (for every layer)."""
+    configure_identity_headers(agent=agent_header, agent_type=agent_type_header)
 
 
 def require_permission(permission: Permission) -> Callable:
@@ -41,7 +43,8 @@ def require_permission(permission: Permission) -> Callable:
         ):
             ...
 
-    The agent identity is read from X-Agent-Id and X-Agent-Type headers.
+    The agent identity comes from the X-Agent-Id and X-Agent-Type headers,
+    parsed once per request (normally by SUTRA) and kept in the scope state.
     If no agent headers are present, the request passes through (host-app traffic).
     """
 
@@ -49,9 +52,7 @@ def require_permission(permission: Permission) -> Callable:
         if _policy_engine is None:
             return  # DHARMA not activated — pass through
 
-        # Import Request lazily to avoid hard dep on starlette at import time
-        agent_id = request.headers.get(_agent_header)
-        agent_type = request.headers.get(_agent_type_header)
+        agent_id, agent_type, _ = get_identity(request.scope)
 
         if not agent_id or not agent_type:
             # No agent identity — not an agent request, pass through
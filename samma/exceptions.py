@@ -29,6 +29,12 @@ class TLSRequiredError(SUTRAError):
     pass
 
 
+class RequestTooLargeError(SUTRAError):
+    def __init__(self, limit: int):
+        self.limit = limit
+        super().__init__(f"Request body exceeds {limit} bytes")
+
+
 # Layer 2: DHARMA (Permissions)
 class DHARMAError(SammaError):
     def __init__(self, message: str = ""):
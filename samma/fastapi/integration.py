@@ -27,6 +27,8 @@ class SammaSuit:
         self.app = app
         self._layers: dict[str, LayerStatus] = {}
         self._sutra_middleware = None
+        self._sutra_tracing = None
+        self._ip_filter = None
         self._policy_engine = None
 
         # Register all 8 layers as inactive
@@ -38,16 +40,32 @@ class SammaSuit:
 
         logger.info("Samma Suit v%s initialized", __version__)
 
-    def activate_sutra(self, settings=None) -> None:
-        """Activate the SUTRA gateway layer (middleware)."""
+    def activate_sutra(self, settings=None, tracer=None) -> None:
+        """
+        Activate the SUTRA gateway layer (middleware).
+
+        ``tracer`` is an OpenTelemetry-style tracer that receives one span
+        per pipeline stage; see samma.sutra.tracing.PipelineTracer.
+        """
+        from samma.sutra.cidr import IPFilter
         from samma.sutra.config import SUTRASettings
         from samma.sutra.middleware import SUTRAMiddleware
+        from samma.sutra.tracing import PipelineTracer
 
         settings = settings or SUTRASettings()
-        self._sutra_middleware = SUTRAMiddleware(self.app, settings=settings)
+        # Shared by the middleware instances below so status() sees live timings
+        if tracer is not None or settings.trace_latency_histograms:
+            self._sutra_tracing = PipelineTracer(
+                tracer=tracer,
+                sample_rate=settings.trace_sample_rate,
+                histograms=settings.trace_latency_histograms,
+            )
+        self._ip_filter = IPFilter(settings.ip_allow, settings.ip_deny, settings.trusted_proxies)
+        options = dict(settings=settings, tracing=self._sutra_tracing, ip_filter=self._ip_filter)
+        self._sutra_middleware = SUTRAMiddleware(self.app, **options)
 
         if self.app is not None:
-            self.app.add_middleware(SUTRAMiddleware, settings=settings)
+            self.app.add_middleware(SUTRAMiddleware, **options)
 
         self._layers["sutra"] = LayerStatus(
             name="sutra",
@@ -84,13 +102,18 @@ class SammaSuit:
         )
         logger.info("DHARMA layer activated")
 
+    @property
+    def ip_filter(self) -> Optional["IPFilter"]:
+        """SUTRA's IP allow/deny lists; call ``reload()`` on it to change them live."""
+        return self._ip_filter
+
     @property
     def policy_engine(self) -> Optional["PolicyEngine"]:
         return self._policy_engine
 
     def status(self) -> dict:
-        """Return status of all Samma layers."""
-        return {
+        """Return status of all Samma layers, plus SUTRA stage latencies when collected."""
+        status = {
             "samma_version": __version__,
             "layers": {
                 name: layer.model_dump()
@@ -99,3 +122,6 @@ class SammaSuit:
             "active_count": sum(1 for l in self._layers.values() if l.active),
             "total_layers": len(self._layers),
         }
+        if self._sutra_tracing is not None and self._sutra_tracing.histograms:
+            status["sutra_latency"] = self._sutra_tracing.summary()
+        return status
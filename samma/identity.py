@@ -0,0 +1,90 @@
+"""Request-scoped agent identity — parsed once per request, shared by every layer."""
+
+from __future__ import annotations
+
+from typing import Any, Iterable, MutableMapping, NamedTuple
+
+# Key in the ASGI scope's "state" dict; also readable as request.state.samma_identity
+STATE_KEY = "samma_identity"
+
+
+class IdentityHeaders(NamedTuple):
+    """Request headers that carry agent identity (lowercase)."""
+
+    agent: str = "x-agent-id"
+    agent_type: str = "x-agent-type"
+    tenant: str = "x-tenant-id"
+
+    @property
+    def raw(self) -> tuple[bytes, bytes, bytes]:
+        """Header names as they appear in raw ASGI headers."""
+        return tuple(name.encode("latin-1") for name in self)  # type: ignore[return-value]
+
+
+class RequestIdentity(NamedTuple):
+    """Who a request claims to come from; fields are None when the header is absent."""
+
+    agent_id: str | None = None
+    agent_type: str | None = None
+    tenant_id: str | None = None
+
+
+_headers = IdentityHeaders()
+_raw_headers = _headers.raw
+
+
+def configure_identity_headers(
+    agent: str | None = None,
+    agent_type: str | None = None,
+    tenant: str | None = None,
+) -> IdentityHeaders:
+    """
+    Set which headers carry agent identity, for every layer at once.
+
+    Called by SammaSuit from DHARMASettings (agent headers); arguments left
+    as None are unchanged. SUTRA reads the tenant from its own
+    ``tenant_header`` setting, so ``tenant`` only applies to identities
+    parsed outside the gateway.
+    """
+    global _headers, _raw_headers
+    _headers = IdentityHeaders(
+        (agent or _headers.agent).lower(),
+        (agent_type or _headers.agent_type).lower(),
+        (tenant or _headers.tenant).lower(),
+    )
+    _raw_headers = _headers.raw
+    return _headers
+
+
+def identity_headers() -> IdentityHeaders:
+    """The currently configured identity headers."""
+    return _headers
+
+
+def parse_identity(raw_headers: Iterable[tuple[bytes, bytes]]) -> RequestIdentity:
+    """Build an identity from raw ASGI headers; the first occurrence of each wins."""
+    agent, agent_type, tenant = _raw_headers
+    values: dict[bytes, str] = {}
+    for name, value in raw_headers:
+        if (name == agent or name == agent_type or name == tenant) and name not in values:
+            values[name] = value.decode("latin-1")
+    return RequestIdentity(values.get(agent), values.get(agent_type), values.get(tenant))
+
+
+def set_identity(scope: MutableMapping[str, Any], identity: RequestIdentity) -> None:
+    """Store a request's identity in its scope state."""
+    scope.setdefault("state", {})[STATE_KEY] = identity
+
+
+def get_identity(scope: MutableMapping[str, Any]) -> RequestIdentity:
+    """
+    Return the request's identity, parsing and storing it on first use.
+
+    SUTRA resolves it at the gateway, so later layers normally get the
+    stored value; routes SUTRA skips (excluded paths) are parsed here once.
+    """
+    state = scope.setdefault("state", {})
+    identity = state.get(STATE_KEY)
+    if identity is None:
+        identity = state[STATE_KEY] = parse_identity(scope.get("headers", ()))
+    return identity
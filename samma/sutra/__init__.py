@@ -1,6 +1,6 @@
 """SUTRA — Layer 1: Gateway (rate limiting, origin validation, TLS enforcement)."""
 
-from samma.sutra.config import SUTRASettings
+from samma.sutra.config import RouteLimit, SUTRASettings
 from samma.sutra.middleware import SUTRAMiddleware
 from samma.sutra.rate_limiter import RateLimiter
 from samma.sutra.origin_validator import OriginValidator
@@ -8,6 +8,7 @@ from samma.sutra.tls_checker import TLSChecker
 
 __all__ = [
     "SUTRASettings",
+    "RouteLimit",
     "SUTRAMiddleware",
     "RateLimiter",
     "OriginValidator",
@@ -0,0 +1,63 @@
+"""Request body size limits, enforced as the body streams in."""
+
+from __future__ import annotations
+
+from typing import Awaitable, Callable
+
+from starlette.types import Message, Receive, Send
+
+from samma.exceptions import RequestTooLargeError
+
+
+class BodyLimit:
+    """
+    Caps one request's body at ``limit`` bytes while the app reads it.
+
+    ``receive`` counts body bytes and raises RequestTooLargeError once the
+    cap is crossed, so nothing past it is buffered. Frameworks may turn
+    that error into their own response (FastAPI sends a 400), so ``send``
+    swaps whatever response the app starts next for ``reject()`` and drops
+    the rest of it. A response the app started before the cap was crossed
+    is left alone. Requests with a Content-Length are checked before the
+    app runs and do not need this: the server never delivers more than the
+    declared length.
+    """
+
+    __slots__ = (
+        "limit", "received", "started", "exceeded", "responded", "_receive", "_send", "_reject"
+    )
+
+    def __init__(
+        self, limit: int, receive: Receive, send: Send, reject: Callable[[], Awaitable[None]]
+    ) -> None:
+        self.limit = limit
+        self.received = 0
+        self.started = False
+        self.exceeded = False
+        self.responded = False
+        self._receive = receive
+        self._send = send
+        self._reject = reject
+
+    async def receive(self) -> Message:
+        message = await self._receive()
+        if message["type"] == "http.request":
+            self.received += len(message.get("body", b""))
+            if self.received > self.limit:
+                self.exceeded = True
+                raise RequestTooLargeError(self.limit)
+        return message
+
+    async def send(self, message: Message) -> None:
+        if self.started or not self.exceeded:
+            if message["type"] == "http.response.start":
+                self.started = True
+            await self._send(message)
+        elif message["type"] == "http.response.start":
+            await self.respond()
+
+    async def respond(self) -> None:
+        """Send the rejection, unless it (or the app's own response) already went out."""
+        if not self.responded and not self.started:
+            self.responded = True
+            await self._reject()
@@ -0,0 +1,168 @@
+"""CIDR allow/deny lists and trusted proxies, matched with a radix trie."""
+
+from __future__ import annotations
+
+import ipaddress
+import logging
+from typing import Iterable, NamedTuple
+
+from samma.sutra.ip import parse_ip
+
+logger = logging.getLogger("samma.sutra")
+
+# Trie node: [prefix bits, prefix length, terminal, child for 0, child for 1]
+_KEY, _LENGTH, _TERMINAL, _ZERO = 0, 1, 2, 3
+
+
+class CIDRSet:
+    """
+    A set of IPv4 and IPv6 networks, for fast membership tests of addresses.
+
+    Each family is a path-compressed binary radix trie over the integer
+    address: a node holds a whole run of prefix bits, so a lookup compares
+    one integer per branching node and costs O(prefix length) at worst,
+    however many networks the set holds.
+    """
+
+    def __init__(self, cidrs: Iterable[str] = ()) -> None:
+        self._roots: dict[int, list] = {}
+        self._size = 0
+        for cidr in cidrs:
+            network = ipaddress.ip_network(cidr.strip(), strict=False)
+            bits, length = network.max_prefixlen, network.prefixlen
+            self._insert(bits, int(network.network_address) >> (bits - length), length)
+            self._size += 1
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _insert(self, bits: int, key: int, length: int) -> None:
+        node = self._roots.setdefault(bits, [0, 0, False, None, None])
+        while True:
+            # Invariant: the node's prefix is a prefix of the new one
+            if node[_LENGTH] == length:
+                node[_TERMINAL] = True
+                return
+            branch = _ZERO + ((key >> (length - node[_LENGTH] - 1)) & 1)
+            child = node[branch]
+            if child is None:
+                node[branch] = [key, length, True, None, None]
+                return
+            child_key, child_length = child[_KEY], child[_LENGTH]
+            shortest = min(child_length, length)
+            diff = (child_key >> (child_length - shortest)) ^ (key >> (length - shortest))
+            common = shortest - diff.bit_length()
+            if common == child_length:
+                node = child
+                continue
+            # Split the child's run at the first differing bit
+            split = [child_key >> (child_length - common), common, common == length, None, None]
+            split[_ZERO + ((child_key >> (child_length - common - 1)) & 1)] = child
+            if common < length:
+                leaf = [key, length, True, None, None]
+                split[_ZERO + ((key >> (length - common - 1)) & 1)] = leaf
+            node[branch] = split
+            return
+
+    def contains_int(self, bits: int, value: int) -> bool:
+        """Return True if an address (bit width, integer) is in any network."""
+        node = self._roots.get(bits)
+        while node is not None:
+            if node[_TERMINAL]:
+                return True
+            length = node[_LENGTH]
+            if length == bits:
+                return False
+            child = node[_ZERO + ((value >> (bits - length - 1)) & 1)]
+            if child is None or value >> (bits - child[_LENGTH]) != child[_KEY]:
+                return False
+            node = child
+        return False
+
+    def __contains__(self, address: str) -> bool:
+        parsed = parse_ip(address)
+        return parsed is not None and self.contains_int(*parsed)
+
+
+class _Lists(NamedTuple):
+    allow: CIDRSet
+    deny: CIDRSet
+    trusted_proxies: CIDRSet | None
+
+
+class IPFilter:
+    """
+    Client IP allow/deny lists and trusted proxies for the gateway.
+
+    ``allow`` networks skip the deny list and rate limits; ``deny``
+    networks are rejected outright. ``x-forwarded-for`` is honored only
+    when the connecting peer is in ``trusted_proxies``, and the client is
+    the right-most hop that is not itself a trusted proxy. With
+    ``trusted_proxies=None`` every peer is trusted and the left-most hop is
+    used for rate limits, but since any peer can forge that header the
+    allow/deny lists are then checked against the peer itself. ``reload``
+    swaps in new lists at runtime; requests in flight keep the lists they
+    started with.
+    """
+
+    def __init__(
+        self,
+        allow: Iterable[str] = (),
+        deny: Iterable[str] = (),
+        trusted_proxies: Iterable[str] | None = None,
+    ) -> None:
+        self.reload(allow, deny, trusted_proxies)
+
+    def reload(
+        self,
+        allow: Iterable[str] = (),
+        deny: Iterable[str] = (),
+        trusted_proxies: Iterable[str] | None = None,
+    ) -> None:
+        """Replace all three lists; invalid CIDRs raise ValueError and change nothing."""
+        lists = _Lists(
+            CIDRSet(allow),
+            CIDRSet(deny),
+            CIDRSet(trusted_proxies) if trusted_proxies is not None else None,
+        )
+        self._lists = lists
+        self.active = bool(lists.allow or lists.deny)
+        if self.active and trusted_proxies is None:
+            logger.warning(
+                "SUTRA ip_allow/ip_deny are matched against the connecting peer because "
+                "trusted_proxies is not set; behind a reverse proxy every client shares "
+                "its address, so set trusted_proxies to the proxy's CIDRs"
+            )
+
+    def check(self, address: str) -> bool | None:
+        """True if the address is allowlisted, False if denied, None otherwise."""
+        lists = self._lists
+        parsed = parse_ip(address)
+        if parsed is None:
+            return None
+        if lists.allow.contains_int(*parsed):
+            return True
+        if lists.deny.contains_int(*parsed):
+            return False
+        return None
+
+    def check_client(self, peer: str | None, client_ip: str) -> bool | None:
+        """``check`` the resolved client, or the peer when x-forwarded-for is not vetted."""
+        if self._lists.trusted_proxies is None:
+            return self.check(peer or "unknown")
+        return self.check(client_ip)
+
+    def client_ip(self, peer: str | None, forwarded: str | None) -> str:
+        """Resolve the client address from the peer and its x-forwarded-for header."""
+        trusted = self._lists.trusted_proxies
+        if not forwarded:
+            return peer or "unknown"
+        if trusted is None:
+            return forwarded.split(",")[0].strip()
+        if peer is None or peer not in trusted:
+            return peer or "unknown"
+        hops = [hop.strip() for hop in forwarded.split(",")]
+        for hop in reversed(hops):
+            if hop not in trusted:
+                return hop
+        return hops[0]
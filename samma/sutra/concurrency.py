@@ -0,0 +1,174 @@
+"""Adaptive concurrency limiting — caps in-flight requests and sheds the excess."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+
+# Weight of each latency sample in the long-term baseline (a slow-moving EWMA)
+_BASELINE_ALPHA = 0.01
+
+
+class ConcurrencyLimiter:
+    """
+    Global and per-agent caps on in-flight requests, with an AIMD global limit.
+
+    The global limit starts at ``max_limit``. Each completed request
+    reports its downstream latency: a request slower than the latency
+    target multiplies the limit by ``backoff`` (at most once per round
+    trip, so a burst of slow completions counts as one signal), and a fast
+    one adds 1 while the limit is actually in use. The target is
+    ``latency_target`` seconds if given, otherwise ``tolerance`` times a
+    slow-moving average of observed latency. When upstreams degrade, fewer
+    requests are let in, so queues and memory stay bounded instead of
+    growing with the backlog.
+
+    Requests over the global limit wait in a FIFO queue of up to
+    ``queue_size`` entries for at most ``queue_timeout`` seconds; requests
+    beyond that, and requests from an agent already at ``per_agent``, are
+    shed immediately. One instance belongs to one event loop.
+    """
+
+    def __init__(
+        self,
+        max_limit: int | None = None,
+        min_limit: int = 1,
+        per_agent: int | None = None,
+        adaptive: bool = True,
+        latency_target: float | None = None,
+        tolerance: float = 2.0,
+        backoff: float = 0.9,
+        queue_size: int = 0,
+        queue_timeout: float = 0.1,
+    ) -> None:
+        if max_limit is not None and not 1 <= min_limit <= max_limit:
+            raise ValueError("Need 1 <= min_limit <= max_limit")
+        if not 0 < backoff < 1:
+            raise ValueError("backoff must be in (0, 1)")
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.per_agent = per_agent
+        self.adaptive = adaptive and max_limit is not None
+        self.latency_target = latency_target
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.limit = float(max_limit) if max_limit is not None else float("inf")
+        self.in_flight = 0
+        self.shed = 0
+        self.baseline: float | None = None
+        self._agents: dict[str, int] = {}
+        self._waiters: deque[asyncio.Future] = deque()
+        self._last_decrease = 0.0
+
+    async def acquire(self, agent_id: str | None = None) -> bool:
+        """Take a slot, waiting in the queue if needed; False means shed."""
+        tracked = bool(agent_id) and self.per_agent is not None
+        if tracked:
+            count = self._agents.get(agent_id, 0)
+            if count >= self.per_agent:
+                self.shed += 1
+                return False
+            # Reserved before queueing, so an agent's waiters count towards its cap
+            self._agents[agent_id] = count + 1
+        # Queue behind earlier waiters even if a slot just freed up, to stay FIFO
+        if self.in_flight + 1 <= self.limit and not self._waiters:
+            self.in_flight += 1
+            return True
+        try:
+            acquired = await self._wait()
+        except asyncio.CancelledError:
+            if tracked:
+                self._leave(agent_id)
+            raise
+        if not acquired:
+            self.shed += 1
+            if tracked:
+                self._leave(agent_id)
+        return acquired
+
+    async def _wait(self) -> bool:
+        """Queue for a slot handed over by ``release``; True once one is held."""
+        if len(self._waiters) >= self.queue_size or self.queue_timeout <= 0:
+            return False
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            if not self._withdraw(waiter):
+                self._release_slot()  # handed a slot as the request was cancelled
+            raise
+        return not self._withdraw(waiter)
+
+    def _withdraw(self, waiter: asyncio.Future) -> bool:
+        """Leave the queue; False if a slot was handed over first."""
+        if waiter.done():
+            return False
+        waiter.cancel()
+        self._waiters.remove(waiter)
+        return True
+
+    def _release_slot(self) -> None:
+        # Hand the slot straight to the oldest waiter if the limit still allows it
+        if self._waiters and self.in_flight <= self.limit:
+            self._waiters.popleft().set_result(None)
+        else:
+            self.in_flight -= 1
+
+    def release(
+        self,
+        agent_id: str | None = None,
+        started: float | None = None,
+        responded: float | None = None,
+    ) -> None:
+        """
+        Give back a slot taken by ``acquire``.
+
+        ``started`` is the ``time.monotonic()`` at which the downstream call
+        began and ``responded`` when it started its response (default: now);
+        the latency between them feeds the adaptive limit, so a long
+        streamed body does not read as a slow downstream.
+        """
+        if agent_id and self.per_agent is not None:
+            self._leave(agent_id)
+        if self.adaptive and started is not None:
+            self._observe(started, responded if responded is not None else time.monotonic())
+        self._release_slot()
+
+    def _leave(self, agent_id: str) -> None:
+        count = self._agents.get(agent_id, 0) - 1
+        if count > 0:
+            self._agents[agent_id] = count
+        else:
+            self._agents.pop(agent_id, None)
+
+    def _observe(self, started: float, now: float) -> None:
+        latency = now - started
+        if self.baseline is None:
+            self.baseline = latency
+        else:
+            self.baseline += _BASELINE_ALPHA * (latency - self.baseline)
+        target = self.latency_target
+        if target is None:
+            target = self.tolerance * self.baseline
+        if latency > target:
+            # Only requests that started after the last decrease reflect it
+            if started >= self._last_decrease:
+                self.limit = max(float(self.min_limit), self.limit * self.backoff)
+                self._last_decrease = now
+        elif self.in_flight * 2 >= self.limit:
+            self.limit = min(float(self.max_limit), self.limit + 1)
+
+    def stats(self) -> dict[str, int | None]:
+        """Current limit, in-flight and queued requests, and requests shed so far."""
+        return {
+            "limit": int(self.limit) if self.max_limit is not None else None,
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "shed": self.shed,
+        }
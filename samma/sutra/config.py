@@ -2,10 +2,31 @@
 
 from __future__ import annotations
 
-from pydantic import Field
+from typing import Literal
+
+from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings
 
 
+class RouteLimit(BaseModel):
+    """
+    Rate limit rule for requests matching a path glob and method.
+
+    ``*`` matches within one path segment and ``**`` across segments. The
+    first matching rule applies. ``cost`` is how many units a request
+    spends from the per-IP and per-agent quotas; ``per_ip``/``per_agent``
+    add a separate request limit for this route alone. ``max_body_bytes``
+    overrides the global request body limit for this route.
+    """
+
+    path: str
+    methods: list[str] | None = None  # None matches every method
+    cost: int = Field(default=1, ge=0)
+    per_ip: int | None = None
+    per_agent: int | None = None
+    max_body_bytes: int | None = Field(default=None, ge=0)
+
+
 class SUTRASettings(BaseSettings):
     """Configuration for the SUTRA gateway layer."""
 
@@ -17,6 +38,33 @@ class SUTRASettings(BaseSettings):
         description="Allowed origins (supports glob patterns like '*.onezeroeight.ai')",
     )
 
+    # CORS
+    cors_enabled: bool = Field(
+        default=False,
+        description="Answer CORS preflights for allowed origins in SUTRA and add CORS headers to responses",
+    )
+    cors_allow_methods: list[str] = Field(
+        default_factory=lambda: ["GET", "POST", "PUT", "PATCH", "DELETE"],
+        description="Methods allowed in CORS preflights",
+    )
+    cors_allow_headers: list[str] = Field(
+        default_factory=lambda: ["*"],
+        description="Request headers allowed in CORS preflights ('*' allows whatever is requested)",
+    )
+    cors_allow_credentials: bool = Field(default=False)
+    cors_max_age: int = Field(
+        default=600,
+        ge=0,
+        description="Seconds browsers may cache a preflight answer",
+    )
+
+    # Request bodies
+    max_body_bytes: int | None = Field(
+        default=None,
+        ge=0,
+        description="Reject request bodies larger than this with 413, counted as they stream in (per route: RouteLimit.max_body_bytes)",
+    )
+
     # Rate limiting
     rate_limit_per_ip: int = Field(
         default=100,
@@ -26,10 +74,144 @@ class SUTRASettings(BaseSettings):
         default=200,
         description="Max requests per agent within the window",
     )
+    rate_limit_ipv4_prefix: int = Field(
+        default=32,
+        ge=0,
+        le=32,
+        description="IPv4 addresses sharing this prefix length share one per-IP limit",
+    )
+    rate_limit_ipv6_prefix: int = Field(
+        default=64,
+        ge=0,
+        le=128,
+        description="IPv6 addresses sharing this prefix length (one /64 per client) share one per-IP limit",
+    )
+    rate_limit_per_tenant: int | None = Field(
+        default=None,
+        description="Max requests per tenant (all of its agents combined) within the window",
+    )
+    rate_limit_global: int | None = Field(
+        default=None,
+        description="Max requests across all clients within the window",
+    )
+    tenant_header: str = Field(
+        default="x-tenant-id",
+        description="Request header carrying the tenant identity",
+    )
     rate_limit_window_seconds: int = Field(
         default=60,
         description="Sliding window duration in seconds",
     )
+    rate_limit_algorithm: Literal["sliding_window", "gcra"] = Field(
+        default="sliding_window",
+        description="'sliding_window' counts hits per window; 'gcra' paces requests with a burst allowance",
+    )
+    rate_limit_burst_per_ip: int | None = Field(
+        default=None,
+        description="GCRA only: requests an IP may send back to back (default: rate_limit_per_ip)",
+    )
+    rate_limit_burst_per_agent: int | None = Field(
+        default=None,
+        description="GCRA only: requests an agent may send back to back (default: rate_limit_per_agent)",
+    )
+    rate_limit_retry_jitter_seconds: float = Field(
+        default=0.0,
+        description="Add up to this many random seconds to Retry-After so throttled clients spread their retries",
+    )
+    rate_limit_max_keys: int = Field(
+        default=100_000,
+        description="Max IP/agent keys held in memory before least-recently-used keys are evicted",
+    )
+    rate_limit_key_ttl_seconds: int | None = Field(
+        default=None,
+        description="Drop keys idle for this long (default: twice the window, or burst / rate windows for GCRA if longer)",
+    )
+    rate_limit_redis_url: str | None = Field(
+        default=None,
+        description="Share rate limits across workers via Redis (e.g. 'redis://localhost:6379/0')",
+    )
+    rate_limit_redis_prefix: str = Field(
+        default="samma:rl:",
+        description="Key prefix for rate limit state stored in Redis",
+    )
+    rate_limit_lease_fraction: float | None = Field(
+        default=None,
+        description="Lease this fraction of each limit from Redis/shared memory and spend it locally (e.g. 0.1)",
+    )
+    rate_limit_lease_seconds: float = Field(
+        default=1.0,
+        description="How long a local lease lives before unspent units are returned",
+    )
+    rate_limit_shm_path: str | None = Field(
+        default=None,
+        description="Share rate limits across local worker processes via this mmap'd file (e.g. '/dev/shm/samma-rl')",
+    )
+    rate_limit_shm_slots: int = Field(
+        default=65_536,
+        description="Fixed number of key slots in the shared-memory table (32 bytes each)",
+    )
+    rate_limit_ip_sketch_mb: float | None = Field(
+        default=None,
+        description="Track per-IP limits approximately in a fixed-size count-min sketch of this many MB",
+    )
+    rate_limit_ip_sketch_top_k: int = Field(
+        default=1024,
+        description="Heaviest IPs tracked exactly alongside the sketch",
+    )
+
+    route_limits: list[RouteLimit] = Field(
+        default_factory=list,
+        description="Per-route costs and limits, e.g. [{'path': '/api/llm/**', 'methods': ['POST'], 'cost': 10}]",
+    )
+
+    # IP filtering
+    ip_allow: list[str] = Field(
+        default_factory=list,
+        description="CIDRs exempt from ip_deny and rate limits (e.g. internal ranges)",
+    )
+    ip_deny: list[str] = Field(
+        default_factory=list,
+        description="CIDRs rejected with 403 before any rate limit state is touched",
+    )
+    trusted_proxies: list[str] | None = Field(
+        default=None,
+        description="CIDRs of proxies whose x-forwarded-for is honored (None trusts every peer for rate limits; ip_allow/ip_deny then see the peer, and a warning is logged)",
+    )
+
+    # Concurrency limiting and load shedding
+    concurrency_limit: int | None = Field(
+        default=None,
+        ge=1,
+        description="Max in-flight HTTP requests; lowered adaptively (AIMD) when downstream latency rises",
+    )
+    concurrency_min_limit: int = Field(
+        default=1,
+        ge=1,
+        description="Floor for the adaptive in-flight limit",
+    )
+    concurrency_adaptive: bool = Field(
+        default=True,
+        description="Adapt the in-flight limit to downstream latency (False keeps it fixed)",
+    )
+    concurrency_latency_target_ms: float | None = Field(
+        default=None,
+        description="Latency above which the limit is cut (default: 2x the observed average)",
+    )
+    concurrency_per_agent: int | None = Field(
+        default=None,
+        ge=1,
+        description="Max in-flight requests per agent",
+    )
+    concurrency_queue_size: int = Field(
+        default=100,
+        ge=0,
+        description="Requests that may wait for a slot before new ones get an immediate 503",
+    )
+    concurrency_queue_timeout_ms: float = Field(
+        default=100.0,
+        ge=0,
+        description="Longest a queued request waits for a slot before getting a 503",
+    )
 
     # TLS enforcement
     tls_enforce: bool = Field(
@@ -44,7 +226,32 @@ class SUTRASettings(BaseSettings):
     # Excluded paths (bypass all SUTRA checks)
     excluded_paths: list[str] = Field(
         default_factory=lambda: ["/health", "/docs", "/openapi.json", "/redoc", "/"],
+        description="Exact paths, prefixes ending in '*' ('/static/*') or globs ('/api/*/health')",
     )
 
     # Logging
     log_requests: bool = Field(default=True)
+    log_sample_rates: dict[str, float] = Field(
+        default_factory=dict,
+        description="Fraction of events logged per class: allowed, rate_limited, overloaded, origin_denied, ip_denied, too_large, tls (default 1.0 each)",
+    )
+    log_queue_size: int | None = Field(
+        default=None,
+        description="Write SUTRA logs from a background thread through a queue of this size; drop when full",
+    )
+    rejection_log_interval_seconds: float = Field(
+        default=10.0,
+        description="Log the first rejection per key, then one summary per key per interval (0 logs every one)",
+    )
+
+    # Tracing
+    trace_latency_histograms: bool = Field(
+        default=False,
+        description="Collect per-stage latency histograms (reported by SammaSuit.status())",
+    )
+    trace_sample_rate: float = Field(
+        default=1.0,
+        ge=0.0,
+        le=1.0,
+        description="Fraction of requests timed for histograms and tracer spans, decided per request",
+    )
@@ -0,0 +1,68 @@
+"""CORS headers and preflight answers for the SUTRA gateway, rendered once at init."""
+
+from __future__ import annotations
+
+from typing import Sequence
+
+Headers = list[tuple[bytes, bytes]]
+
+
+class CORSPolicy:
+    """
+    CORS response headers for origins that passed the SUTRA allowlist.
+
+    Header values are encoded at init; per request only the echoed origin
+    (and, with ``allow_headers=["*"]``, the echoed request headers) are
+    added. When every origin is allowed and credentials are not, responses
+    use ``Access-Control-Allow-Origin: *``; otherwise the origin is echoed
+    with ``Vary: Origin``.
+    """
+
+    def __init__(
+        self,
+        allow_methods: Sequence[str],
+        allow_headers: Sequence[str],
+        allow_credentials: bool = False,
+        max_age: int = 600,
+        allow_all_origins: bool = False,
+    ) -> None:
+        self._methods = frozenset(method.upper() for method in allow_methods)
+        self._any_header = "*" in allow_headers
+        self._headers = frozenset(header.lower() for header in allow_headers)
+        credentials = [(b"access-control-allow-credentials", b"true")] if allow_credentials else []
+        self._wildcard = allow_all_origins and not allow_credentials
+        self._origin_tail: Headers = [(b"vary", b"Origin"), *credentials]
+        self._preflight: Headers = [
+            (b"access-control-allow-methods", ", ".join(sorted(self._methods)).encode("latin-1")),
+            (b"access-control-max-age", str(max_age).encode("latin-1")),
+        ]
+        if not self._any_header:
+            self._preflight.append((
+                b"access-control-allow-headers",
+                ", ".join(sorted(self._headers)).encode("latin-1"),
+            ))
+        self._star: Headers = [(b"access-control-allow-origin", b"*")]
+
+    def origin_headers(self, origin: str) -> Headers:
+        """Headers that let the browser read a response for ``origin``."""
+        if self._wildcard:
+            return self._star
+        return [(b"access-control-allow-origin", origin.encode("latin-1")), *self._origin_tail]
+
+    def preflight(
+        self, origin: str, request_method: str, request_headers: str | None
+    ) -> Headers | None:
+        """Headers for a preflight answer, or None if the method or headers are not allowed."""
+        if request_method.upper() not in self._methods:
+            return None
+        headers = [*self.origin_headers(origin), *self._preflight]
+        if request_headers:
+            if self._any_header:
+                headers.append((b"access-control-allow-headers", request_headers.encode("latin-1")))
+            elif any(
+                name.strip().lower() not in self._headers
+                for name in request_headers.split(",")
+                if name.strip()
+            ):
+                return None
+        return headers
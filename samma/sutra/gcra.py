@@ -0,0 +1,85 @@
+"""GCRA (generic cell rate algorithm) backend — token bucket with one float per key."""
+
+from __future__ import annotations
+
+import time
+from typing import Sequence
+
+from samma.sutra.key_store import KeyStore
+from samma.sutra.types import RateLimitCheck, RateLimitResult, resolve_batch
+
+# Guards floor() against float error when a result lands exactly on a boundary
+_EPSILON = 1e-9
+
+
+class GCRABackend:
+    """
+    In-memory GCRA state: the theoretical arrival time (TAT) of each key.
+
+    Requests are spaced by ``emission_interval`` (window / sustained limit)
+    and up to ``burst`` of them may arrive back to back. A request is
+    allowed if, after adding its cost, the TAT is no more than
+    ``burst * emission_interval`` ahead of now. When it is not, the
+    difference is the exact time until the next request would be allowed.
+    """
+
+    def __init__(self, store: KeyStore | None = None) -> None:
+        self.store = store if store is not None else KeyStore()
+
+    def _evaluate(
+        self, key: str, emission_interval: float, burst: int, cost: int, now: float
+    ) -> tuple[RateLimitResult, float]:
+        tat = max(self.store.get(key, now), now)
+        new_tat = tat + emission_interval * cost
+        allow_at = new_tat - burst * emission_interval
+        if allow_at > now:
+            return RateLimitResult(False, 0, allow_at - now, burst, tat - now), new_tat
+        remaining = int((now - allow_at) / emission_interval + _EPSILON)
+        return RateLimitResult(True, remaining, 0.0, burst, max(0.0, new_tat - now)), new_tat
+
+    def update(
+        self,
+        key: str,
+        emission_interval: float,
+        burst: int,
+        cost: int = 1,
+    ) -> tuple[bool, int, float]:
+        """
+        Spend ``cost`` units for a key if the bucket allows it.
+
+        Returns:
+            (allowed, remaining, retry_after) — retry_after is 0.0 when allowed.
+        """
+        result, new_tat = self._evaluate(
+            key, emission_interval, burst, cost, time.monotonic()
+        )
+        if result.allowed:
+            self.store.set(key, new_tat)
+        return result.allowed, result.remaining, result.retry_after
+
+    def check_many(
+        self, checks: Sequence[RateLimitCheck], all_or_nothing: bool = True
+    ) -> list[RateLimitResult]:
+        """Batch variant of ``update``; the limit sets the sustained rate per window."""
+        now = time.monotonic()
+        evaluated = [
+            self._evaluate(
+                check.key,
+                check.window_seconds / check.limit,
+                check.burst if check.burst is not None else check.limit,
+                check.cost,
+                now,
+            )
+            for check in checks
+        ]
+        results, commit = resolve_batch([result for result, _ in evaluated], all_or_nothing)
+        for check, (_, new_tat) in zip(checks[:commit], evaluated):
+            self.store.set(check.key, new_tat)
+        return results
+
+    def peek(self, key: str, emission_interval: float, burst: int) -> int:
+        """Return how many requests a key could make right now, without spending any."""
+        now = time.monotonic()
+        tat = max(self.store.get(key, now), now)
+        backlog = tat - now
+        return max(0, int((burst * emission_interval - backlog) / emission_interval + _EPSILON))
@@ -0,0 +1,145 @@
+"""Bounded key store with LRU eviction and idle-TTL expiry for limiter state."""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+# Rough per-entry cost of the OrderedDict slot, linked-list node and entry list
+_ENTRY_OVERHEAD = 160
+
+
+class KeyStore:
+    """
+    Bounded mapping from rate-limit keys to backend state.
+
+    Entries are kept in least-recently-used order. Inserting beyond
+    ``max_keys`` evicts the oldest entry, and entries idle for longer than
+    ``ttl_seconds`` are expired lazily on access, a few at a time on every
+    insert, and by the optional background sweeper. Because the order is by
+    last access, expired entries always sit at the front, so sweeping never
+    scans live keys.
+
+    ``ttl_seconds`` should be at least as long as the longest rate-limit
+    window stored here, otherwise idle keys lose hits that still count.
+    """
+
+    def __init__(
+        self,
+        max_keys: int = 100_000,
+        ttl_seconds: float = 3600.0,
+        sweep_on_insert: int = 2,
+    ) -> None:
+        if max_keys < 1:
+            raise ValueError("max_keys must be at least 1")
+        self.max_keys = max_keys
+        self.ttl_seconds = ttl_seconds
+        self._sweep_on_insert = sweep_on_insert
+        # key -> [last access, value, approximate size]
+        self._data: OrderedDict[Hashable, list[Any]] = OrderedDict()
+        self._bytes = 0
+        self._evicted = 0
+        self._expired = 0
+        self._sweeper: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and time.monotonic() - entry[0] <= self.ttl_seconds
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the value for a key and mark it as recently used."""
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        now = time.monotonic()
+        if now - entry[0] > self.ttl_seconds:
+            self._remove(key)
+            self._expired += 1
+            return default
+        entry[0] = now
+        self._data.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Insert or replace a value, evicting the least recently used key if full."""
+        now = time.monotonic()
+        entry = self._data.get(key)
+        size = sys.getsizeof(key) + sys.getsizeof(value) + _ENTRY_OVERHEAD
+        if entry is not None:
+            self._bytes += size - entry[2]
+            entry[:] = [now, value, size]
+            self._data.move_to_end(key)
+            return
+        if self._sweep_on_insert:
+            self.sweep(self._sweep_on_insert)
+        while len(self._data) >= self.max_keys:
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self._evicted += 1
+        self._data[key] = [now, value, size]
+        self._bytes += size
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove a key and return its value."""
+        if key not in self._data:
+            return default
+        return self._remove(key)
+
+    def _remove(self, key: Hashable) -> Any:
+        _, value, size = self._data.pop(key)
+        self._bytes -= size
+        return value
+
+    def sweep(self, max_items: int = 256) -> int:
+        """Expire up to ``max_items`` idle keys. Returns how many were removed."""
+        cutoff = time.monotonic() - self.ttl_seconds
+        removed = 0
+        while removed < max_items and self._data:
+            key, entry = next(iter(self._data.items()))
+            if entry[0] >= cutoff:
+                break
+            self._remove(key)
+            removed += 1
+        self._expired += removed
+        return removed
+
+    async def run_sweeper(self, interval: float = 1.0, batch: int = 256) -> None:
+        """Sweep expired keys forever, yielding to the event loop between batches."""
+        while True:
+            await asyncio.sleep(interval)
+            while self.sweep(batch) == batch:
+                await asyncio.sleep(0)
+
+    def start_sweeper(self, interval: float = 1.0, batch: int = 256) -> asyncio.Task:
+        """Start the background sweeper on the running event loop (idempotent)."""
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.get_running_loop().create_task(
+                self.run_sweeper(interval, batch)
+            )
+        return self._sweeper
+
+    def stop_sweeper(self) -> None:
+        """Cancel the background sweeper if it is running."""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+
+    def approx_bytes(self) -> int:
+        """Approximate memory held by the store, including the table itself."""
+        return sys.getsizeof(self._data) + self._bytes
+
+    def stats(self) -> dict[str, int]:
+        """Return live key count, approximate size and eviction counters."""
+        return {
+            "keys": len(self._data),
+            "max_keys": self.max_keys,
+            "approx_bytes": self.approx_bytes(),
+            "evicted": self._evicted,
+            "expired": self._expired,
+        }
@@ -0,0 +1,147 @@
+"""Local quota leasing in front of a shared rate limiter backend."""
+
+from __future__ import annotations
+
+import time
+from typing import Sequence
+
+from samma.sutra.key_store import KeyStore
+from samma.sutra.rate_limiter import (
+    AnyRateLimiterBackend,
+    SyncBackendAdapter,
+    acheck_many,
+    is_async_backend,
+)
+from samma.sutra.types import RateLimitCheck, RateLimitResult, resolve_batch
+
+# Lease state per key: [unspent units, expires at, central remaining after lease]
+_TOKENS, _EXPIRES, _CENTRAL_REMAINING = 0, 1, 2
+
+
+class LeasingBackend:
+    """
+    Caches blocks of quota leased from a shared backend (Redis, shared memory).
+
+    The first check on a key leases ``lease_fraction`` of its limit from the
+    central store in one call and spends it locally; the central store only
+    sees another call when the lease runs out or expires. Unspent units are
+    returned when an expired lease is next touched. This cuts central
+    traffic by roughly ``1 / lease_fraction``.
+
+    Leased units count as used centrally, so the global limit is never
+    exceeded. The trade-off is that up to ``workers * lease`` units can sit
+    unspent in other workers, so a key may be rejected slightly before the
+    global limit; ``lease_fraction`` and ``lease_seconds`` bound that error.
+    Near the limit, when a full lease is refused, the backend falls back to
+    spending exactly what the request needs.
+
+    Implements AsyncRateLimiterBackend; the central backend may be sync or async.
+    """
+
+    def __init__(
+        self,
+        central: AnyRateLimiterBackend,
+        lease_fraction: float = 0.1,
+        lease_seconds: float = 1.0,
+        store: KeyStore | None = None,
+    ) -> None:
+        if not 0 < lease_fraction <= 1:
+            raise ValueError("lease_fraction must be in (0, 1]")
+        self.central = central
+        self._central = central if is_async_backend(central) else SyncBackendAdapter(central)
+        self.lease_fraction = lease_fraction
+        self.lease_seconds = lease_seconds
+        self.store = store if store is not None else KeyStore(ttl_seconds=max(lease_seconds, 60.0))
+        self.central_calls = 0
+
+    def _lease_size(self, check: RateLimitCheck) -> int:
+        return max(1, int(check.limit * self.lease_fraction))
+
+    async def _central_many(
+        self, checks: Sequence[RateLimitCheck], all_or_nothing: bool = True
+    ) -> list[RateLimitResult]:
+        self.central_calls += 1
+        return await acheck_many(self.central, checks, all_or_nothing)
+
+    async def record_hit(self, key: str, window_seconds: int) -> int:
+        # Without a limit there is nothing to lease against
+        self.central_calls += 1
+        return await self._central.record_hit(key, window_seconds)
+
+    async def get_count(self, key: str, window_seconds: int) -> int:
+        self.central_calls += 1
+        count = await self._central.get_count(key, window_seconds)
+        lease = self.store.get(key)
+        if lease is not None and lease[_EXPIRES] > time.monotonic():
+            count -= lease[_TOKENS]
+        return max(0, count)
+
+    async def check_many(
+        self, checks: Sequence[RateLimitCheck], all_or_nothing: bool = True
+    ) -> list[RateLimitResult]:
+        now = time.monotonic()
+        leases: list[list | None] = []
+        releases = []
+        for check in checks:
+            lease = self.store.get(check.key)
+            if lease is not None and lease[_EXPIRES] <= now:
+                if lease[_TOKENS] > 0:
+                    releases.append(check._replace(cost=-lease[_TOKENS]))
+                self.store.pop(check.key)
+                lease = None
+            leases.append(lease)
+        if releases:
+            await self._central_many(releases, all_or_nothing=False)
+
+        # Lease more quota for every key that cannot cover its cost locally
+        short = [
+            i for i, (check, lease) in enumerate(zip(checks, leases))
+            if lease is None or lease[_TOKENS] < check.cost
+        ]
+        central: dict[int, RateLimitResult] = {}
+        if short:
+            held = [leases[i][_TOKENS] if leases[i] else 0 for i in short]
+            requests = [
+                checks[i]._replace(cost=max(self._lease_size(checks[i]), checks[i].cost - tokens))
+                for i, tokens in zip(short, held)
+            ]
+            granted = await self._central_many(requests, all_or_nothing)
+            if all_or_nothing:
+                if not all(result.allowed for result in granted):
+                    requests = [
+                        checks[i]._replace(cost=checks[i].cost - tokens)
+                        for i, tokens in zip(short, held)
+                    ]
+                    granted = await self._central_many(requests, all_or_nothing)
+            else:
+                # First-fail batches already recorded the leases granted before
+                # a denial; keep them and retry from the denied key at exact cost
+                while not granted[-1].allowed:
+                    k = len(granted) - 1
+                    exact = checks[short[k]].cost - held[k]
+                    if requests[k].cost == exact:
+                        break
+                    requests[k] = requests[k]._replace(cost=exact)
+                    granted = granted[:k] + await self._central_many(requests[k:], False)
+            # All-or-nothing batches record nothing unless every lease was granted
+            recorded = not all_or_nothing or all(result.allowed for result in granted)
+            for i, tokens, request, result in zip(short, held, requests, granted):
+                central[i] = result
+                if result.allowed and recorded:
+                    lease = [tokens + request.cost, now + self.lease_seconds, result.remaining]
+                    self.store.set(checks[i].key, lease)
+                    leases[i] = lease
+
+        results = []
+        for i, (check, lease) in enumerate(zip(checks, leases)):
+            if lease is None or lease[_TOKENS] < check.cost:
+                if i not in central:
+                    break  # not evaluated: a first-fail batch stopped before it
+                results.append(central[i])
+                continue
+            remaining = lease[_CENTRAL_REMAINING] + lease[_TOKENS] - check.cost
+            results.append(RateLimitResult(True, max(0, remaining), 0.0, check.limit))
+        results, commit = resolve_batch(results, all_or_nothing)
+        for check, lease in zip(checks[:commit], leases):
+            lease[_TOKENS] -= check.cost
+        return results
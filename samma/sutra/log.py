@@ -0,0 +1,192 @@
+"""Sampled, aggregated and non-blocking logging for the SUTRA gateway."""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import queue
+import random
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+logger = logging.getLogger("samma.sutra")
+
+EVENT_CLASSES = ("allowed", "rate_limited", "overloaded", "origin_denied", "ip_denied", "too_large", "tls")
+
+
+class LogSampler:
+    """
+    Decides per event whether to log it, by event class.
+
+    ``rates`` maps an event class (see ``EVENT_CLASSES``) to the fraction
+    of its events to log; classes not listed are always logged.
+    """
+
+    def __init__(self, rates: dict[str, float] | None = None) -> None:
+        rates = rates or {}
+        unknown = set(rates) - set(EVENT_CLASSES)
+        if unknown:
+            raise ValueError(f"Unknown log event classes: {sorted(unknown)}")
+        self.rates = {event: rates.get(event, 1.0) for event in EVENT_CLASSES}
+
+    def __call__(self, event: str) -> bool:
+        rate = self.rates[event]
+        return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks: records are dropped (and counted) when full."""
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Leave formatting to the writer thread instead of the event loop
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class QueueLogging:
+    """
+    Moves a logger's output onto a background writer thread.
+
+    Records go through a bounded queue to a QueueListener that feeds the
+    handlers the logger would otherwise have used (its own and its
+    ancestors', as configured at creation), so file and stream I/O never
+    runs on the event loop.
+    When the queue is full records are dropped and counted in
+    ``dropped`` rather than blocking the caller.
+    """
+
+    def __init__(self, target: logging.Logger, maxsize: int = 10_000) -> None:
+        self.logger = target
+        self.queue: queue.Queue = queue.Queue(maxsize)
+        self.handler = _DroppingQueueHandler(self.queue)
+        self.listener = QueueListener(
+            self.queue, *self._effective_handlers(target), respect_handler_level=True
+        )
+        self._propagate = target.propagate
+        self._own_handlers = list(target.handlers)
+
+    @staticmethod
+    def _effective_handlers(target: logging.Logger) -> list[logging.Handler]:
+        handlers = []
+        current: logging.Logger | None = target
+        while current is not None:
+            handlers += current.handlers
+            current = current.parent if current.propagate else None
+        return handlers or [logging.lastResort]
+
+    @property
+    def dropped(self) -> int:
+        return self.handler.dropped
+
+    def start(self) -> None:
+        for handler in self._own_handlers:
+            self.logger.removeHandler(handler)
+        self.logger.addHandler(self.handler)
+        self.logger.propagate = False
+        self.listener.start()
+
+    def stop(self) -> None:
+        """Flush queued records and restore the logger's own handlers."""
+        self.listener.stop()
+        self.logger.removeHandler(self.handler)
+        for handler in self._own_handlers:
+            self.logger.addHandler(handler)
+        self.logger.propagate = self._propagate
+
+
+_queue_logging: QueueLogging | None = None
+_queue_logging_lock = threading.Lock()
+
+
+def enable_queue_logging(maxsize: int = 10_000) -> QueueLogging:
+    """Route ``samma.sutra`` logs through a background thread; idempotent."""
+    global _queue_logging
+    with _queue_logging_lock:
+        if _queue_logging is None:
+            _queue_logging = QueueLogging(logger, maxsize)
+            _queue_logging.start()
+            atexit.register(_queue_logging.stop)
+        return _queue_logging
+
+
+def disable_queue_logging() -> None:
+    """Flush and stop the background writer started by ``enable_queue_logging``."""
+    global _queue_logging
+    with _queue_logging_lock:
+        if _queue_logging is not None:
+            _queue_logging.stop()
+            atexit.unregister(_queue_logging.stop)
+            _queue_logging = None
+
+
+class RejectionLog:
+    """
+    Logs rejections as one line per key per interval instead of per request.
+
+    The first rejection of a (reason, key) pair in an interval is logged
+    straight away; repeats are only counted and reported in a summary
+    line when the interval ends, which happens on the next rejection
+    after it. At most ``max_keys`` pairs are tracked per interval; the
+    rest are folded into one ``other`` count, so a flood of distinct keys
+    cannot grow memory or log volume. With ``interval_seconds=0`` every
+    rejection is logged.
+    """
+
+    def __init__(self, interval_seconds: float = 10.0, max_keys: int = 1000) -> None:
+        self.interval_seconds = interval_seconds
+        self.max_keys = max_keys
+        self._counts: dict[tuple[str, str], int] = {}
+        self._other = 0
+        self._interval_end = 0.0
+
+    def record(self, reason: str, key: object, detail: str, sampled: bool = True) -> None:
+        """
+        Count a rejection; ``detail`` is logged with the first one per interval.
+
+        Unsampled rejections still count towards the summary but never log
+        a line of their own.
+        """
+        if not self.interval_seconds:
+            if sampled:
+                logger.warning("SUTRA %s for %s (%s)", reason, key, detail)
+            return
+        now = time.monotonic()
+        if now >= self._interval_end:
+            self.flush()
+            self._interval_end = now + self.interval_seconds
+        pair = (reason, str(key))
+        count = self._counts.get(pair)
+        if count is not None:
+            self._counts[pair] = count + 1
+        elif len(self._counts) < self.max_keys:
+            self._counts[pair] = 1
+            if sampled:
+                logger.warning("SUTRA %s for %s (%s)", reason, key, detail)
+        else:
+            self._other += 1
+
+    def flush(self) -> None:
+        """Log a summary of repeated rejections and start a new interval."""
+        for (reason, key), count in self._counts.items():
+            if count > 1:
+                logger.warning(
+                    "SUTRA %s for %s: %d requests in the last %.0fs",
+                    reason, key, count, self.interval_seconds,
+                )
+        if self._other:
+            logger.warning(
+                "SUTRA %d more rejections from other keys in the last %.0fs",
+                self._other, self.interval_seconds,
+            )
+        self._counts.clear()
+        self._other = 0
@@ -1,48 +1,238 @@
-"""SUTRA middleware — Starlette BaseHTTPMiddleware for gateway enforcement."""
+"""SUTRA middleware — pure ASGI middleware for gateway enforcement."""
 
 from __future__ import annotations
 
+import json
 import logging
+import math
+import random
 import time
-from typing import Callable
+from typing import NamedTuple
 
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from samma.exceptions import OriginDeniedError, RateLimitExceededError, TLSRequiredError
-from samma.sutra.config import SUTRASettings
+from samma.exceptions import (
+    OriginDeniedError,
+    RateLimitExceededError,
+    RequestTooLargeError,
+    TLSRequiredError,
+)
+from samma.identity import (
+    RequestIdentity,
+    identity_headers,
+    set_identity,
+)
+from samma.sutra.body_limit import BodyLimit
+from samma.sutra.cidr import IPFilter
+from samma.sutra.concurrency import ConcurrencyLimiter
+from samma.sutra.config import RouteLimit, SUTRASettings
+from samma.sutra.cors import CORSPolicy
+from samma.sutra.gcra import GCRABackend
+from samma.sutra.ip import ip_key
+from samma.sutra.key_store import KeyStore
+from samma.sutra.leasing import LeasingBackend
+from samma.sutra.log import LogSampler, RejectionLog, enable_queue_logging
 from samma.sutra.origin_validator import OriginValidator
-from samma.sutra.rate_limiter import RateLimiter
+from samma.sutra.rate_limiter import (
+    AnyRateLimiterBackend,
+    RateLimitCheck,
+    RateLimiter,
+    RateLimitResult,
+    SlidingWindowCounterBackend,
+    acheck_many,
+)
+from samma.sutra.redis_backend import AsyncRedisBackend
+from samma.sutra.routes import PathMatcher, RouteMatcher
+from samma.sutra.shm_backend import SharedMemoryBackend
+from samma.sutra.sketch import SketchBackend
 from samma.sutra.tls_checker import TLSChecker
+from samma.sutra.tracing import PipelineTracer, Trace
 
 logger = logging.getLogger("samma.sutra")
 
+_LAYER_HEADER = (b"x-samma-layer", b"sutra")
 
-class SUTRAMiddleware(BaseHTTPMiddleware):
+
+class _Rejection(NamedTuple):
+    """A rejection (or preflight answer) rendered to bytes once, at import."""
+
+    status: int
+    body: bytes
+    headers: list[tuple[bytes, bytes]]
+
+
+def _render(status: int, detail: str) -> _Rejection:
+    body = json.dumps(
+        {"detail": detail, "layer": "sutra"}, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+    return _Rejection(status, body, [
+        (b"content-length", str(len(body)).encode("latin-1")),
+        (b"content-type", b"application/json"),
+        _LAYER_HEADER,
+    ])
+
+
+# The origin is the only variable part of an origin rejection; it is JSON-escaped
+# and spliced between these two pre-rendered halves of the body
+_ORIGIN_PREFIX, _ORIGIN_SUFFIX = _render(403, "Origin not allowed: \0").body.split(b"\\u0000")
+
+
+def _origin_denied(origin: str) -> _Rejection:
+    escaped = json.dumps(origin, ensure_ascii=False)[1:-1].encode("utf-8")
+    body = b"".join((_ORIGIN_PREFIX, escaped, _ORIGIN_SUFFIX))
+    return _Rejection(403, body, [
+        (b"content-length", str(len(body)).encode("latin-1")),
+        (b"content-type", b"application/json"),
+        _LAYER_HEADER,
+    ])
+
+
+_HTTPS_REQUIRED = _render(403, "HTTPS required")
+_IP_DENIED = _render(403, "IP address denied")
+_CORS_DENIED = _render(400, "CORS preflight not allowed")
+_PREFLIGHT = _Rejection(204, b"", [_LAYER_HEADER])
+_RATE_LIMITED = {
+    detail: _render(429, detail)
+    for detail in (
+        "Rate limit exceeded",
+        "Agent rate limit exceeded",
+        "Tenant rate limit exceeded",
+        "Global rate limit exceeded",
+        "Route rate limit exceeded",
+    )
+}
+_TOO_LARGE = _render(413, "Request body too large")
+_OVERLOADED = _render(503, "Server overloaded")
+_OVERLOADED_HEADERS = [(b"retry-after", b"1")]
+
+
+# WebSocket close codes for rejections when the server cannot send an HTTP denial
+_WS_POLICY_VIOLATION = 1008
+_WS_TRY_AGAIN_LATER = 1013
+
+
+class SUTRAMiddleware:
     """
     SUTRA Gateway Middleware.
 
     Performs origin validation, rate limiting, and TLS checking
-    on every request (except excluded paths).
+    on every HTTP request and WebSocket handshake (except excluded paths).
+
+    Implemented as raw ASGI: checks read the scope's headers directly and
+    reject before any Request object is built. Accepted responses pass
+    through untouched apart from headers added to ``http.response.start``,
+    so streamed bodies (SSE, large downloads) are never buffered or copied.
     """
 
-    def __init__(self, app, settings: SUTRASettings | None = None) -> None:
-        super().__init__(app)
+    def __init__(
+        self,
+        app: ASGIApp,
+        settings: SUTRASettings | None = None,
+        tracing: PipelineTracer | None = None,
+        ip_filter: IPFilter | None = None,
+    ) -> None:
+        self.app = app
         self.settings = settings or SUTRASettings()
+        # Pass a shared IPFilter to reload the lists of a running middleware
+        self.ip_filter = ip_filter or IPFilter(
+            self.settings.ip_allow, self.settings.ip_deny, self.settings.trusted_proxies
+        )
+        # Stage timing is skipped entirely unless a tracer or histograms are configured
+        if tracing is None and self.settings.trace_latency_histograms:
+            tracing = PipelineTracer(sample_rate=self.settings.trace_sample_rate)
+        self.tracing = tracing
         self.origin_validator = OriginValidator(self.settings.allowed_origins)
+        self.cors = None
+        if self.settings.cors_enabled:
+            self.cors = CORSPolicy(
+                allow_methods=self.settings.cors_allow_methods,
+                allow_headers=self.settings.cors_allow_headers,
+                allow_credentials=self.settings.cors_allow_credentials,
+                max_age=self.settings.cors_max_age,
+                allow_all_origins=self.origin_validator.allow_all,
+            )
+        # IP and agent keys are prefixed, so both limiters can share one backend
+        self.key_store: KeyStore | None = None
+        self._backend = backend = self._build_backend()
+        # Leasing only pays off in front of a shared (Redis/shared-memory) store
+        if self.settings.rate_limit_lease_fraction and self.key_store is None:
+            self._backend = backend = LeasingBackend(
+                backend,
+                lease_fraction=self.settings.rate_limit_lease_fraction,
+                lease_seconds=self.settings.rate_limit_lease_seconds,
+            )
+        # Under floods of distinct IPs, per-IP state can live in fixed memory instead
+        self._ip_backend = self._backend
+        if self.settings.rate_limit_ip_sketch_mb:
+            if self.settings.rate_limit_algorithm == "gcra":
+                raise ValueError("rate_limit_ip_sketch_mb requires the sliding_window algorithm")
+            self._ip_backend = SketchBackend(
+                memory_mb=self.settings.rate_limit_ip_sketch_mb,
+                top_k=self.settings.rate_limit_ip_sketch_top_k,
+            )
         self.ip_limiter = RateLimiter(
             max_requests=self.settings.rate_limit_per_ip,
             window_seconds=self.settings.rate_limit_window_seconds,
+            backend=self._ip_backend,
+            algorithm=self.settings.rate_limit_algorithm,
+            burst=self.settings.rate_limit_burst_per_ip,
         )
         self.agent_limiter = RateLimiter(
             max_requests=self.settings.rate_limit_per_agent,
             window_seconds=self.settings.rate_limit_window_seconds,
+            backend=backend,
+            algorithm=self.settings.rate_limit_algorithm,
+            burst=self.settings.rate_limit_burst_per_agent,
         )
+        # Optional outer scopes: global > tenant > agent > IP
+        self.tenant_limiter = self._scope_limiter(self.settings.rate_limit_per_tenant)
+        self.global_limiter = self._scope_limiter(self.settings.rate_limit_global)
+        self.concurrency = None
+        if self.settings.concurrency_limit or self.settings.concurrency_per_agent:
+            target = self.settings.concurrency_latency_target_ms
+            self.concurrency = ConcurrencyLimiter(
+                max_limit=self.settings.concurrency_limit,
+                min_limit=min(
+                    self.settings.concurrency_min_limit,
+                    self.settings.concurrency_limit or self.settings.concurrency_min_limit,
+                ),
+                per_agent=self.settings.concurrency_per_agent,
+                adaptive=self.settings.concurrency_adaptive,
+                latency_target=target / 1000 if target is not None else None,
+                queue_size=self.settings.concurrency_queue_size,
+                queue_timeout=self.settings.concurrency_queue_timeout_ms / 1000,
+            )
+        self.rejection_log = RejectionLog(self.settings.rejection_log_interval_seconds)
+        self.excluded_paths = PathMatcher(self.settings.excluded_paths)
+        self.route_matcher = RouteMatcher(self.settings.route_limits)
+        self.route_limiters = [
+            (self._scope_limiter(rule.per_ip), self._scope_limiter(rule.per_agent))
+            for rule in self.settings.route_limits
+        ]
+        self.route_body_limits = [
+            rule.max_body_bytes if rule.max_body_bytes is not None else self.settings.max_body_bytes
+            for rule in self.settings.route_limits
+        ]
+        self.queue_logging = None
+        if self.settings.log_queue_size:
+            self.queue_logging = enable_queue_logging(self.settings.log_queue_size)
+        self.log_sampler = LogSampler(self.settings.log_sample_rates)
         self.tls_checker = TLSChecker(
             enforce=self.settings.tls_enforce,
             warn=self.settings.tls_warn,
+            warn_sample_rate=self.log_sampler.rates["tls"],
         )
+        # The tenant header is this instance's own; agent headers are shared with DHARMA
+        self._tenant_header = self.settings.tenant_header.lower().encode("latin-1")
+        # Lowercase header names the checks read, matched against raw ASGI headers;
+        # identity headers are added in _headers(), agent headers from the shared configuration
+        self._base_headers = frozenset((
+            b"origin", b"x-forwarded-for", b"x-forwarded-proto", b"content-length",
+            b"access-control-request-method", b"access-control-request-headers",
+        ))
+        self._identity_headers = None
+        self._identity_raw = ()
+        self._wanted_headers = self._base_headers
         logger.info(
             "SUTRA middleware initialized (rate_limit=%d/%ds, origins=%s)",
             self.settings.rate_limit_per_ip,
@@ -50,99 +240,427 @@ class SUTRAMiddleware(BaseHTTPMiddleware):
             len(self.settings.allowed_origins),
         )
 
-    def _get_client_ip(self, request: Request) -> str:
-        forwarded = request.headers.get("x-forwarded-for")
-        if forwarded:
-            return forwarded.split(",")[0].strip()
-        return request.client.host if request.client else "unknown"
+    def _scope_limiter(self, max_requests: int | None) -> RateLimiter | None:
+        if max_requests is None:
+            return None
+        return RateLimiter(
+            max_requests=max_requests,
+            window_seconds=self.settings.rate_limit_window_seconds,
+            backend=self._backend,
+            algorithm=self.settings.rate_limit_algorithm,
+        )
+
+    def _build_backend(self) -> AnyRateLimiterBackend | GCRABackend:
+        gcra = self.settings.rate_limit_algorithm == "gcra"
+        if gcra and (self.settings.rate_limit_redis_url or self.settings.rate_limit_shm_path):
+            raise ValueError("rate_limit_algorithm='gcra' requires the in-memory backend")
+        if self.settings.rate_limit_redis_url:
+            return AsyncRedisBackend(
+                url=self.settings.rate_limit_redis_url,
+                prefix=self.settings.rate_limit_redis_prefix,
+            )
+        if self.settings.rate_limit_shm_path:
+            return SharedMemoryBackend(
+                self.settings.rate_limit_shm_path,
+                slots=self.settings.rate_limit_shm_slots,
+            )
+        window = self.settings.rate_limit_window_seconds
+        ttl = self.settings.rate_limit_key_ttl_seconds
+        if not ttl:
+            windows = 2.0
+            if gcra:
+                # A GCRA key's theoretical arrival time can sit up to burst / rate
+                # windows ahead; dropping it sooner would hand back the full burst
+                settings = self.settings
+                windows = max(
+                    windows,
+                    (settings.rate_limit_burst_per_ip or settings.rate_limit_per_ip)
+                    / settings.rate_limit_per_ip,
+                    (settings.rate_limit_burst_per_agent or settings.rate_limit_per_agent)
+                    / settings.rate_limit_per_agent,
+                )
+            ttl = windows * window
+        self.key_store = KeyStore(max_keys=self.settings.rate_limit_max_keys, ttl_seconds=ttl)
+        if gcra:
+            return GCRABackend(store=self.key_store)
+        return SlidingWindowCounterBackend(store=self.key_store)
+
+    def _headers(self, scope: Scope) -> dict[bytes, str]:
+        """Decode only the request headers SUTRA reads; the first occurrence wins."""
+        configured = identity_headers()
+        if configured is not self._identity_headers:
+            self._identity_headers = configured
+            self._identity_raw = (*configured.raw[:2], self._tenant_header)
+            self._wanted_headers = self._base_headers.union(self._identity_raw)
+        wanted = self._wanted_headers
+        headers: dict[bytes, str] = {}
+        for name, value in scope["headers"]:
+            if name in wanted and name not in headers:
+                headers[name] = value.decode("latin-1")
+        return headers
+
+    def _get_client_ip(self, scope: Scope, headers: dict[bytes, str]) -> str:
+        client = scope.get("client")
+        return self.ip_filter.client_ip(
+            client[0] if client else None, headers.get(b"x-forwarded-for")
+        )
 
     def _is_excluded(self, path: str) -> bool:
-        return path in self.settings.excluded_paths
+        return self.excluded_paths.matches(path)
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        start = time.monotonic()
-        path = request.url.path
+    def _rate_limit_headers(self, result: RateLimitResult) -> list[tuple[bytes, bytes]]:
+        retry_after = result.retry_after
+        if self.settings.rate_limit_retry_jitter_seconds:
+            # Spread retries from a throttled fleet instead of releasing them at once
+            retry_after += random.uniform(0, self.settings.rate_limit_retry_jitter_seconds)
+        return [
+            (b"retry-after", str(math.ceil(retry_after)).encode("latin-1")),
+            (b"x-ratelimit-limit", str(result.limit).encode("latin-1")),
+            (b"x-ratelimit-reset", str(math.ceil(result.reset_after)).encode("latin-1")),
+        ]
+
+    @staticmethod
+    async def _reject(
+        scope: Scope, send: Send, rejection: _Rejection, extra: list | None = None
+    ) -> None:
+        """Send a pre-rendered rejection (or preflight answer), plus any per-request headers."""
+        headers = [*rejection.headers, *extra] if extra else [*rejection.headers]
+        if scope["type"] == "http":
+            await send({
+                "type": "http.response.start",
+                "status": rejection.status,
+                "headers": headers,
+            })
+            await send({"type": "http.response.body", "body": rejection.body})
+        elif "websocket.http.response" in scope.get("extensions", {}):
+            await send({
+                "type": "websocket.http.response.start",
+                "status": rejection.status,
+                "headers": headers,
+            })
+            await send({"type": "websocket.http.response.body", "body": rejection.body})
+        else:
+            code = _WS_POLICY_VIOLATION if rejection.status == 403 else _WS_TRY_AGAIN_LATER
+            await send({"type": "websocket.close", "code": code})
+
+    async def _check_split(self, checks: list) -> list[RateLimitResult]:
+        """Check the IP in its own backend first, then the rest; undo the IP hit if they fail."""
+        results = await acheck_many(self._ip_backend, checks[:1])
+        if len(checks) == 1 or not results[0].allowed:
+            return results
+        results += await acheck_many(self._backend, checks[1:])
+        if not all(result.allowed for result in results[1:]):
+            await acheck_many(self._ip_backend, [checks[0]._replace(cost=-checks[0].cost)])
+        return results
+
+    async def _rate_limit(
+        self,
+        scope: Scope,
+        send: Send,
+        client_ip: str,
+        identity: RequestIdentity,
+        route: tuple[int, RouteLimit] | None,
+        cors_headers: list[tuple[bytes, bytes]] | None,
+        trace: Trace | None,
+    ) -> tuple[list[tuple[bytes, bytes]], list[RateLimitCheck]] | None:
+        """
+        Apply every rate limit; return the response headers and the checks
+        that were recorded, or None once rejected.
+        """
+        path = scope["path"]
+        agent_id = identity.agent_id
+        # Every scope that applies (IP, agent, tenant, global, then
+        # route-specific limits), weighted by the matching route's cost and
+        # evaluated in one backend call. Nothing is recorded unless all
+        # pass; the first failing scope is reported.
+        ip = ip_key(
+            client_ip, self.settings.rate_limit_ipv4_prefix, self.settings.rate_limit_ipv6_prefix
+        )
+        tenant_id = identity.tenant_id
+        cost = route[1].cost if route else 1
+        # (limiter, key, cost, rejection detail, remaining header name)
+        scopes = [(
+            self.ip_limiter, ip, cost,
+            "Rate limit exceeded", b"x-ratelimit-remaining",
+        )]
+        if agent_id:
+            scopes.append((
+                self.agent_limiter, f"agent:{agent_id}", cost,
+                "Agent rate limit exceeded", b"x-ratelimit-agent-remaining",
+            ))
+        if tenant_id and self.tenant_limiter:
+            scopes.append((
+                self.tenant_limiter, f"tenant:{tenant_id}", cost,
+                "Tenant rate limit exceeded", b"x-ratelimit-tenant-remaining",
+            ))
+        if self.global_limiter:
+            scopes.append((
+                self.global_limiter, "global", cost,
+                "Global rate limit exceeded", b"x-ratelimit-global-remaining",
+            ))
+        if route:
+            index = route[0]
+            route_ip, route_agent = self.route_limiters[index]
+            if route_ip:
+                scopes.append((
+                    route_ip, f"route:{index}:ip:{ip}", 1,
+                    "Route rate limit exceeded", None,
+                ))
+            if route_agent and agent_id:
+                scopes.append((
+                    route_agent, f"route:{index}:agent:{agent_id}", 1,
+                    "Route rate limit exceeded", None,
+                ))
+        checks = [limiter.limit_for(key, units) for limiter, key, units, _, _ in scopes]
+        if self._ip_backend is self._backend:
+            results = await acheck_many(self._backend, checks)
+        else:
+            results = await self._check_split(checks)
+        if trace:
+            trace.mark("rate_limit")
+        for (_, key, _, detail, _), result in zip(scopes, results):
+            if not result.allowed:
+                self.rejection_log.record(
+                    "rate limit exceeded",
+                    client_ip if key is ip else key,
+                    path,
+                    self.log_sampler("rate_limited"),
+                )
+                extra = self._rate_limit_headers(result)
+                if cors_headers:
+                    # Lets browser code see the 429 instead of a CORS failure
+                    extra += cors_headers
+                await self._reject(scope, send, _RATE_LIMITED[detail], extra)
+                return None
+
+        # Headers added as the response starts
+        extra = [_LAYER_HEADER]
+        for (_, _, _, _, header), result in zip(scopes, results):
+            if header:
+                extra.append((header, str(result.remaining).encode("latin-1")))
+        reset = math.ceil(results[0].reset_after)
+        extra.append((b"x-ratelimit-reset", str(reset).encode("latin-1")))
+        return extra, checks
+
+    async def _refund(self, checks: list[RateLimitCheck]) -> None:
+        """Return the units recorded for a request that never reached the app."""
+        refunds = [check._replace(cost=-check.cost) for check in checks]
+        if self._ip_backend is self._backend:
+            await acheck_many(self._backend, refunds, all_or_nothing=False)
+            return
+        await acheck_many(self._ip_backend, refunds[:1], all_or_nothing=False)
+        if len(refunds) > 1:
+            await acheck_many(self._backend, refunds[1:], all_or_nothing=False)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        if self.key_store is not None:
+            self.key_store.start_sweeper()
 
         # Skip excluded paths
-        if self._is_excluded(path):
-            response = await call_next(request)
-            response.headers["X-Samma-Layer"] = "sutra"
-            return response
+        if self._is_excluded(scope["path"]):
+            await self.app(scope, receive, self._send_with_headers(send, [_LAYER_HEADER]))
+            return
+
+        trace = self.tracing.begin() if self.tracing is not None else None
+        if trace is None:
+            await self._dispatch(scope, receive, send, None)
+            return
+        try:
+            await self._dispatch(scope, receive, send, trace)
+        finally:
+            trace.end()
 
-        client_ip = self._get_client_ip(request)
-        origin = request.headers.get("origin")
-        agent_id = request.headers.get("x-agent-id")
+    async def _dispatch(
+        self, scope: Scope, receive: Receive, send: Send, trace: Trace | None
+    ) -> None:
+        start = time.monotonic()
+        path = scope["path"]
+        headers = self._headers(scope)
+        client_ip = self._get_client_ip(scope, headers)
+        origin = headers.get(b"origin")
+        # Resolved once here; DHARMA and the app read it back from scope state
+        agent_header, agent_type_header, tenant_header = self._identity_raw
+        identity = RequestIdentity(
+            headers.get(agent_header), headers.get(agent_type_header), headers.get(tenant_header)
+        )
+        set_identity(scope, identity)
+        agent_id = identity.agent_id
+        method = scope.get("method", "GET")
+        if trace:
+            trace.mark("headers")
+
+        # 1. IP allow/deny lists
+        allowlisted = False
+        if self.ip_filter.active:
+            client = scope.get("client")
+            decision = self.ip_filter.check_client(client[0] if client else None, client_ip)
+            if decision is False:
+                self.rejection_log.record(
+                    "ip denied", client_ip, path, self.log_sampler("ip_denied")
+                )
+                await self._reject(scope, send, _IP_DENIED)
+                return
+            allowlisted = bool(decision)
 
-        # 1. TLS check
+        # 2. TLS check
         try:
             self.tls_checker.check(
-                scheme=str(request.url.scheme),
-                forwarded_proto=request.headers.get("x-forwarded-proto"),
+                scheme=scope.get("scheme", "http").replace("ws", "http", 1),
+                forwarded_proto=headers.get(b"x-forwarded-proto"),
             )
         except TLSRequiredError:
-            return JSONResponse(
-                status_code=403,
-                content={"detail": "HTTPS required", "layer": "sutra"},
-            )
+            await self._reject(scope, send, _HTTPS_REQUIRED)
+            return
+        if trace:
+            trace.mark("tls")
 
-        # 2. Origin validation
+        # 3. Origin validation
         try:
             self.origin_validator.validate(origin)
         except OriginDeniedError:
-            logger.warning("SUTRA origin denied: %s from %s", origin, client_ip)
-            return JSONResponse(
-                status_code=403,
-                content={"detail": f"Origin not allowed: {origin}", "layer": "sutra"},
+            self.rejection_log.record(
+                "origin denied", client_ip, origin, self.log_sampler("origin_denied")
             )
+            await self._reject(scope, send, _origin_denied(origin))
+            return
+        if trace:
+            trace.mark("origin")
+
+        # CORS — preflights are answered here, without rate limits or the app
+        cors_headers = None
+        if self.cors is not None and origin is not None and scope["type"] == "http":
+            request_method = headers.get(b"access-control-request-method")
+            if method == "OPTIONS" and request_method:
+                answer = self.cors.preflight(
+                    origin, request_method, headers.get(b"access-control-request-headers")
+                )
+                if answer is None:
+                    await self._reject(scope, send, _CORS_DENIED)
+                else:
+                    await self._reject(scope, send, _PREFLIGHT, answer)
+                return
+            cors_headers = self.cors.origin_headers(origin)
+
+        route = self.route_matcher.match(method, path)
 
-        # 3. Rate limiting (per-IP)
-        ip_allowed, ip_remaining = self.ip_limiter.check(f"ip:{client_ip}")
-        if not ip_allowed:
-            logger.warning("SUTRA rate limit exceeded for IP %s on %s", client_ip, path)
-            return JSONResponse(
-                status_code=429,
-                content={"detail": "Rate limit exceeded", "layer": "sutra"},
-                headers={
-                    "Retry-After": str(self.settings.rate_limit_window_seconds),
-                    "X-Samma-Layer": "sutra",
-                },
+        # Body size — a declared Content-Length over the limit is rejected
+        # before the body is read (or a 100 Continue sent); bodies without a
+        # well-formed one are counted as the app reads them
+        stream_limit = None
+        if scope["type"] == "http":
+            limit = self.route_body_limits[route[0]] if route else self.settings.max_body_bytes
+            if limit is not None:
+                length = headers.get(b"content-length")
+                if length is None or not length.isdigit():
+                    # No usable declared size: count the body as it arrives
+                    stream_limit = limit
+                elif int(length) > limit:
+                    self.rejection_log.record(
+                        "body too large", client_ip, path, self.log_sampler("too_large")
+                    )
+                    await self._reject(scope, send, _TOO_LARGE, cors_headers)
+                    return
+
+        # 4. Rate limiting, unless the client is in an allowlisted network
+        if allowlisted:
+            extra, recorded = [_LAYER_HEADER], []
+        else:
+            limited = await self._rate_limit(
+                scope, send, client_ip, identity, route, cors_headers, trace
             )
+            if limited is None:
+                return
+            extra, recorded = limited
+        if cors_headers:
+            extra += cors_headers
 
-        # 4. Rate limiting (per-agent, if agent header present)
-        agent_remaining = None
-        if agent_id:
-            agent_allowed, agent_remaining = self.agent_limiter.check(f"agent:{agent_id}")
-            if not agent_allowed:
-                logger.warning("SUTRA rate limit exceeded for agent %s", agent_id)
-                return JSONResponse(
-                    status_code=429,
-                    content={"detail": "Agent rate limit exceeded", "layer": "sutra"},
-                    headers={
-                        "Retry-After": str(self.settings.rate_limit_window_seconds),
-                        "X-Samma-Layer": "sutra",
-                    },
-                )
+        # Status and time.monotonic() of the response start
+        status = [None, None]
+        wrapped = self._send_with_headers(send, extra, status)
+        body_limit = None
+        if stream_limit is not None:
 
-        # Process request
-        response = await call_next(request)
+            async def too_large() -> None:
+                status[0] = _TOO_LARGE.status
+                self.rejection_log.record(
+                    "body too large", client_ip, path, self.log_sampler("too_large")
+                )
+                await self._reject(scope, send, _TOO_LARGE, cors_headers)
 
-        # Response headers
-        duration_ms = (time.monotonic() - start) * 1000
-        response.headers["X-Samma-Layer"] = "sutra"
-        response.headers["X-RateLimit-Remaining"] = str(ip_remaining)
-        if agent_remaining is not None:
-            response.headers["X-RateLimit-Agent-Remaining"] = str(agent_remaining)
+            body_limit = BodyLimit(stream_limit, receive, wrapped, too_large)
+        # 5. Concurrency limit — HTTP only; WebSocket sessions are long-lived
+        concurrency = self.concurrency if scope["type"] == "http" else None
+        if concurrency is None:
+            await self._call_app(scope, receive, wrapped, body_limit)
+        else:
+            if not await concurrency.acquire(agent_id):
+                self.rejection_log.record(
+                    "overloaded", client_ip, path, self.log_sampler("overloaded")
+                )
+                # Shed requests do not count against the client's rate limits
+                if recorded:
+                    await self._refund(recorded)
+                await self._reject(scope, send, _OVERLOADED, _OVERLOADED_HEADERS)
+                return
+            if trace:
+                trace.mark("concurrency")
+            started = time.monotonic()
+            try:
+                await self._call_app(scope, receive, wrapped, body_limit)
+            finally:
+                # Latency to the first response byte; streamed bodies don't count
+                concurrency.release(agent_id, started, status[1])
+        if trace:
+            trace.mark("app")
 
         # Request logging
-        if self.settings.log_requests:
+        if self.settings.log_requests and self.log_sampler("allowed"):
             logger.info(
-                "SUTRA %s %s [%s] origin=%s status=%d %.1fms",
-                request.method,
+                "SUTRA %s %s [%s] origin=%s status=%s %.1fms",
+                method,
                 path,
                 client_ip,
                 origin or "-",
-                response.status_code,
-                duration_ms,
+                status[0],
+                (time.monotonic() - start) * 1000,
             )
 
-        return response
+    async def _call_app(
+        self, scope: Scope, receive: Receive, send: Send, body_limit: BodyLimit | None
+    ) -> None:
+        """Run the app, answering 413 if it reads past the body limit before responding."""
+        if body_limit is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, body_limit.receive, body_limit.send)
+        except RequestTooLargeError:
+            # Too late for a 413 once the app has started its own response
+            if body_limit.started:
+                raise
+        if body_limit.exceeded:
+            await body_limit.respond()
+
+    @staticmethod
+    def _send_with_headers(
+        send: Send, extra: list[tuple[bytes, bytes]], status: list | None = None
+    ) -> Send:
+        """
+        Wrap ``send`` to append headers to the response start; bodies pass through as-is.
+
+        ``status``, if given, receives the response status and the
+        ``time.monotonic()`` at which the response started.
+        """
+
+        async def wrapped(message: Message) -> None:
+            if message["type"] in ("http.response.start", "websocket.accept"):
+                message["headers"] = [*message.get("headers", ()), *extra]
+                if status is not None:
+                    status[0] = message.get("status", 101)
+                    status[1] = time.monotonic()
+            await send(message)
+
+        return wrapped
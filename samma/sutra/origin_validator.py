@@ -3,27 +3,80 @@
 from __future__ import annotations
 
 import fnmatch
+import functools
+import re
 
 from samma.exceptions import OriginDeniedError
 
+_WILDCARDS = "*?["
+_END = ""  # marks a complete suffix in the trie; never a domain label of a pattern
+
 
 class OriginValidator:
-    """Validates request origins against an allowlist with glob patterns."""
+    """
+    Validates request origins against an allowlist with glob patterns.
+
+    Patterns keep ``fnmatch`` semantics but are compiled at init: exact
+    origins go into a set, ``<scheme>://*.<domain>`` forms into a trie of
+    reversed domain labels per scheme, and any other glob into one combined
+    regex. Recent decisions are kept in an LRU of ``cache_size`` entries, so
+    a check costs about the same however long the allowlist is.
+    """
 
-    def __init__(self, allowed_origins: list[str]) -> None:
+    def __init__(self, allowed_origins: list[str], cache_size: int = 1024) -> None:
         self._patterns = allowed_origins
+        self.allow_all = "*" in allowed_origins
+        exact = set()
+        # prefix before the "*" ("https://", or "" for bare "*.example.com")
+        # -> trie of the suffix's domain labels, last label first
+        self._suffixes: dict[str, dict] = {}
+        globs = []
+        for pattern in allowed_origins:
+            prefix, star, domain = pattern.partition("*.")
+            if not any(c in pattern for c in _WILDCARDS):
+                exact.add(pattern)
+            elif (
+                star
+                and (not prefix or prefix.endswith("://"))
+                and not any(c in prefix + domain for c in _WILDCARDS)
+            ):
+                node = self._suffixes.setdefault(prefix, {})
+                for label in reversed(domain.split(".")):
+                    node = node.setdefault(label, {})
+                node[_END] = True
+            else:
+                globs.append(fnmatch.translate(pattern))
+        self._exact = frozenset(exact)
+        self._glob = re.compile("|".join(globs)) if globs else None
+        self._cached_match = functools.lru_cache(maxsize=cache_size)(self._match)
+
+    def _has_suffix(self, origin: str) -> bool:
+        for prefix, trie in self._suffixes.items():
+            if not origin.startswith(prefix):
+                continue
+            labels = origin[len(prefix):].split(".")
+            node = trie
+            # The "*" must cover at least one label, possibly empty
+            for depth in range(len(labels) - 1, 0, -1):
+                node = node.get(labels[depth])
+                if node is None:
+                    break
+                if _END in node:
+                    return True
+        return False
 
-    @property
-    def allow_all(self) -> bool:
-        return "*" in self._patterns
+    def _match(self, origin: str) -> bool:
+        if origin in self._exact:
+            return True
+        if self._suffixes and self._has_suffix(origin):
+            return True
+        return self._glob is not None and self._glob.match(origin) is not None
 
     def is_allowed(self, origin: str | None) -> bool:
         """Check if an origin is allowed. None origin (no header) is allowed."""
-        if origin is None:
-            return True
-        if self.allow_all:
+        if origin is None or self.allow_all:
             return True
-        return any(fnmatch.fnmatch(origin, pat) for pat in self._patterns)
+        return self._cached_match(origin)
 
     def validate(self, origin: str | None) -> None:
         """Raise OriginDeniedError if origin is not allowed."""
@@ -1,14 +1,32 @@
-"""In-memory sliding window rate limiter with pluggable backend."""
+"""In-memory sliding window and GCRA rate limiter with pluggable backend."""
 
 from __future__ import annotations
 
+import asyncio
+import inspect
+import threading
 import time
-from collections import defaultdict
-from typing import Protocol
+from contextlib import ExitStack
+from typing import Callable, Iterable, Protocol, Sequence, Union
+
+from samma.sutra.gcra import GCRABackend
+from samma.sutra.key_store import KeyStore
+from samma.sutra.types import (
+    RateLimitCheck,
+    RateLimitResult,
+    resolve_batch,
+    result_from_count,
+    result_from_window,
+)
 
 
 class RateLimiterBackend(Protocol):
-    """Protocol for pluggable rate limiter backends (Redis, etc.)."""
+    """
+    Protocol for pluggable rate limiter backends (Redis, etc.).
+
+    Backends may also implement ``check_many(checks, all_or_nothing)`` to
+    evaluate several limits in one operation; see ``check_many`` below.
+    """
 
     def record_hit(self, key: str, window_seconds: int) -> int:
         """Record a hit and return the current count within the window."""
@@ -19,56 +37,467 @@ class RateLimiterBackend(Protocol):
         ...
 
 
+class AsyncRateLimiterBackend(Protocol):
+    """Protocol for backends that do network I/O and must not block the event loop."""
+
+    async def record_hit(self, key: str, window_seconds: int) -> int:
+        """Record a hit and return the current count within the window."""
+        ...
+
+    async def get_count(self, key: str, window_seconds: int) -> int:
+        """Return current count within the window without recording."""
+        ...
+
+
+def is_async_backend(backend: object) -> bool:
+    """Return True if the backend implements AsyncRateLimiterBackend."""
+    return inspect.iscoroutinefunction(getattr(backend, "record_hit", None))
+
+
+class SyncBackendAdapter:
+    """
+    Exposes a synchronous backend through AsyncRateLimiterBackend.
+
+    In-memory backends are called inline, which is cheaper than a thread
+    hop. Set ``offload=True`` for sync backends that block (a sync Redis
+    client, a database) so their calls run in the default thread pool.
+    """
+
+    def __init__(self, backend: RateLimiterBackend, offload: bool = False) -> None:
+        self.backend = backend
+        self.offload = offload
+
+    async def record_hit(self, key: str, window_seconds: int) -> int:
+        if self.offload:
+            return await asyncio.to_thread(self.backend.record_hit, key, window_seconds)
+        return self.backend.record_hit(key, window_seconds)
+
+    async def get_count(self, key: str, window_seconds: int) -> int:
+        if self.offload:
+            return await asyncio.to_thread(self.backend.get_count, key, window_seconds)
+        return self.backend.get_count(key, window_seconds)
+
+    async def check_many(
+        self, checks: Sequence[RateLimitCheck], all_or_nothing: bool = True
+    ) -> list[RateLimitResult]:
+        if self.offload:
+            return await asyncio.to_thread(check_many, self.backend, checks, all_or_nothing)
+        return check_many(self.backend, checks, all_or_nothing)
+
+
 class InMemoryBackend:
     """Sliding window rate limiter using in-memory timestamps."""
 
-    def __init__(self) -> None:
-        self._hits: dict[str, list[float]] = defaultdict(list)
+    def __init__(self, store: KeyStore | None = None) -> None:
+        self.store = store if store is not None else KeyStore()
 
-    def _prune(self, key: str, window_seconds: int) -> None:
+    def _prune(self, key: str, window_seconds: int) -> list[float]:
         cutoff = time.monotonic() - window_seconds
-        self._hits[key] = [t for t in self._hits[key] if t > cutoff]
+        return [t for t in self.store.get(key, ()) if t > cutoff]
+
+    @staticmethod
+    def _result(check: RateLimitCheck, hits: list[float], now: float) -> RateLimitResult:
+        window = check.window_seconds
+        count = len(hits) + check.cost
+        if count <= check.limit:
+            last = now if check.cost > 0 else (hits[-1] if hits else now - window)
+            return RateLimitResult(
+                True, check.limit - count, 0.0, check.limit, max(0.0, last + window - now)
+            )
+        reset = hits[-1] + window - now if hits else 0.0
+        if check.cost > check.limit:
+            return RateLimitResult(False, 0, float(window), check.limit, reset)
+        # The oldest hits must expire until the cost fits
+        oldest = hits[count - check.limit - 1]
+        return RateLimitResult(False, 0, max(0.0, oldest + window - now), check.limit, reset)
+
+    def record_hit(self, key: str, window_seconds: int) -> int:
+        hits = self._prune(key, window_seconds)
+        hits.append(time.monotonic())
+        self.store.set(key, hits)
+        return len(hits)
+
+    def get_count(self, key: str, window_seconds: int) -> int:
+        hits = self._prune(key, window_seconds)
+        if hits:
+            self.store.set(key, hits)
+        else:
+            self.store.pop(key)
+        return len(hits)
+
+    def check_many(
+        self, checks: Sequence[RateLimitCheck], all_or_nothing: bool = True
+    ) -> list[RateLimitResult]:
+        now = time.monotonic()
+        pruned = [self._prune(check.key, check.window_seconds) for check in checks]
+        results, commit = resolve_batch(
+            [self._result(check, hits, now) for check, hits in zip(checks, pruned)],
+            all_or_nothing,
+        )
+        for check, hits in zip(checks[:commit], pruned):
+            if check.cost >= 0:
+                hits.extend([now] * check.cost)
+            else:
+                del hits[check.cost:]
+            self.store.set(check.key, hits)
+        return results
+
+
+class SlidingWindowCounterBackend:
+    """
+    Sliding window counter using two fixed-size buckets per key.
+
+    Keeps the hit count of the current and previous window and weights the
+    previous one by how much of it still overlaps the sliding window. Every
+    operation is O(1) and each key costs three integers, regardless of the
+    limit. The count is an approximation that assumes hits in the previous
+    window were evenly spread.
+    """
+
+    def __init__(self, store: KeyStore | None = None) -> None:
+        # key -> [window index, current count, previous count]
+        self.store = store if store is not None else KeyStore()
+
+    @staticmethod
+    def _roll(state: list[int], index: int) -> None:
+        if state[0] != index:
+            state[2] = state[1] if state[0] == index - 1 else 0
+            state[0] = index
+            state[1] = 0
+
+    def record_hit(self, key: str, window_seconds: int) -> int:
+        index, offset = divmod(time.monotonic(), window_seconds)
+        index = int(index)
+        state = self.store.get(key)
+        if state is None:
+            self.store.set(key, [index, 1, 0])
+            return 1
+        self._roll(state, index)
+        state[1] += 1
+        return int(state[2] * (1.0 - offset / window_seconds)) + state[1]
+
+    def get_count(self, key: str, window_seconds: int) -> int:
+        state = self.store.get(key)
+        if state is None:
+            return 0
+        index, offset = divmod(time.monotonic(), window_seconds)
+        self._roll(state, int(index))
+        if not state[1] and not state[2]:
+            self.store.pop(key)
+            return 0
+        return int(state[2] * (1.0 - offset / window_seconds)) + state[1]
+
+    def check_many(
+        self, checks: Sequence[RateLimitCheck], all_or_nothing: bool = True
+    ) -> list[RateLimitResult]:
+        now = time.monotonic()
+        states = []
+        results = []
+        for check in checks:
+            index, offset = divmod(now, check.window_seconds)
+            index = int(index)
+            state = self.store.get(check.key) or [index, 0, 0]
+            self._roll(state, index)
+            states.append(state)
+            results.append(result_from_window(state[1], state[2], offset, check))
+        results, commit = resolve_batch(results, all_or_nothing)
+        for check, state in zip(checks[:commit], states):
+            state[1] = max(0, state[1] + check.cost)
+            self.store.set(check.key, state)
+        return results
+
+
+class StripedBackend:
+    """
+    Thread-safe backend built from independent, lock-guarded shards.
+
+    Keys are spread over ``stripes`` shards by hash. Each shard is its own
+    backend with its own KeyStore and lock, so threads touching different
+    keys rarely contend and no shared structure is mutated without a lock.
+    Safe for sync endpoints running in Starlette's threadpool and for
+    free-threaded (no-GIL) Python builds.
+
+    ``factory`` builds a shard backend from a KeyStore, e.g.
+    ``SlidingWindowCounterBackend`` (default) or ``InMemoryBackend``.
+    ``max_keys`` is split evenly across shards.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[KeyStore], RateLimiterBackend] = SlidingWindowCounterBackend,
+        stripes: int = 32,
+        max_keys: int = 100_000,
+        ttl_seconds: float = 3600.0,
+    ) -> None:
+        self.stripes = stripes
+        self._shards = [
+            factory(KeyStore(max_keys=max(1, max_keys // stripes), ttl_seconds=ttl_seconds))
+            for _ in range(stripes)
+        ]
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    def _stripe(self, key: str) -> int:
+        return hash(key) % self.stripes
 
     def record_hit(self, key: str, window_seconds: int) -> int:
-        self._prune(key, window_seconds)
-        self._hits[key].append(time.monotonic())
-        return len(self._hits[key])
+        stripe = self._stripe(key)
+        with self._locks[stripe]:
+            return self._shards[stripe].record_hit(key, window_seconds)
 
     def get_count(self, key: str, window_seconds: int) -> int:
-        self._prune(key, window_seconds)
-        return len(self._hits[key])
+        stripe = self._stripe(key)
+        with self._locks[stripe]:
+            return self._shards[stripe].get_count(key, window_seconds)
+
+    def check_many(
+        self, checks: Sequence[RateLimitCheck], all_or_nothing: bool = True
+    ) -> list[RateLimitResult]:
+        stripes = [self._stripe(check.key) for check in checks]
+        with ExitStack() as stack:
+            # Sorted acquisition order keeps concurrent batches deadlock-free
+            for stripe in sorted(set(stripes)):
+                stack.enter_context(self._locks[stripe])
+            if not all_or_nothing:
+                results = []
+                for check, stripe in zip(checks, stripes):
+                    results += check_many(self._shards[stripe], [check])
+                    if not results[-1].allowed:
+                        break
+                return results
+            groups: dict[int, list[int]] = {}
+            for i, stripe in enumerate(stripes):
+                groups.setdefault(stripe, []).append(i)
+            results = [None] * len(checks)
+            committed = []
+            for stripe, indexes in groups.items():
+                group = [checks[i] for i in indexes]
+                group_results = check_many(self._shards[stripe], group)
+                for i, result in zip(indexes, group_results):
+                    results[i] = result
+                if all(result.allowed for result in group_results):
+                    committed.append((stripe, group))
+            if not all(result.allowed for result in results):
+                # Roll back the shards that recorded before another one failed
+                for stripe, group in committed:
+                    check_many(
+                        self._shards[stripe],
+                        [check._replace(cost=-check.cost) for check in group],
+                    )
+            return results
+
+    def sweep(self, max_items: int = 256) -> int:
+        """Expire idle keys in every shard, holding one shard lock at a time."""
+        removed = 0
+        for lock, shard in zip(self._locks, self._shards):
+            with lock:
+                removed += shard.store.sweep(max_items)
+        return removed
+
+    def stats(self) -> dict[str, int]:
+        """Live keys and approximate bytes summed over all shards."""
+        keys = approx_bytes = 0
+        for lock, shard in zip(self._locks, self._shards):
+            with lock:
+                keys += len(shard.store)
+                approx_bytes += shard.store.approx_bytes()
+        return {"keys": keys, "approx_bytes": approx_bytes, "stripes": self.stripes}
+
+
+AnyRateLimiterBackend = Union[RateLimiterBackend, AsyncRateLimiterBackend]
+
+ALGORITHMS = ("sliding_window", "gcra")
+
+
+def check_many(
+    backend: RateLimiterBackend | GCRABackend,
+    checks: Iterable[RateLimitCheck | tuple],
+    all_or_nothing: bool = True,
+) -> list[RateLimitResult]:
+    """
+    Evaluate several ``(key, limit, window_seconds)`` limits in one backend call.
+
+    With ``all_or_nothing`` (default) a hit is recorded for every key only
+    if all of them pass, so a request rejected by one limit does not eat
+    into the others. Otherwise checks run in order, each passing one is
+    recorded, and evaluation stops at the first failure; the returned list
+    then ends with the failing result. Keys in a batch must be distinct.
+
+    Each check spends ``cost`` units (default 1); a negative cost returns
+    units. Backends with a native ``check_many`` do this atomically in one
+    operation. Others fall back to ``get_count`` then ``record_hit`` per
+    unit, and cannot return units.
+    """
+    checks = [RateLimitCheck(*check) for check in checks]
+    native = getattr(backend, "check_many", None)
+    if native is not None:
+        return native(checks, all_or_nothing)
+    results, commit = resolve_batch(
+        [
+            result_from_count(
+                backend.get_count(check.key, check.window_seconds) + check.cost,
+                check.limit,
+                check.window_seconds,
+            )
+            for check in checks
+        ],
+        all_or_nothing,
+    )
+    for check in checks[:commit]:
+        for _ in range(check.cost):
+            backend.record_hit(check.key, check.window_seconds)
+    return results
+
+
+async def acheck_many(
+    backend: AnyRateLimiterBackend | GCRABackend,
+    checks: Iterable[RateLimitCheck | tuple],
+    all_or_nothing: bool = True,
+) -> list[RateLimitResult]:
+    """Awaitable ``check_many`` that accepts sync and async backends."""
+    if not is_async_backend(backend):
+        return check_many(backend, checks, all_or_nothing)
+    checks = [RateLimitCheck(*check) for check in checks]
+    native = getattr(backend, "check_many", None)
+    if native is not None:
+        return await native(checks, all_or_nothing)
+    results, commit = resolve_batch(
+        [
+            result_from_count(
+                await backend.get_count(check.key, check.window_seconds) + check.cost,
+                check.limit,
+                check.window_seconds,
+            )
+            for check in checks
+        ],
+        all_or_nothing,
+    )
+    for check in checks[:commit]:
+        for _ in range(check.cost):
+            await backend.record_hit(check.key, check.window_seconds)
+    return results
 
 
 class RateLimiter:
     """
-    Sliding window rate limiter.
+    Rate limiter with a sliding window or GCRA algorithm.
 
     Supports per-IP and per-agent limits with a pluggable backend.
     Default backend is in-memory (suitable for single-worker deployments).
+
+    Sync backends work with both ``check`` and ``acheck``; async backends
+    (AsyncRateLimiterBackend) only with ``acheck``/``aremaining``.
+
+    With ``algorithm="gcra"`` requests are paced at ``max_requests`` per
+    ``window_seconds`` on average, while up to ``burst`` (default:
+    ``max_requests``) may arrive back to back. The backend must then be a
+    GCRABackend, which reports the exact time until the next allowed request.
     """
 
     def __init__(
         self,
         max_requests: int,
         window_seconds: int,
-        backend: RateLimiterBackend | None = None,
+        backend: AnyRateLimiterBackend | GCRABackend | None = None,
+        algorithm: str = "sliding_window",
+        burst: int | None = None,
     ) -> None:
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown rate limit algorithm: {algorithm!r}")
         self.max_requests = max_requests
         self.window_seconds = window_seconds
-        self._backend = backend or InMemoryBackend()
+        self.algorithm = algorithm
+        self.burst = burst if burst is not None else max_requests
+        if algorithm == "gcra":
+            self._backend = backend or GCRABackend()
+            self._emission_interval = window_seconds / max_requests
+            self._async_backend = None
+        else:
+            self._backend = backend or InMemoryBackend()
+            if is_async_backend(self._backend):
+                self._async_backend = self._backend
+            else:
+                self._async_backend = SyncBackendAdapter(self._backend)
+
+    def _sync_backend(self) -> RateLimiterBackend:
+        if self._async_backend is self._backend:
+            raise TypeError(
+                f"{type(self._backend).__name__} is async; use acheck()/aremaining()"
+            )
+        return self._backend
+
+    def _result(self, count: int) -> RateLimitResult:
+        return result_from_count(count, self.max_requests, self.window_seconds)
 
-    def check(self, key: str) -> tuple[bool, int]:
+    def limit_for(self, key: str, cost: int = 1) -> RateLimitCheck:
+        """Describe this limiter's check on a key, for use with ``check_many``."""
+        burst = self.burst if self.algorithm == "gcra" else None
+        return RateLimitCheck(key, self.max_requests, self.window_seconds, cost, burst)
+
+    def _gcra(self, key: str, cost: int) -> RateLimitResult:
+        allowed, remaining, retry_after = self._backend.update(
+            key, self._emission_interval, self.burst, cost
+        )
+        return RateLimitResult(allowed, remaining, retry_after, self.burst)
+
+    def hit(self, key: str, cost: int = 1) -> RateLimitResult:
+        """
+        Spend ``cost`` units and return the full result, including retry_after.
+
+        Backends with a native ``check_many`` (all built-in ones) record
+        nothing for a denied request and report exactly when it would fit;
+        others record every hit and report a full window.
+        """
+        if self.algorithm == "gcra":
+            return self._gcra(key, cost)
+        backend = self._sync_backend()
+        if getattr(backend, "check_many", None) is not None:
+            # Native batches know the window state, so retry_after is exact
+            return backend.check_many([self.limit_for(key, cost)])[0]
+        if cost == 1:
+            return self._result(backend.record_hit(key, self.window_seconds))
+        count = backend.get_count(key, self.window_seconds)
+        for _ in range(cost):
+            count = backend.record_hit(key, self.window_seconds)
+        return self._result(count)
+
+    def check(self, key: str, cost: int = 1) -> tuple[bool, int]:
         """
-        Record a hit and check if the limit is exceeded.
+        Record a hit weighing ``cost`` units and check if the limit is exceeded.
 
         Returns:
             (allowed, remaining) — allowed is False if over limit.
         """
-        count = self._backend.record_hit(key, self.window_seconds)
-        remaining = max(0, self.max_requests - count)
-        return count <= self.max_requests, remaining
+        result = self.hit(key, cost)
+        return result.allowed, result.remaining
 
     def remaining(self, key: str) -> int:
         """Return remaining requests for a key without recording a hit."""
-        count = self._backend.get_count(key, self.window_seconds)
+        if self.algorithm == "gcra":
+            return self._backend.peek(key, self._emission_interval, self.burst)
+        count = self._sync_backend().get_count(key, self.window_seconds)
+        return max(0, self.max_requests - count)
+
+    async def ahit(self, key: str, cost: int = 1) -> RateLimitResult:
+        """Awaitable variant of ``hit`` that never blocks the event loop."""
+        if self.algorithm == "gcra":
+            return self._gcra(key, cost)
+        if getattr(self._backend, "check_many", None) is not None:
+            return (await acheck_many(self._backend, [self.limit_for(key, cost)]))[0]
+        if cost == 1:
+            return self._result(await self._async_backend.record_hit(key, self.window_seconds))
+        count = await self._async_backend.get_count(key, self.window_seconds)
+        for _ in range(cost):
+            count = await self._async_backend.record_hit(key, self.window_seconds)
+        return self._result(count)
+
+    async def acheck(self, key: str, cost: int = 1) -> tuple[bool, int]:
+        """Awaitable variant of ``check`` that never blocks the event loop."""
+        result = await self.ahit(key, cost)
+        return result.allowed, result.remaining
+
+    async def aremaining(self, key: str) -> int:
+        """Awaitable variant of ``remaining``."""
+        if self.algorithm == "gcra":
+            return self.remaining(key)
+        count = await self._async_backend.get_count(key, self.window_seconds)
         return max(0, self.max_requests - count)
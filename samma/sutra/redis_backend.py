@@ -0,0 +1,197 @@
+"""Redis rate limiter backend — shared limits across workers and hosts."""
+
+from __future__ import annotations
+
+from typing import Any, Sequence
+
+from samma.sutra.types import (
+    RateLimitCheck,
+    RateLimitResult,
+    resolve_batch,
+    result_from_window,
+)
+
+# Sliding window counter, evaluated atomically on the server.
+# KEYS: one hash per limiter key. ARGV[1]: mode — 'peek' (no hits), 'record'
+# (always record), 'all' (record only if every key is within its limit) or
+# 'first' (record keys in order, stop at the first one over its limit).
+# ARGV[3i-1], ARGV[3i], ARGV[3i+1]: window seconds, limit and cost for
+# KEYS[i]; a negative cost returns units. Returns {count, current, previous,
+# elapsed microseconds} for each evaluated key, where count includes the
+# cost being spent unless peeking and the rest is the window state before
+# it. Time comes from the Redis server so workers with skewed clocks agree.
+_SLIDING_WINDOW_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local mode = ARGV[1]
+local counts = {}
+local states = {}
+local commit = #KEYS
+for i, key in ipairs(KEYS) do
+    local window = tonumber(ARGV[3 * i - 1])
+    local limit = tonumber(ARGV[3 * i])
+    local cost = tonumber(ARGV[3 * i + 1])
+    if mode == 'peek' then cost = 0 end
+    local index = math.floor(now / window)
+    local state = redis.call('HMGET', key, 'i', 'c', 'p')
+    local current_index = tonumber(state[1])
+    local current = tonumber(state[2]) or 0
+    local previous = tonumber(state[3]) or 0
+    if current_index ~= index then
+        if current_index == index - 1 then previous = current else previous = 0 end
+        current = 0
+    end
+    local elapsed = now - index * window
+    local weight = 1 - elapsed / window
+    counts[i] = {
+        math.floor(previous * weight) + current + cost,
+        current, previous, math.floor(elapsed * 1000000),
+    }
+    states[i] = {index, math.max(0, current + cost), previous, window}
+    if counts[i][1] > limit and (mode == 'all' or mode == 'first') then
+        if mode == 'first' then
+            commit = i - 1
+            break
+        end
+        commit = 0
+    end
+end
+if mode ~= 'peek' then
+    for i = 1, commit do
+        local s = states[i]
+        redis.call('HSET', KEYS[i], 'i', s[1], 'c', s[2], 'p', s[3])
+        redis.call('EXPIRE', KEYS[i], s[4] * 2)
+    end
+end
+return counts
+"""
+
+
+def _results(
+    checks: Sequence[RateLimitCheck], states: Sequence[Sequence[int]], all_or_nothing: bool
+) -> list[RateLimitResult]:
+    results = [
+        result_from_window(int(current), int(previous), int(elapsed_us) / 1e6, check)
+        for check, (_, current, previous, elapsed_us) in zip(checks, states)
+    ]
+    return resolve_batch(results, all_or_nothing)[0]
+
+
+def _import_redis() -> Any:
+    try:
+        import redis
+    except ImportError as exc:  # pragma: no cover - depends on environment
+        raise ImportError(
+            "RedisBackend requires the 'redis' package: pip install samma-suit[redis]"
+        ) from exc
+    return redis
+
+
+class RedisBackend:
+    """
+    Sliding window counter stored in Redis.
+
+    Each key is a small hash holding the current and previous window
+    counts, updated by a server-side Lua script so the check is atomic and
+    costs one round trip. Several limits are evaluated in the same script
+    call with ``check_many`` (or recorded unconditionally with
+    ``record_hits``). Connections come from redis-py's connection pool,
+    sized by ``max_connections``.
+
+    Pass an existing ``client`` to share a pool with the host app, or a
+    ``url`` to create one. This backend blocks the calling thread; use
+    AsyncRedisBackend inside async code.
+    """
+
+    def __init__(
+        self,
+        client: Any = None,
+        *,
+        url: str = "redis://localhost:6379/0",
+        prefix: str = "samma:rl:",
+        max_connections: int = 50,
+    ) -> None:
+        if client is None:
+            client = self._connect(url, max_connections)
+        self._client = client
+        self._prefix = prefix
+        self._script = client.register_script(_SLIDING_WINDOW_SCRIPT)
+
+    @staticmethod
+    def _connect(url: str, max_connections: int) -> Any:
+        redis = _import_redis()
+        return redis.Redis.from_url(url, max_connections=max_connections)
+
+    def _script_args(
+        self, mode: str, checks: Sequence[RateLimitCheck]
+    ) -> tuple[list[str], list[Any]]:
+        keys = [f"{self._prefix}{check.key}" for check in checks]
+        args: list[Any] = [mode]
+        for check in checks:
+            args += [check.window_seconds, check.limit, check.cost]
+        return keys, args
+
+    def _run(self, mode: str, checks: Sequence[RateLimitCheck]) -> list[list[int]]:
+        keys, args = self._script_args(mode, checks)
+        return self._script(keys=keys, args=args)
+
+    def record_hit(self, key: str, window_seconds: int) -> int:
+        return int(self._run("record", [RateLimitCheck(key, 0, window_seconds)])[0][0])
+
+    def get_count(self, key: str, window_seconds: int) -> int:
+        return int(self._run("peek", [RateLimitCheck(key, 0, window_seconds)])[0][0])
+
+    def record_hits(self, hits: Sequence[tuple[str, int]]) -> list[int]:
+        """Record a hit for each (key, window_seconds) pair in one round trip."""
+        if not hits:
+            return []
+        states = self._run("record", [RateLimitCheck(key, 0, window) for key, window in hits])
+        return [int(state[0]) for state in states]
+
+    def check_many(
+        self, checks: Sequence[RateLimitCheck], all_or_nothing: bool = True
+    ) -> list[RateLimitResult]:
+        """Evaluate and record several limits atomically in one round trip."""
+        if not checks:
+            return []
+        states = self._run("all" if all_or_nothing else "first", checks)
+        return _results(checks, states, all_or_nothing)
+
+
+class AsyncRedisBackend(RedisBackend):
+    """RedisBackend on ``redis.asyncio`` — implements AsyncRateLimiterBackend."""
+
+    @staticmethod
+    def _connect(url: str, max_connections: int) -> Any:
+        redis = _import_redis()
+        return redis.asyncio.Redis.from_url(url, max_connections=max_connections)
+
+    async def _run(self, mode: str, checks: Sequence[RateLimitCheck]) -> list[list[int]]:
+        keys, args = self._script_args(mode, checks)
+        return await self._script(keys=keys, args=args)
+
+    async def record_hit(self, key: str, window_seconds: int) -> int:
+        states = await self._run("record", [RateLimitCheck(key, 0, window_seconds)])
+        return int(states[0][0])
+
+    async def get_count(self, key: str, window_seconds: int) -> int:
+        states = await self._run("peek", [RateLimitCheck(key, 0, window_seconds)])
+        return int(states[0][0])
+
+    async def record_hits(self, hits: Sequence[tuple[str, int]]) -> list[int]:
+        """Record a hit for each (key, window_seconds) pair in one round trip."""
+        if not hits:
+            return []
+        states = await self._run(
+            "record", [RateLimitCheck(key, 0, window) for key, window in hits]
+        )
+        return [int(state[0]) for state in states]
+
+    async def check_many(
+        self, checks: Sequence[RateLimitCheck], all_or_nothing: bool = True
+    ) -> list[RateLimitResult]:
+        """Evaluate and record several limits atomically in one round trip."""
+        if not checks:
+            return []
+        states = await self._run("all" if all_or_nothing else "first", checks)
+        return _results(checks, states, all_or_nothing)
@@ -0,0 +1,101 @@
+"""Path matching for route rate limit rules and excluded paths."""
+
+from __future__ import annotations
+
+import re
+from typing import Sequence
+
+from samma.sutra.config import RouteLimit
+
+
+_WILDCARDS = "*?"
+_END = ""  # trie key marking the end of a prefix; never a path character
+
+
+def glob_to_regex(pattern: str) -> str:
+    """Translate a path glob: ``*`` stays within a segment, ``**`` spans segments."""
+    parts = re.split(r"(\*\*|\*|\?)", pattern)
+    translated = {"**": ".*", "*": "[^/]*", "?": "[^/]"}
+    return "".join(translated.get(part) or re.escape(part) for part in parts)
+
+
+class RouteMatcher:
+    """
+    Finds the first RouteLimit matching a request in one regex search.
+
+    All path globs are compiled at startup into a single alternation with
+    a named group per rule, once per HTTP method named in the rules (rules
+    without ``methods`` appear in every pattern). A lookup is one dict get
+    and one ``fullmatch`` regardless of the number of rules.
+    """
+
+    def __init__(self, rules: Sequence[RouteLimit]) -> None:
+        self.rules = list(rules)
+        methods = {m.upper() for rule in self.rules for m in rule.methods or ()}
+        self._any = self._compile(None)
+        self._by_method = {method: self._compile(method) for method in methods}
+
+    def _compile(self, method: str | None) -> re.Pattern | None:
+        groups = [
+            f"(?P<r{i}>{glob_to_regex(rule.path)})"
+            for i, rule in enumerate(self.rules)
+            if rule.methods is None or method in {m.upper() for m in rule.methods}
+        ]
+        return re.compile("|".join(groups)) if groups else None
+
+    def match(self, method: str, path: str) -> tuple[int, RouteLimit] | None:
+        """Return (rule index, rule) for the first rule matching the request."""
+        pattern = self._by_method.get(method.upper(), self._any)
+        found = pattern.fullmatch(path) if pattern is not None else None
+        if found is None:
+            return None
+        index = int(found.lastgroup[1:])
+        return index, self.rules[index]
+
+
+class PathMatcher:
+    """
+    Decides whether a path matches any of a fixed set of patterns.
+
+    Patterns are split at init by kind: exact paths go into a frozenset,
+    patterns whose only wildcard is a trailing ``*`` (``/static/*``,
+    ``/health*``) into a character trie of prefixes, and any other glob
+    into one combined regex. A lookup walks the path once, so its cost
+    depends on the path length rather than the number of patterns.
+    """
+
+    def __init__(self, patterns: Sequence[str]) -> None:
+        exact = set()
+        self._trie: dict = {}
+        globs = []
+        for pattern in patterns:
+            stem = pattern.rstrip("*")
+            if not any(c in pattern for c in _WILDCARDS):
+                exact.add(pattern)
+            elif stem != pattern and not any(c in stem for c in _WILDCARDS):
+                node = self._trie
+                for char in stem:
+                    node = node.setdefault(char, {})
+                node[_END] = True
+            else:
+                globs.append(glob_to_regex(pattern))
+        self._exact = frozenset(exact)
+        self._glob = re.compile("|".join(globs)) if globs else None
+
+    def _has_prefix(self, path: str) -> bool:
+        node = self._trie
+        for char in path:
+            if _END in node:
+                return True
+            node = node.get(char)
+            if node is None:
+                return False
+        return _END in node
+
+    def matches(self, path: str) -> bool:
+        """Return True if the path matches an exact path, prefix or glob."""
+        if path in self._exact:
+            return True
+        if self._trie and self._has_prefix(path):
+            return True
+        return self._glob is not None and self._glob.fullmatch(path) is not None
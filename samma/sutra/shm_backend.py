@@ -0,0 +1,183 @@
+"""Shared-memory rate limiter backend — exact limits across local worker processes."""
+
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Iterable, Iterator, Sequence
+
+from samma.sutra.types import (
+    RateLimitCheck,
+    RateLimitResult,
+    resolve_batch,
+    result_from_window,
+)
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+# key hash, window index, window seconds, current count, previous count
+_SLOT = struct.Struct("<QqIII4x")
+_MAX_PROBE = 16
+
+# Per-file thread locks, shared by every backend instance in this process.
+# fcntl record locks only exclude other processes, not other threads.
+_THREAD_LOCKS: dict[str, list[threading.Lock]] = {}
+_THREAD_LOCKS_GUARD = threading.Lock()
+
+
+def _key_hash(key: str) -> int:
+    # Stable across processes (unlike hash()); 0 marks an empty slot
+    digest = hashlib.blake2b(str(key).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+class SharedMemoryBackend:
+    """
+    Sliding window counter in a memory-mapped file shared by local processes.
+
+    The file is a fixed-size open-addressing hash table of 32-byte slots
+    holding a 64-bit key hash and the current/previous window counts. The
+    table is split into ``stripes`` segments; a key only ever lives in its
+    own segment, which is guarded by a byte-range ``fcntl`` lock (across
+    processes) plus a thread lock (within the process). Workers started
+    with ``uvicorn --workers N`` that point at the same ``path`` enforce
+    one combined limit without any network hop.
+
+    Memory is fixed at ``slots * 32`` bytes. Slots whose window has expired
+    are reused; if a probe sequence is full of live keys, the key with the
+    oldest window is evicted. Keys are identified by a 64-bit hash, so
+    distinct keys collide with negligible probability.
+    """
+
+    def __init__(self, path: str, slots: int = 65_536, stripes: int = 64) -> None:
+        if fcntl is None:
+            raise RuntimeError("SharedMemoryBackend requires a POSIX platform (fcntl)")
+        if slots < stripes or slots % stripes:
+            raise ValueError("slots must be a positive multiple of stripes")
+        self.path = os.path.realpath(path)
+        self.slots = slots
+        self.stripes = stripes
+        self._segment = slots // stripes
+        size = slots * _SLOT.size
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        current = os.fstat(self._fd).st_size
+        if current == 0:
+            os.ftruncate(self._fd, size)
+        elif current != size:
+            os.close(self._fd)
+            raise ValueError(
+                f"{self.path} holds {current // _SLOT.size} slots, expected {slots}"
+            )
+        self._map = mmap.mmap(self._fd, size)
+        with _THREAD_LOCKS_GUARD:
+            self._locks = _THREAD_LOCKS.setdefault(
+                self.path, [threading.Lock() for _ in range(stripes)]
+            )
+
+    @contextmanager
+    def _locked(self, stripe: int) -> Iterator[None]:
+        with self._locks[stripe]:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, stripe)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, stripe)
+
+    def _probe(self, key_hash: int, now: float) -> tuple[int, bool]:
+        """Return (slot offset, found) for a key. Caller holds the stripe lock."""
+        base = self._stripe(key_hash) * self._segment
+        home = (key_hash // self.stripes) % self._segment
+        free = None
+        victim = None
+        victim_age = None
+        for i in range(min(_MAX_PROBE, self._segment)):
+            offset = (base + (home + i) % self._segment) * _SLOT.size
+            slot_hash, index, window, _, _ = _SLOT.unpack_from(self._map, offset)
+            if slot_hash == key_hash:
+                return offset, True
+            if slot_hash == 0:
+                return (free if free is not None else offset), False
+            age = now / window - index
+            if free is None and age >= 2:
+                free = offset
+            if victim_age is None or age > victim_age:
+                victim, victim_age = offset, age
+        return (free if free is not None else victim), False
+
+    def _stripe(self, key_hash: int) -> int:
+        return key_hash % self.stripes
+
+    def _load(self, key_hash: int, now: float, index: int) -> tuple[int, int, int]:
+        """Return (slot offset, current, previous) rolled to ``index``. Caller holds the lock."""
+        offset, found = self._probe(key_hash, now)
+        if not found:
+            return offset, 0, 0
+        _, current_index, _, current, previous = _SLOT.unpack_from(self._map, offset)
+        if current_index != index:
+            previous = current if current_index == index - 1 else 0
+            current = 0
+        return offset, current, previous
+
+    @contextmanager
+    def _locked_many(self, stripes: Iterable[int]) -> Iterator[None]:
+        # Sorted acquisition order keeps concurrent batches deadlock-free
+        with ExitStack() as stack:
+            for stripe in sorted(set(stripes)):
+                stack.enter_context(self._locked(stripe))
+            yield
+
+    def record_hit(self, key: str, window_seconds: int) -> int:
+        key_hash = _key_hash(key)
+        now = time.time()
+        index, elapsed = divmod(now, window_seconds)
+        index = int(index)
+        with self._locked(self._stripe(key_hash)):
+            offset, current, previous = self._load(key_hash, now, index)
+            current += 1
+            _SLOT.pack_into(
+                self._map, offset, key_hash, index, window_seconds, current, previous
+            )
+        return int(previous * (1.0 - elapsed / window_seconds)) + current
+
+    def get_count(self, key: str, window_seconds: int) -> int:
+        key_hash = _key_hash(key)
+        now = time.time()
+        index, elapsed = divmod(now, window_seconds)
+        with self._locked(self._stripe(key_hash)):
+            _, current, previous = self._load(key_hash, now, int(index))
+        return int(previous * (1.0 - elapsed / window_seconds)) + current
+
+    def check_many(
+        self, checks: Sequence[RateLimitCheck], all_or_nothing: bool = True
+    ) -> list[RateLimitResult]:
+        hashes = [_key_hash(check.key) for check in checks]
+        now = time.time()
+        with self._locked_many(self._stripe(key_hash) for key_hash in hashes):
+            results = []
+            for check, key_hash in zip(checks, hashes):
+                index, elapsed = divmod(now, check.window_seconds)
+                _, current, previous = self._load(key_hash, now, int(index))
+                results.append(result_from_window(current, previous, elapsed, check))
+            results, commit = resolve_batch(results, all_or_nothing)
+            for check, key_hash in zip(checks[:commit], hashes):
+                # Probe again: an earlier key in the batch may have claimed the free slot
+                index = int(now // check.window_seconds)
+                offset, current, previous = self._load(key_hash, now, index)
+                _SLOT.pack_into(
+                    self._map, offset, key_hash, index, check.window_seconds,
+                    max(0, current + check.cost), previous,
+                )
+        return results
+
+    def close(self) -> None:
+        """Unmap the table and close the file. The file itself is kept."""
+        self._map.close()
+        os.close(self._fd)
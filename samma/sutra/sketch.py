@@ -0,0 +1,180 @@
+"""Count-min sketch rate limiter backend — fixed memory for floods of distinct keys."""
+
+from __future__ import annotations
+
+import time
+from array import array
+from typing import Sequence
+
+from samma.sutra.key_store import KeyStore
+from samma.sutra.types import (
+    RateLimitCheck,
+    RateLimitResult,
+    resolve_batch,
+    result_from_window,
+)
+
+_COUNTER = "i"  # 32-bit signed counters
+_HASH_MASK = (1 << 64) - 1
+_SALT = 0x9E3779B97F4A7C15
+
+
+class _WindowSketch:
+    """Current and previous window count-min tables for one window length."""
+
+    def __init__(self, width: int, depth: int) -> None:
+        self.width = width
+        self.depth = depth
+        self.index = 0
+        self._zeros = bytes(width * depth * array(_COUNTER).itemsize)
+        self.current = array(_COUNTER, self._zeros)
+        self.previous = array(_COUNTER, self._zeros)
+
+    def cells(self, key: str) -> list[int]:
+        # Double hashing: one hash() call gives every row's column. Hashing a
+        # tuple mixes the bits, which hash() alone does not for int keys.
+        h = hash((key, _SALT)) & _HASH_MASK
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        width = self.width
+        return [row * width + (h1 + row * h2) % width for row in range(self.depth)]
+
+    def roll(self, index: int) -> None:
+        if index == self.index:
+            return
+        if index == self.index + 1:
+            self.previous = self.current
+        else:
+            self.previous = array(_COUNTER, self._zeros)
+        self.current = array(_COUNTER, self._zeros)
+        self.index = index
+
+    def estimate(self, cells: list[int]) -> tuple[int, int]:
+        """Return (current, previous) window count estimates for a key's cells."""
+        return (
+            min(self.current[cell] for cell in cells),
+            min(self.previous[cell] for cell in cells),
+        )
+
+    def add(self, cells: list[int], amount: int) -> None:
+        current = self.current
+        for cell in cells:
+            current[cell] = max(0, current[cell] + amount)
+
+
+class SketchBackend:
+    """
+    Approximate sliding window counter with memory fixed at ``memory_mb``.
+
+    Counts live in a count-min sketch (``depth`` rows of 32-bit counters)
+    per window, with the same current/previous weighting as
+    SlidingWindowCounterBackend. Memory does not grow with the number of
+    distinct keys, so a flood from millions of rotating IPs cannot exhaust
+    it. Estimates never undercount; colliding keys may be overcounted, so
+    an innocent key can be limited early when the table is saturated.
+
+    Keys that reach ``promote_fraction`` of their limit are also counted
+    exactly (at most ``top_k`` of them, least recently used evicted), so
+    the sources actually being limited get precise counts, remaining and
+    retry values instead of collision-inflated ones. An evicted key falls
+    back to its sketch estimate.
+
+    ``memory_mb`` is spent per distinct ``window_seconds``; the middleware
+    uses one window.
+    """
+
+    def __init__(
+        self,
+        memory_mb: float = 4.0,
+        depth: int = 4,
+        top_k: int = 1024,
+        promote_fraction: float = 0.5,
+    ) -> None:
+        itemsize = array(_COUNTER).itemsize
+        # Two tables (current and previous window) of depth rows each
+        self.width = max(1, int(memory_mb * 2**20) // (2 * depth * itemsize))
+        self.depth = depth
+        self.promote_fraction = promote_fraction
+        self.heavy = KeyStore(max_keys=top_k, sweep_on_insert=0)
+        self._sketches: dict[int, _WindowSketch] = {}
+
+    def _sketch(self, window_seconds: int, index: int) -> _WindowSketch:
+        sketch = self._sketches.get(window_seconds)
+        if sketch is None:
+            sketch = self._sketches[window_seconds] = _WindowSketch(self.width, self.depth)
+            sketch.index = index
+        sketch.roll(index)
+        return sketch
+
+    @staticmethod
+    def _roll_exact(state: list, index: int) -> None:
+        if state[0] != index:
+            state[2] = state[1] if state[0] == index - 1 else 0
+            state[1] = 0
+            state[0] = index
+
+    def _counts(
+        self, key: str, window_seconds: int, now: float
+    ) -> tuple[int, int, list | None, list[int]]:
+        """Return (current, previous, exact state or None, sketch cells) for a key."""
+        index = int(now // window_seconds)
+        sketch = self._sketch(window_seconds, index)
+        cells = sketch.cells(key)
+        state = self.heavy.get(key)
+        if state is not None:
+            self._roll_exact(state, index)
+            return state[1], state[2], state, cells
+        return (*sketch.estimate(cells), None, cells)
+
+    def _count(self, key: str, window_seconds: int, now: float) -> int:
+        current, previous, _, _ = self._counts(key, window_seconds, now)
+        return int(previous * (1.0 - (now % window_seconds) / window_seconds)) + current
+
+    def _add(
+        self, key: str, window_seconds: int, now: float, amount: int, limit: int | None
+    ) -> None:
+        current, previous, state, cells = self._counts(key, window_seconds, now)
+        count = int(previous * (1.0 - (now % window_seconds) / window_seconds)) + current
+        sketch = self._sketches[window_seconds]
+        # The sketch sees every hit, so it stays an upper bound after eviction
+        sketch.add(cells, amount)
+        if state is not None:
+            state[1] = max(0, state[1] + amount)
+        elif limit is not None and amount > 0 and count + amount >= limit * self.promote_fraction:
+            # Seed the exact counter from the sketch so promotion never undercounts
+            self.heavy.set(key, [sketch.index, *sketch.estimate(cells)])
+
+    def record_hit(self, key: str, window_seconds: int) -> int:
+        now = time.monotonic()
+        self._add(key, window_seconds, now, 1, None)
+        return self._count(key, window_seconds, now)
+
+    def get_count(self, key: str, window_seconds: int) -> int:
+        return self._count(key, window_seconds, time.monotonic())
+
+    def check_many(
+        self, checks: Sequence[RateLimitCheck], all_or_nothing: bool = True
+    ) -> list[RateLimitResult]:
+        now = time.monotonic()
+        results = [
+            result_from_window(
+                *self._counts(check.key, check.window_seconds, now)[:2],
+                now % check.window_seconds,
+                check,
+            )
+            for check in checks
+        ]
+        results, commit = resolve_batch(results, all_or_nothing)
+        for check in checks[:commit]:
+            self._add(check.key, check.window_seconds, now, check.cost, check.limit)
+        return results
+
+    def stats(self) -> dict[str, int]:
+        """Sketch size and number of exactly tracked heavy hitters."""
+        itemsize = array(_COUNTER).itemsize
+        return {
+            "width": self.width,
+            "depth": self.depth,
+            "windows": len(self._sketches),
+            "sketch_bytes": len(self._sketches) * 2 * self.width * self.depth * itemsize,
+            "heavy_hitters": len(self.heavy),
+        }
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import logging
+import random
 
 from samma.exceptions import TLSRequiredError
 
@@ -12,9 +13,12 @@ logger = logging.getLogger("samma.sutra.tls")
 class TLSChecker:
     """Checks that requests arrive over HTTPS."""
 
-    def __init__(self, enforce: bool = False, warn: bool = True) -> None:
+    def __init__(
+        self, enforce: bool = False, warn: bool = True, warn_sample_rate: float = 1.0
+    ) -> None:
         self.enforce = enforce
         self.warn = warn
+        self.warn_sample_rate = warn_sample_rate  # fraction of insecure requests warned about
 
     def is_secure(self, scheme: str | None, forwarded_proto: str | None) -> bool:
         """Check if the request is over HTTPS (direct or behind proxy)."""
@@ -31,5 +35,5 @@ class TLSChecker:
         msg = "Request is not over HTTPS"
         if self.enforce:
             raise TLSRequiredError(msg)
-        if self.warn:
+        if self.warn and (self.warn_sample_rate >= 1.0 or random.random() < self.warn_sample_rate):
             logger.warning("SUTRA TLS warning: %s", msg)
@@ -0,0 +1,173 @@
+"""Per-stage latency tracing for the SUTRA pipeline — spans and latency histograms."""
+
+from __future__ import annotations
+
+import random
+import time
+from array import array
+from typing import Any, Protocol
+
+# Stages timed for each request, in pipeline order (concurrency only when a
+# concurrency limit is configured)
+STAGES = ("headers", "tls", "origin", "rate_limit", "concurrency", "app", "total")
+
+_PERCENTILES = (("p50_ms", 50.0), ("p90_ms", 90.0), ("p99_ms", 99.0), ("p999_ms", 99.9))
+
+
+class Span(Protocol):
+    def end(self, end_time: int | None = None) -> None: ...
+
+
+class Tracer(Protocol):
+    """The subset of ``opentelemetry.trace.Tracer`` SUTRA uses."""
+
+    def start_span(self, name: str, start_time: int | None = None) -> Span: ...
+
+
+class LatencyHistogram:
+    """
+    Log-linear latency histogram in microseconds, in the style of HdrHistogram.
+
+    Each power of two is split into ``2 ** (significant_bits - 1)`` linear
+    buckets, so recorded values keep about 1% precision (at the default of
+    7 bits) across the whole range in a few kilobytes of fixed memory.
+    Values above ``max_seconds`` are clamped to it. Percentiles report the
+    highest value in the matching bucket, so they never understate.
+    """
+
+    def __init__(self, max_seconds: float = 60.0, significant_bits: int = 7) -> None:
+        self._bits = significant_bits
+        self._max = int(max_seconds * 1_000_000)
+        self.counts = array("q", bytes(8 * (self._index(self._max) + 1)))
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def _index(self, micros: int) -> int:
+        bits = self._bits
+        if micros < 1 << bits:
+            return micros
+        shift = micros.bit_length() - bits
+        return (shift << (bits - 1)) + (micros >> shift)
+
+    def _highest(self, index: int) -> int:
+        """Largest value that falls in bucket ``index``."""
+        bits = self._bits
+        if index < 1 << bits:
+            return index
+        shift = (index >> (bits - 1)) - 1
+        return ((index - (shift << (bits - 1)) + 1) << shift) - 1
+
+    def record(self, micros: int) -> None:
+        micros = min(max(0, micros), self._max)
+        self.counts[self._index(micros)] += 1
+        self.count += 1
+        self.total += micros
+        if micros > self.max:
+            self.max = micros
+
+    def percentile(self, percent: float) -> int:
+        """Latency in microseconds that ``percent`` of recorded values do not exceed."""
+        if not self.count:
+            return 0
+        target = max(1, int(self.count * percent / 100.0 + 0.5))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self._highest(index), self.max)
+        return self.max
+
+    def summary(self) -> dict[str, float]:
+        """Count, mean, percentiles and max, in milliseconds."""
+        summary: dict[str, float] = {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count / 1000, 3) if self.count else 0.0,
+        }
+        for name, percent in _PERCENTILES:
+            summary[name] = self.percentile(percent) / 1000
+        summary["max_ms"] = self.max / 1000
+        return summary
+
+    def reset(self) -> None:
+        self.counts = array("q", bytes(8 * len(self.counts)))
+        self.count = self.total = self.max = 0
+
+
+class PipelineTracer:
+    """
+    Times each SUTRA stage and reports it to a tracer and/or histograms.
+
+    ``tracer`` is anything with OpenTelemetry's ``start_span(name,
+    start_time=...)`` / ``span.end(end_time=...)``, such as
+    ``opentelemetry.trace.get_tracer("samma.sutra")``. One span named
+    ``sutra.<stage>`` is emitted per stage, parented to whatever span is
+    current (normally the server span from the ASGI instrumentation).
+    With ``histograms``, every stage also feeds a LatencyHistogram that
+    ``summary()`` reports.
+
+    Sampling is head-based: ``begin()`` decides once per request, with
+    probability ``sample_rate``, and returns None for unsampled requests,
+    which then pay nothing beyond that decision.
+    """
+
+    def __init__(
+        self,
+        tracer: Tracer | None = None,
+        sample_rate: float = 1.0,
+        histograms: bool = True,
+    ) -> None:
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate must be in [0, 1]")
+        self.tracer = tracer
+        self.sample_rate = sample_rate
+        self.histograms = {stage: LatencyHistogram() for stage in STAGES} if histograms else {}
+
+    def begin(self) -> Trace | None:
+        """Start timing a request, or return None if it is not sampled."""
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return None
+        return Trace(self)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Latency summary per stage, for stages that have seen requests."""
+        return {
+            stage: histogram.summary()
+            for stage, histogram in self.histograms.items()
+            if histogram.count
+        }
+
+    def reset(self) -> None:
+        for histogram in self.histograms.values():
+            histogram.reset()
+
+
+class Trace:
+    """Stage timings for one sampled request; each ``mark`` closes a stage."""
+
+    __slots__ = ("_pipeline", "_start", "_last", "_epoch")
+
+    def __init__(self, pipeline: PipelineTracer) -> None:
+        self._pipeline = pipeline
+        self._start = self._last = time.perf_counter_ns()
+        # Spans take wall-clock nanoseconds; stages are timed on the perf counter
+        self._epoch = time.time_ns() - self._start
+
+    def _observe(self, stage: str, start: int, end: int) -> None:
+        histogram = self._pipeline.histograms.get(stage)
+        if histogram is not None:
+            histogram.record((end - start) // 1000)
+        tracer: Any = self._pipeline.tracer
+        if tracer is not None:
+            span = tracer.start_span(f"sutra.{stage}", start_time=self._epoch + start)
+            span.end(end_time=self._epoch + end)
+
+    def mark(self, stage: str) -> None:
+        """Record the time since the previous mark (or the start) as ``stage``."""
+        now = time.perf_counter_ns()
+        self._observe(stage, self._last, now)
+        self._last = now
+
+    def end(self) -> None:
+        """Record the whole request as the ``total`` stage."""
+        self._observe("total", self._start, time.perf_counter_ns())
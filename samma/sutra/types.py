@@ -0,0 +1,90 @@
+"""Rate limit check and result types shared by the limiter and its backends."""
+
+from __future__ import annotations
+
+from typing import NamedTuple, Optional, Sequence
+
+
+class RateLimitCheck(NamedTuple):
+    """One limit to evaluate in a batch: ``(key, limit, window_seconds)``."""
+
+    key: str | int  # int for aggregated client IPs (see sutra.ip)
+    limit: int
+    window_seconds: int
+    cost: int = 1  # units this check spends; negative returns units
+    burst: Optional[int] = None  # GCRA only; defaults to limit
+
+
+class RateLimitResult(NamedTuple):
+    """Outcome of a single rate limit check."""
+
+    allowed: bool
+    remaining: int
+    retry_after: float  # seconds until a request would be allowed (0.0 if allowed)
+    limit: int
+    reset_after: float = 0.0  # seconds until recorded usage stops counting (full quota)
+
+
+def result_from_count(count: int, limit: int, window_seconds: int) -> RateLimitResult:
+    """Build a result from a hit count that includes the units being checked."""
+    if count <= limit:
+        return RateLimitResult(True, limit - count, 0.0, limit)
+    return RateLimitResult(False, 0, float(window_seconds), limit)
+
+
+def result_from_window(
+    current: int,
+    previous: int,
+    elapsed: float,
+    check: RateLimitCheck,
+) -> RateLimitResult:
+    """
+    Build a sliding window counter result with exact retry and reset times.
+
+    ``current`` and ``previous`` are the counts of the current and previous
+    fixed windows, ``elapsed`` the seconds since the current one began.
+    A denied check's ``retry_after`` is when enough of the weighted count
+    has decayed for ``check.cost`` units to fit, assuming no other hits.
+    The weighted count is truncated, so ``previous * (1 - t / window)``
+    only has to drop below one more than the room left.
+    """
+    window, limit, cost = check.window_seconds, check.limit, check.cost
+    count = int(previous * (1.0 - elapsed / window)) + current + cost
+    if count <= limit:
+        current += cost
+        if current > 0:
+            reset = 2 * window - elapsed
+        else:
+            reset = window - elapsed if previous > 0 else 0.0
+        return RateLimitResult(True, limit - count, 0.0, limit, reset)
+    reset = (2 * window if current > 0 else window) - elapsed
+    if cost > limit:
+        return RateLimitResult(False, 0, float(window), limit, reset)
+    room = limit - current - cost
+    if room >= 0:
+        # Fits in this window once the previous window's weight decays
+        retry = window * (1.0 - (room + 1) / previous) - elapsed
+    else:
+        # Wait for the next window, then for this window's weight to decay
+        retry = (window - elapsed) + window * (1.0 - (limit - cost + 1) / current)
+    return RateLimitResult(False, 0, max(0.0, retry), limit, reset)
+
+
+def resolve_batch(
+    results: Sequence[RateLimitResult],
+    all_or_nothing: bool,
+) -> tuple[list[RateLimitResult], int]:
+    """
+    Apply batch semantics to per-check results.
+
+    Returns the results to report and how many leading checks to record.
+    All-or-nothing reports every result and records nothing unless all
+    pass. First-fail stops at the first denial, reports up to and including
+    it, and records the checks before it.
+    """
+    for i, result in enumerate(results):
+        if not result.allowed:
+            if all_or_nothing:
+                return list(results), 0
+            return list(results[: i + 1]), i
+    return list(results), len(results)
@@ -96,3 +96,38 @@ async def client(test_app):
     transport = ASGITransport(app=test_app)
     async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as c:
         yield c
+
+
+@pytest.fixture
+def sutra_app():
+    """Factory for a bare app with SUTRA configured from settings overrides.
+
+    Returns ``(app, suit)``; the app serves ``GET /api/test`` and modules add
+    their own routes.
+    """
+
+    def make(tracer=None, **overrides):
+        options = dict(tls_warn=False, log_requests=False)
+        options.update(overrides)
+        app = FastAPI()
+        suit = SammaSuit(app)
+        suit.activate_sutra(settings=SUTRASettings(**options), tracer=tracer)
+
+        @app.get("/api/test")
+        async def test_endpoint():
+            return {"message": "ok"}
+
+        return app, suit
+
+    return make
+
+
+@pytest.fixture
+def sutra_client():
+    """Factory for an httpx client calling an app from ``peer``."""
+
+    def make(app, peer="127.0.0.1"):
+        transport = ASGITransport(app=app, client=(peer, 123))
+        return httpx.AsyncClient(transport=transport, base_url="http://testserver")
+
+    return make
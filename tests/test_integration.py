@@ -108,6 +108,116 @@ class TestSutraAndDharmaTogether:
         assert resp.status_code == 429
 
 
+@pytest.fixture
+def identity_app(sutra_settings):
+    """App with custom identity headers and several permission checks per route."""
+    from fastapi import Depends, FastAPI, Request
+    from fastapi.responses import JSONResponse
+
+    from samma import DHARMASettings, Permission, SammaSuit, dharma_protected, require_permission
+    from samma.exceptions import PermissionDeniedError
+    from samma.identity import configure_identity_headers, identity_headers
+
+    previous = identity_headers()
+    app = FastAPI()
+    suit = SammaSuit(app)
+    settings = sutra_settings.model_copy(update={"excluded_paths": ["/public/*"]})
+    suit.activate_sutra(settings=settings)
+    suit.activate_dharma(settings=DHARMASettings(
+        agent_header="X-Bot-Id", agent_type_header="x-bot-type", log_denials=False,
+    ))
+
+    @app.get("/api/multi")
+    async def multi(
+        request: Request,
+        _view=Depends(require_permission(Permission.AGENT_VIEW)),
+        _read=Depends(require_permission(Permission.PLAYLIST_READ)),
+    ):
+        return request.state.samma_identity._asdict()
+
+    @app.get("/public/agent")
+    async def excluded(
+        request: Request,
+        _view=Depends(require_permission(Permission.AGENT_VIEW)),
+        _read=Depends(require_permission(Permission.PLAYLIST_READ)),
+    ):
+        return request.state.samma_identity._asdict()
+
+    @app.get("/api/decorated")
+    @dharma_protected(Permission.ADMIN_WRITE)
+    async def decorated(request: Request):
+        return {"message": "ok"}
+
+    @app.exception_handler(PermissionDeniedError)
+    async def denied(request: Request, exc: PermissionDeniedError):
+        return JSONResponse(status_code=403, content={"detail": str(exc), "layer": "dharma"})
+
+    yield app
+    configure_identity_headers(*previous)
+
+
+class TestRequestIdentity:
+    @pytest.fixture
+    def parses(self, monkeypatch):
+        from samma import identity
+
+        calls = []
+        parse = identity.parse_identity
+
+        def counting(headers):
+            calls.append(1)
+            return parse(headers)
+
+        monkeypatch.setattr(identity, "parse_identity", counting)
+        return calls
+
+    @pytest.fixture
+    async def identity_client(self, identity_app):
+        import httpx
+        from httpx._transports.asgi import ASGITransport
+
+        transport = ASGITransport(app=identity_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as c:
+            yield c
+
+    @pytest.mark.asyncio
+    async def test_gateway_identity_shared_with_dharma(self, identity_client, parses):
+        headers = {"x-bot-id": "playlist-1", "x-bot-type": "playlist", "x-tenant-id": "t1"}
+        resp = await identity_client.get("/api/multi", headers=headers)
+        assert resp.status_code == 200
+        assert resp.json() == {"agent_id": "playlist-1", "agent_type": "playlist", "tenant_id": "t1"}
+        # SUTRA rate limits the agent by the header DHARMA is configured with
+        assert "x-ratelimit-agent-remaining" in resp.headers
+        assert parses == []
+
+    @pytest.mark.asyncio
+    async def test_excluded_path_parsed_once(self, identity_client, parses):
+        headers = {"x-bot-id": "playlist-1", "x-bot-type": "playlist"}
+        resp = await identity_client.get("/public/agent", headers=headers)
+        assert resp.status_code == 200
+        assert resp.json()["agent_id"] == "playlist-1"
+        assert parses == [1]
+
+    @pytest.mark.asyncio
+    async def test_old_headers_ignored(self, identity_client):
+        headers = {"x-agent-id": "admin-1", "x-agent-type": "admin"}
+        resp = await identity_client.get("/api/multi", headers=headers)
+        assert resp.json()["agent_id"] is None
+        assert "x-ratelimit-agent-remaining" not in resp.headers
+
+    @pytest.mark.asyncio
+    async def test_decorator_enforces_permissions(self, identity_client):
+        resp = await identity_client.get(
+            "/api/decorated", headers={"x-bot-id": "playlist-1", "x-bot-type": "playlist"}
+        )
+        assert resp.status_code == 403
+        assert resp.json()["layer"] == "dharma"
+        resp = await identity_client.get(
+            "/api/decorated", headers={"x-bot-id": "admin-1", "x-bot-type": "admin"}
+        )
+        assert resp.status_code == 200
+
+
 class TestPackageImports:
     def test_import_samma(self):
         from samma import SammaSuit, SUTRASettings, SUTRAMiddleware
@@ -0,0 +1,166 @@
+"""Tests for SUTRA request body size limits."""
+
+import pytest
+from fastapi import Request
+
+from samma.exceptions import RequestTooLargeError
+from samma.sutra.body_limit import BodyLimit
+from samma.sutra.config import RouteLimit
+
+
+@pytest.fixture
+def upload_app(sutra_app):
+    """Factory for an app with upload routes; returns it with the sizes /api/upload read."""
+
+    def make(**overrides):
+        app, _ = sutra_app(**overrides)
+        reads = []
+
+        @app.post("/api/upload")
+        async def upload(request: Request):
+            body = await request.body()
+            reads.append(len(body))
+            return {"size": len(body)}
+
+        @app.post("/api/bulk")
+        async def bulk(request: Request):
+            return {"size": len(await request.body())}
+
+        @app.post("/api/stream")
+        async def stream(request: Request):
+            size = 0
+            async for chunk in request.stream():
+                size += len(chunk)
+            return {"size": size}
+
+        return app, reads
+
+    return make
+
+
+async def chunks(count: int, size: int = 100):
+    for _ in range(count):
+        yield b"x" * size
+
+
+class TestBodyLimit:
+    @pytest.mark.asyncio
+    async def test_counts_and_raises_past_limit(self):
+        messages = [
+            {"type": "http.request", "body": b"x" * 60, "more_body": True},
+            {"type": "http.request", "body": b"x" * 60, "more_body": False},
+        ]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        async def reject():
+            sent.append("413")
+
+        limit = BodyLimit(100, receive, send, reject)
+        assert (await limit.receive())["body"] == b"x" * 60
+        with pytest.raises(RequestTooLargeError):
+            await limit.receive()
+        assert limit.exceeded and limit.received == 120
+        # The app's own error response is replaced by the rejection
+        await limit.send({"type": "http.response.start", "status": 400, "headers": []})
+        await limit.send({"type": "http.response.body", "body": b"bad"})
+        await limit.respond()
+        assert sent == ["413"]
+
+    @pytest.mark.asyncio
+    async def test_started_response_is_left_alone(self):
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"x" * 200}
+
+        async def send(message):
+            sent.append(message["type"])
+
+        async def reject():
+            sent.append("413")
+
+        limit = BodyLimit(100, receive, send, reject)
+        await limit.send({"type": "http.response.start", "status": 200, "headers": []})
+        with pytest.raises(RequestTooLargeError):
+            await limit.receive()
+        await limit.send({"type": "http.response.body", "body": b""})
+        await limit.respond()
+        assert sent == ["http.response.start", "http.response.body"]
+
+
+class TestMiddleware:
+    @pytest.mark.asyncio
+    async def test_content_length_over_limit_rejected_before_app(self, upload_app, sutra_client):
+        app, reads = upload_app(max_body_bytes=100)
+        async with sutra_client(app) as client:
+            resp = await client.post("/api/upload", content=b"x" * 101)
+        assert resp.status_code == 413
+        assert resp.json() == {"detail": "Request body too large", "layer": "sutra"}
+        assert reads == []
+
+    @pytest.mark.asyncio
+    async def test_bodies_within_limit_pass(self, upload_app, sutra_client):
+        app, _ = upload_app(max_body_bytes=100)
+        async with sutra_client(app) as client:
+            resp = await client.post("/api/upload", content=b"x" * 100)
+            assert resp.status_code == 200
+            assert resp.json() == {"size": 100}
+            resp = await client.post("/api/stream", content=chunks(1))
+            assert resp.status_code == 200
+            assert resp.json() == {"size": 100}
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("length", [" 1000", "1e3", "-1"])
+    async def test_malformed_content_length_still_counted(self, length, upload_app, sutra_client):
+        app, reads = upload_app(max_body_bytes=10)
+        async with sutra_client(app) as client:
+            resp = await client.post(
+                "/api/upload", content=chunks(10), headers={"content-length": length}
+            )
+        assert resp.status_code == 413
+        assert reads == []
+
+    @pytest.mark.asyncio
+    async def test_chunked_body_rejected_once_limit_crossed(self, upload_app, sutra_client):
+        app, reads = upload_app(max_body_bytes=250)
+        async with sutra_client(app) as client:
+            resp = await client.post("/api/upload", content=chunks(5))
+            assert resp.status_code == 413
+            assert resp.json()["detail"] == "Request body too large"
+            assert "x-ratelimit-remaining" not in resp.headers
+            resp = await client.post("/api/stream", content=chunks(5))
+            assert resp.status_code == 413
+        assert reads == []
+
+    @pytest.mark.asyncio
+    async def test_route_override(self, upload_app, sutra_client):
+        app, _ = upload_app(
+            max_body_bytes=100,
+            route_limits=[RouteLimit(path="/api/bulk", methods=["POST"], max_body_bytes=1000)],
+        )
+        async with sutra_client(app) as client:
+            assert (await client.post("/api/bulk", content=b"x" * 500)).status_code == 200
+            assert (await client.post("/api/bulk", content=chunks(5))).status_code == 200
+            assert (await client.post("/api/bulk", content=b"x" * 1001)).status_code == 413
+            assert (await client.post("/api/upload", content=b"x" * 500)).status_code == 413
+
+    @pytest.mark.asyncio
+    async def test_route_only_limit(self, upload_app, sutra_client):
+        app, _ = upload_app(route_limits=[RouteLimit(path="/api/upload", max_body_bytes=10)])
+        async with sutra_client(app) as client:
+            assert (await client.post("/api/upload", content=b"x" * 11)).status_code == 413
+            assert (await client.post("/api/bulk", content=b"x" * 5000)).status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_early_rejection_spends_no_quota(self, upload_app, sutra_client):
+        app, _ = upload_app(max_body_bytes=10, rate_limit_per_ip=1)
+        async with sutra_client(app) as client:
+            for _ in range(3):
+                assert (await client.post("/api/upload", content=b"x" * 11)).status_code == 413
+            assert (await client.post("/api/upload", content=b"x")).status_code == 200
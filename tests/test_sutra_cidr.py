@@ -0,0 +1,171 @@
+"""Tests for SUTRA CIDR lists, trusted proxies and IP filtering."""
+
+import ipaddress
+import logging
+import random
+
+import pytest
+
+from samma.sutra.cidr import CIDRSet, IPFilter
+
+
+class TestCIDRSet:
+    def test_ipv4_and_ipv6_membership(self):
+        cidrs = CIDRSet(["10.0.0.0/8", "192.168.1.0/24", "203.0.113.7/32", "2001:db8::/32"])
+        assert "10.1.2.3" in cidrs
+        assert "192.168.1.200" in cidrs
+        assert "192.168.2.1" not in cidrs
+        assert "203.0.113.7" in cidrs
+        assert "203.0.113.8" not in cidrs
+        assert "2001:db8:ffff::1" in cidrs
+        assert "2001:db9::1" not in cidrs
+        assert "::ffff:10.0.0.1" in cidrs
+        assert "unknown" not in cidrs
+        assert len(cidrs) == 4
+
+    def test_families_are_separate(self):
+        assert "::1" not in CIDRSet(["0.0.0.0/0"])
+        assert "1.2.3.4" not in CIDRSet(["::/0"])
+        assert "1.2.3.4" in CIDRSet(["0.0.0.0/0"])
+
+    def test_nested_and_overlapping_networks(self):
+        cidrs = CIDRSet(["10.1.2.0/24", "10.0.0.0/8", "10.1.0.0/16"])
+        assert "10.200.0.1" in cidrs
+        assert "11.0.0.1" not in cidrs
+
+    def test_host_bits_are_ignored(self):
+        assert "10.0.0.99" in CIDRSet(["10.0.0.5/24"])
+
+    def test_invalid_cidr_raises(self):
+        with pytest.raises(ValueError):
+            CIDRSet(["10.0.0.0/33"])
+
+    @pytest.mark.parametrize("version", [4, 6])
+    def test_matches_ipaddress(self, version):
+        rng = random.Random(version)
+        bits = 32 if version == 4 else 128
+        factory = ipaddress.IPv4Network if version == 4 else ipaddress.IPv6Network
+        networks = [
+            factory((rng.getrandbits(bits), rng.randint(1, bits)), strict=False)
+            for _ in range(200)
+        ]
+        # Addresses inside some networks and at random
+        addresses = [network.network_address + 1 for network in networks[:100]]
+        addresses += [ipaddress.ip_address(rng.getrandbits(bits)) for _ in range(400)]
+        cidrs = CIDRSet(str(network) for network in networks)
+        for address in addresses:
+            if version == 6 and address.ipv4_mapped:
+                continue
+            expected = any(address in network for network in networks)
+            assert (str(address) in cidrs) is expected, address
+
+
+class TestIPFilter:
+    def test_check(self):
+        ip_filter = IPFilter(allow=["10.1.0.0/16"], deny=["10.0.0.0/8"])
+        assert ip_filter.active
+        assert ip_filter.check("10.1.0.1") is True
+        assert ip_filter.check("10.2.0.1") is False
+        assert ip_filter.check("8.8.8.8") is None
+        assert ip_filter.check("unknown") is None
+        assert not IPFilter().active
+
+    def test_trust_every_peer_by_default(self):
+        ip_filter = IPFilter()
+        assert ip_filter.client_ip("10.0.0.1", "1.1.1.1, 10.0.0.2") == "1.1.1.1"
+        assert ip_filter.client_ip("10.0.0.1", None) == "10.0.0.1"
+        assert ip_filter.client_ip(None, None) == "unknown"
+
+    def test_trusted_proxies(self):
+        ip_filter = IPFilter(trusted_proxies=["10.0.0.0/8"])
+        # Untrusted peer: its header is ignored
+        assert ip_filter.client_ip("8.8.8.8", "1.1.1.1") == "8.8.8.8"
+        # Right-most hop that is not a trusted proxy
+        assert ip_filter.client_ip("10.0.0.1", "6.6.6.6, 1.1.1.1, 10.0.0.2") == "1.1.1.1"
+        assert ip_filter.client_ip("10.0.0.1", "10.0.0.3, 10.0.0.2") == "10.0.0.3"
+
+    def test_check_client_ignores_unvetted_forwarded_for(self):
+        ip_filter = IPFilter(allow=["10.0.0.0/8"], deny=["203.0.113.0/24"])
+        assert ip_filter.check_client("203.0.113.9", "10.1.2.3") is False
+        assert ip_filter.check_client("198.51.100.1", "10.1.2.3") is None
+        ip_filter.reload(deny=["203.0.113.0/24"], trusted_proxies=["198.51.100.0/24"])
+        assert ip_filter.check_client("198.51.100.1", "203.0.113.9") is False
+
+    def test_lists_without_trusted_proxies_warn(self, caplog):
+        with caplog.at_level(logging.WARNING, logger="samma.sutra"):
+            IPFilter(allow=["10.0.0.0/8"])
+        assert "trusted_proxies is not set" in caplog.text
+        caplog.clear()
+        with caplog.at_level(logging.WARNING, logger="samma.sutra"):
+            IPFilter(allow=["10.0.0.0/8"], trusted_proxies=["10.0.0.1/32"])
+            IPFilter(trusted_proxies=None)
+        assert caplog.text == ""
+
+    def test_reload(self):
+        ip_filter = IPFilter(deny=["10.0.0.0/8"])
+        ip_filter.reload(deny=["192.168.0.0/16"])
+        assert ip_filter.check("10.0.0.1") is None
+        assert ip_filter.check("192.168.0.1") is False
+        with pytest.raises(ValueError):
+            ip_filter.reload(deny=["not-a-network"])
+        assert ip_filter.check("192.168.0.1") is False
+
+
+class TestMiddleware:
+    @pytest.mark.asyncio
+    async def test_denied_network_gets_403(self, sutra_app, sutra_client):
+        app, _ = sutra_app(ip_deny=["203.0.113.0/24"])
+        async with sutra_client(app, peer="203.0.113.9") as client:
+            resp = await client.get("/api/test")
+        assert resp.status_code == 403
+        assert resp.json() == {"detail": "IP address denied", "layer": "sutra"}
+
+    @pytest.mark.asyncio
+    async def test_allowed_network_skips_rate_limits(self, sutra_app, sutra_client):
+        app, _ = sutra_app(ip_allow=["10.0.0.0/8"], ip_deny=["0.0.0.0/0"], rate_limit_per_ip=1)
+        async with sutra_client(app, peer="10.0.0.5") as client:
+            for _ in range(3):
+                resp = await client.get("/api/test")
+                assert resp.status_code == 200
+                assert "x-ratelimit-remaining" not in resp.headers
+
+    @pytest.mark.asyncio
+    async def test_forwarded_for_from_untrusted_peer_ignored(self, sutra_app, sutra_client):
+        app, _ = sutra_app(
+            trusted_proxies=["10.0.0.0/8"], ip_deny=["203.0.113.0/24"], rate_limit_per_ip=1
+        )
+        async with sutra_client(app, peer="198.51.100.1") as client:
+            resp = await client.get("/api/test", headers={"x-forwarded-for": "8.8.8.8"})
+            assert resp.status_code == 200
+            # Spoofing a fresh address does not reset the per-IP limit
+            resp = await client.get("/api/test", headers={"x-forwarded-for": "8.8.4.4"})
+            assert resp.status_code == 429
+        async with sutra_client(app, peer="10.0.0.1") as client:
+            resp = await client.get("/api/test", headers={"x-forwarded-for": "203.0.113.5"})
+            assert resp.status_code == 403
+
+    @pytest.mark.asyncio
+    async def test_spoofed_forwarded_for_cannot_bypass_lists(self, sutra_app, sutra_client):
+        app, _ = sutra_app(
+            ip_allow=["10.0.0.0/8"], ip_deny=["203.0.113.0/24"], rate_limit_per_ip=2
+        )
+        spoof = {"x-forwarded-for": "10.1.2.3"}
+        async with sutra_client(app, peer="203.0.113.9") as client:
+            resp = await client.get("/api/test", headers=spoof)
+            assert resp.status_code == 403
+        async with sutra_client(app, peer="198.51.100.1") as client:
+            statuses = [
+                (await client.get("/api/test", headers=spoof)).status_code for _ in range(4)
+            ]
+        # No allowlist exemption: the limit still applies
+        assert statuses == [200, 200, 429, 429]
+
+    @pytest.mark.asyncio
+    async def test_hot_reload(self, sutra_app, sutra_client):
+        app, suit = sutra_app(rate_limit_per_ip=100)
+        async with sutra_client(app, peer="203.0.113.9") as client:
+            assert (await client.get("/api/test")).status_code == 200
+            suit.ip_filter.reload(deny=["203.0.113.0/24"])
+            assert (await client.get("/api/test")).status_code == 403
+            suit.ip_filter.reload()
+            assert (await client.get("/api/test")).status_code == 200
@@ -0,0 +1,264 @@
+"""Tests for SUTRA adaptive concurrency limiting and load shedding."""
+
+import asyncio
+
+import pytest
+from fastapi.responses import StreamingResponse
+
+from samma.sutra import concurrency
+from samma.sutra.concurrency import ConcurrencyLimiter
+from samma.sutra.middleware import SUTRAMiddleware
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(concurrency.time, "monotonic", lambda: now[0])
+    return now
+
+
+class TestCaps:
+    @pytest.mark.asyncio
+    async def test_global_cap_sheds_without_queue(self):
+        limiter = ConcurrencyLimiter(max_limit=2, adaptive=False)
+        assert await limiter.acquire()
+        assert await limiter.acquire()
+        assert not await limiter.acquire()
+        assert limiter.stats() == {"limit": 2, "in_flight": 2, "queued": 0, "shed": 1}
+        limiter.release()
+        assert await limiter.acquire()
+
+    @pytest.mark.asyncio
+    async def test_per_agent_cap(self):
+        limiter = ConcurrencyLimiter(per_agent=1)
+        assert await limiter.acquire("a")
+        assert not await limiter.acquire("a")
+        assert await limiter.acquire("b")
+        assert await limiter.acquire(None)
+        limiter.release("a")
+        assert await limiter.acquire("a")
+        assert limiter.stats()["limit"] is None
+
+    @pytest.mark.asyncio
+    async def test_agent_counts_are_dropped_when_idle(self):
+        limiter = ConcurrencyLimiter(per_agent=2)
+        await limiter.acquire("a")
+        limiter.release("a")
+        assert limiter._agents == {}
+
+    def test_invalid_limits(self):
+        with pytest.raises(ValueError):
+            ConcurrencyLimiter(max_limit=2, min_limit=3)
+        with pytest.raises(ValueError):
+            ConcurrencyLimiter(max_limit=2, backoff=1.0)
+
+
+class TestQueue:
+    @pytest.mark.asyncio
+    async def test_waiter_gets_released_slot(self):
+        limiter = ConcurrencyLimiter(max_limit=1, adaptive=False, queue_size=1, queue_timeout=1)
+        assert await limiter.acquire()
+        waiting = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.stats()["queued"] == 1
+        # The queue is full: the next request is shed at once
+        assert not await limiter.acquire()
+        limiter.release()
+        assert await waiting
+        assert limiter.stats() == {"limit": 1, "in_flight": 1, "queued": 0, "shed": 1}
+
+    @pytest.mark.asyncio
+    async def test_waiter_times_out(self):
+        limiter = ConcurrencyLimiter(max_limit=1, adaptive=False, queue_size=5, queue_timeout=0.01)
+        await limiter.acquire()
+        assert not await limiter.acquire("a")
+        assert limiter.stats() == {"limit": 1, "in_flight": 1, "queued": 0, "shed": 1}
+        assert limiter._agents == {}
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_queue(self):
+        limiter = ConcurrencyLimiter(max_limit=1, adaptive=False, queue_size=5, queue_timeout=1)
+        await limiter.acquire()
+        waiting = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert limiter.stats()["queued"] == 0
+        limiter.release()
+        assert limiter.in_flight == 0
+
+
+class TestAIMD:
+    @pytest.mark.asyncio
+    async def test_slow_requests_cut_limit_once_per_round_trip(self, clock):
+        limiter = ConcurrencyLimiter(max_limit=100, latency_target=0.5)
+        for _ in range(10):
+            await limiter.acquire()
+        started = clock[0]
+        clock[0] += 1.0
+        for _ in range(10):
+            limiter.release(started=started)
+        assert limiter.stats()["limit"] == 90
+
+        # A request that started after the cut counts again
+        await limiter.acquire()
+        started = clock[0]
+        clock[0] += 1.0
+        limiter.release(started=started)
+        assert limiter.stats()["limit"] == 81
+
+    @pytest.mark.asyncio
+    async def test_fast_requests_grow_limit_when_in_use(self, clock):
+        limiter = ConcurrencyLimiter(max_limit=10, latency_target=0.5)
+        limiter.limit = 4.0
+        for _ in range(4):
+            await limiter.acquire()
+        limiter.release(started=clock[0])
+        assert limiter.limit == 5.0
+
+    @pytest.mark.asyncio
+    async def test_idle_limit_does_not_grow(self, clock):
+        limiter = ConcurrencyLimiter(max_limit=10, latency_target=0.5)
+        limiter.limit = 6.0
+        await limiter.acquire()
+        limiter.release(started=clock[0])
+        assert limiter.limit == 6.0
+
+    @pytest.mark.asyncio
+    async def test_limit_stays_within_bounds(self, clock):
+        limiter = ConcurrencyLimiter(max_limit=4, min_limit=2, latency_target=0.5)
+        for _ in range(20):
+            await limiter.acquire()
+            started = clock[0]
+            clock[0] += 1.0
+            limiter.release(started=started)
+        assert limiter.stats()["limit"] == 2
+        for _ in range(20):
+            for _ in range(2):
+                await limiter.acquire()
+            limiter.release(started=clock[0])
+            limiter.release(started=clock[0])
+        assert limiter.stats()["limit"] == 4
+
+    @pytest.mark.asyncio
+    async def test_target_defaults_to_baseline_multiple(self, clock):
+        limiter = ConcurrencyLimiter(max_limit=10)
+        for latency in (0.1, 0.1, 0.1):
+            await limiter.acquire()
+            started = clock[0]
+            clock[0] += latency
+            limiter.release(started=started)
+        assert limiter.stats()["limit"] == 10
+        await limiter.acquire()
+        started = clock[0]
+        clock[0] += 0.5
+        limiter.release(started=started)
+        assert limiter.stats()["limit"] == 9
+
+    @pytest.mark.asyncio
+    async def test_latency_runs_to_response_start(self, clock):
+        limiter = ConcurrencyLimiter(max_limit=10, latency_target=0.5)
+        limiter.limit = 4.0
+        await limiter.acquire()
+        await limiter.acquire()
+        started = clock[0]
+        clock[0] += 30.0  # a long streamed body after a fast first byte
+        limiter.release(started=started, responded=started + 0.01)
+        assert limiter.limit == 5.0
+
+
+@pytest.fixture
+def gated_app(sutra_app):
+    """Factory for an app with a slow route (released by the returned gate) and a stream."""
+
+    def make(**overrides):
+        app, _ = sutra_app(**overrides)
+        gate = asyncio.Event()
+
+        @app.get("/api/slow")
+        async def slow():
+            await gate.wait()
+            return {"message": "ok"}
+
+        @app.get("/api/stream")
+        async def stream():
+            async def tokens():
+                for _ in range(3):
+                    yield b"token"
+                    await asyncio.sleep(0.1)
+
+            return StreamingResponse(tokens())
+
+        return app, gate
+
+    return make
+
+
+class TestMiddleware:
+    @pytest.mark.asyncio
+    async def test_excess_requests_get_503(self, gated_app, sutra_client):
+        app, gate = gated_app(concurrency_limit=1, concurrency_queue_size=0)
+        async with sutra_client(app) as client:
+            first = asyncio.create_task(client.get("/api/slow"))
+            await asyncio.sleep(0.05)
+            resp = await client.get("/api/slow")
+            assert resp.status_code == 503
+            assert resp.headers["retry-after"] == "1"
+            assert resp.json() == {"detail": "Server overloaded", "layer": "sutra"}
+            gate.set()
+            assert (await first).status_code == 200
+            assert (await client.get("/api/slow")).status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_queued_request_waits_for_slot(self, gated_app, sutra_client):
+        app, gate = gated_app(
+            concurrency_limit=1, concurrency_queue_size=1, concurrency_queue_timeout_ms=1000
+        )
+        async with sutra_client(app) as client:
+            first = asyncio.create_task(client.get("/api/slow"))
+            await asyncio.sleep(0.05)
+            second = asyncio.create_task(client.get("/api/slow"))
+            await asyncio.sleep(0.05)
+            gate.set()
+            assert (await first).status_code == 200
+            assert (await second).status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_per_agent_cap(self, gated_app, sutra_client):
+        app, gate = gated_app(concurrency_per_agent=1)
+        async with sutra_client(app) as client:
+            first = asyncio.create_task(client.get("/api/slow", headers={"x-agent-id": "a"}))
+            await asyncio.sleep(0.05)
+            resp = await client.get("/api/slow", headers={"x-agent-id": "a"})
+            assert resp.status_code == 503
+            gate.set()
+            resp = await client.get("/api/slow", headers={"x-agent-id": "b"})
+            assert resp.status_code == 200
+            assert (await first).status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_streams_do_not_lower_limit(self, gated_app, sutra_client):
+        app, _ = gated_app(concurrency_limit=50, concurrency_latency_target_ms=50)
+        async with sutra_client(app) as client:
+            responses = await asyncio.gather(*(client.get("/api/stream") for _ in range(5)))
+        assert all(resp.status_code == 200 for resp in responses)
+        layer = app.middleware_stack
+        while not isinstance(layer, SUTRAMiddleware):
+            layer = layer.app
+        assert layer.concurrency.stats()["limit"] == 50
+
+    @pytest.mark.asyncio
+    async def test_shed_requests_do_not_spend_rate_limit(self, gated_app, sutra_client):
+        app, gate = gated_app(
+            concurrency_limit=1, concurrency_queue_size=0, rate_limit_per_ip=2
+        )
+        async with sutra_client(app) as client:
+            first = asyncio.create_task(client.get("/api/slow"))
+            await asyncio.sleep(0.05)
+            for _ in range(3):
+                assert (await client.get("/api/slow")).status_code == 503
+            gate.set()
+            assert (await first).status_code == 200
+            assert (await client.get("/api/slow")).status_code == 200
+            assert (await client.get("/api/slow")).status_code == 429
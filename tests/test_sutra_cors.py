@@ -0,0 +1,141 @@
+"""Tests for SUTRA CORS headers and the preflight fast path."""
+
+import pytest
+
+from samma.sutra.cors import CORSPolicy
+
+PREFLIGHT = {
+    "origin": "https://app.example",
+    "access-control-request-method": "POST",
+    "access-control-request-headers": "content-type, x-agent-id",
+}
+
+
+class TestCORSPolicy:
+    def test_wildcard_origin_without_credentials(self):
+        policy = CORSPolicy(["GET"], ["*"], allow_all_origins=True)
+        assert policy.origin_headers("https://a.example") == [
+            (b"access-control-allow-origin", b"*")
+        ]
+
+    def test_origin_echoed_with_credentials(self):
+        policy = CORSPolicy(["GET"], ["*"], allow_credentials=True, allow_all_origins=True)
+        assert policy.origin_headers("https://a.example") == [
+            (b"access-control-allow-origin", b"https://a.example"),
+            (b"vary", b"Origin"),
+            (b"access-control-allow-credentials", b"true"),
+        ]
+
+    def test_preflight_checks_method_and_headers(self):
+        policy = CORSPolicy(["get", "POST"], ["Content-Type"], max_age=60)
+        headers = dict(policy.preflight("https://a.example", "post", "content-type"))
+        assert headers[b"access-control-allow-methods"] == b"GET, POST"
+        assert headers[b"access-control-allow-headers"] == b"content-type"
+        assert headers[b"access-control-max-age"] == b"60"
+        assert policy.preflight("https://a.example", "DELETE", None) is None
+        assert policy.preflight("https://a.example", "POST", "content-type, x-secret") is None
+
+    def test_any_header_echoes_request(self):
+        policy = CORSPolicy(["POST"], ["*"])
+        headers = dict(policy.preflight("https://a.example", "POST", "x-one, x-two"))
+        assert headers[b"access-control-allow-headers"] == b"x-one, x-two"
+
+
+@pytest.fixture
+def cors_app(sutra_app):
+    """Factory for a CORS-enabled app whose /api/cors route counts its calls."""
+
+    def make(**overrides):
+        options = dict(
+            cors_enabled=True, allowed_origins=["https://*.example"], rate_limit_per_ip=1
+        )
+        options.update(overrides)
+        app, _ = sutra_app(**options)
+        calls = []
+
+        @app.api_route("/api/cors", methods=["GET", "POST", "OPTIONS"])
+        async def cors_endpoint():
+            calls.append(1)
+            return {"message": "ok"}
+
+        return app, calls
+
+    return make
+
+
+class TestPreflight:
+    @pytest.mark.asyncio
+    async def test_answered_without_app_or_rate_limits(self, cors_app, sutra_client):
+        app, calls = cors_app()
+        async with sutra_client(app) as client:
+            for _ in range(3):
+                resp = await client.options("/api/cors", headers=PREFLIGHT)
+                assert resp.status_code == 204
+                assert resp.content == b""
+                assert resp.headers["access-control-allow-origin"] == "https://app.example"
+                assert resp.headers["access-control-allow-headers"] == "content-type, x-agent-id"
+                assert "POST" in resp.headers["access-control-allow-methods"]
+                assert resp.headers["x-samma-layer"] == "sutra"
+            assert calls == []
+            # The preflights did not use up the per-IP quota
+            resp = await client.get("/api/cors", headers={"origin": "https://app.example"})
+            assert resp.status_code == 200
+            assert calls == [1]
+
+    @pytest.mark.asyncio
+    async def test_disallowed_origin_rejected(self, cors_app, sutra_client):
+        app, calls = cors_app()
+        async with sutra_client(app) as client:
+            resp = await client.options(
+                "/api/cors", headers={**PREFLIGHT, "origin": "https://evil.test"}
+            )
+        assert resp.status_code == 403
+        assert "access-control-allow-origin" not in resp.headers
+
+    @pytest.mark.asyncio
+    async def test_disallowed_method_rejected(self, cors_app, sutra_client):
+        app, calls = cors_app(cors_allow_methods=["GET"])
+        async with sutra_client(app) as client:
+            resp = await client.options("/api/cors", headers=PREFLIGHT)
+        assert resp.status_code == 400
+        assert resp.json()["detail"] == "CORS preflight not allowed"
+
+    @pytest.mark.asyncio
+    async def test_plain_options_goes_to_app(self, cors_app, sutra_client):
+        app, calls = cors_app()
+        async with sutra_client(app) as client:
+            resp = await client.options("/api/cors", headers={"origin": "https://app.example"})
+        assert resp.status_code == 200
+        assert calls == [1]
+
+    @pytest.mark.asyncio
+    async def test_disabled_by_default(self, cors_app, sutra_client):
+        app, calls = cors_app(cors_enabled=False, rate_limit_per_ip=10)
+        async with sutra_client(app) as client:
+            resp = await client.options("/api/cors", headers=PREFLIGHT)
+        assert resp.status_code == 200
+        assert calls == [1]
+        assert "access-control-allow-origin" not in resp.headers
+
+
+class TestResponseHeaders:
+    @pytest.mark.asyncio
+    async def test_allowed_response_and_429_carry_cors_headers(self, cors_app, sutra_client):
+        app, _ = cors_app(cors_allow_credentials=True)
+        async with sutra_client(app) as client:
+            headers = {"origin": "https://app.example"}
+            resp = await client.get("/api/cors", headers=headers)
+            assert resp.status_code == 200
+            assert resp.headers["access-control-allow-origin"] == "https://app.example"
+            assert resp.headers["access-control-allow-credentials"] == "true"
+            assert resp.headers["vary"] == "Origin"
+            resp = await client.get("/api/cors", headers=headers)
+            assert resp.status_code == 429
+            assert resp.headers["access-control-allow-origin"] == "https://app.example"
+
+    @pytest.mark.asyncio
+    async def test_no_origin_no_cors_headers(self, cors_app, sutra_client):
+        app, _ = cors_app()
+        async with sutra_client(app) as client:
+            resp = await client.get("/api/cors")
+        assert "access-control-allow-origin" not in resp.headers
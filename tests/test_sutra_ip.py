@@ -0,0 +1,31 @@
+"""Tests for client IP prefix aggregation."""
+
+from samma.sutra.ip import ip_key
+
+
+class TestIPKey:
+    def test_ipv4_full_address(self):
+        assert ip_key("1.2.3.4") == 0x01020304
+        assert ip_key("1.2.3.4") != ip_key("1.2.3.5")
+
+    def test_ipv4_prefix(self):
+        assert ip_key("10.0.0.1", ipv4_prefix=24) == ip_key("10.0.0.254", ipv4_prefix=24)
+        assert ip_key("10.0.0.1", ipv4_prefix=24) != ip_key("10.0.1.1", ipv4_prefix=24)
+
+    def test_ipv6_rotation_within_64_shares_key(self):
+        assert ip_key("2001:db8:1:2::1") == ip_key("2001:db8:1:2:dead:beef:0:1")
+        assert ip_key("2001:db8:1:2::1") != ip_key("2001:db8:1:3::1")
+
+    def test_ipv6_full_address(self):
+        assert ip_key("2001:db8::1", ipv6_prefix=128) != ip_key("2001:db8::2", ipv6_prefix=128)
+
+    def test_families_do_not_collide(self):
+        assert ip_key("::1", ipv6_prefix=128) != ip_key("0.0.0.1")
+        assert ip_key("::", ipv6_prefix=0) != ip_key("0.0.0.0", ipv4_prefix=0)
+
+    def test_ipv4_mapped_counts_as_ipv4(self):
+        assert ip_key("::ffff:1.2.3.4") == ip_key("1.2.3.4")
+
+    def test_unparseable_falls_back_to_string(self):
+        assert ip_key("unknown") == "ip:unknown"
+        assert ip_key("testclient") == "ip:testclient"
@@ -0,0 +1,91 @@
+"""Unit tests for the SUTRA bounded key store."""
+
+import asyncio
+
+import pytest
+from samma.sutra import key_store
+from samma.sutra.key_store import KeyStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(key_store.time, "monotonic", lambda: now[0])
+    return now
+
+
+class TestKeyStore:
+    def test_set_and_get(self):
+        store = KeyStore()
+        store.set("a", 1)
+        assert store.get("a") == 1
+        assert store.get("missing") is None
+        assert len(store) == 1
+
+    def test_max_keys_evicts_least_recently_used(self):
+        store = KeyStore(max_keys=2)
+        store.set("a", 1)
+        store.set("b", 2)
+        store.get("a")
+        store.set("c", 3)
+        assert "a" in store
+        assert "b" not in store
+        assert store.stats()["evicted"] == 1
+
+    def test_idle_keys_expire_on_access(self, clock):
+        store = KeyStore(ttl_seconds=10)
+        store.set("a", 1)
+        clock[0] += 11
+        assert store.get("a") is None
+        assert len(store) == 0
+
+    def test_access_refreshes_ttl(self, clock):
+        store = KeyStore(ttl_seconds=10)
+        store.set("a", 1)
+        clock[0] += 8
+        store.get("a")
+        clock[0] += 8
+        assert store.get("a") == 1
+
+    def test_sweep_is_bounded(self, clock):
+        store = KeyStore(ttl_seconds=10, sweep_on_insert=0)
+        for i in range(10):
+            store.set(i, i)
+        clock[0] += 11
+        store.set("live", 1)
+        assert store.sweep(max_items=4) == 4
+        assert store.sweep(max_items=100) == 6
+        assert store.sweep(max_items=100) == 0
+        assert len(store) == 1
+
+    def test_insert_sweeps_expired_keys(self, clock):
+        store = KeyStore(ttl_seconds=10, sweep_on_insert=2)
+        store.set("a", 1)
+        store.set("b", 2)
+        clock[0] += 11
+        store.set("c", 3)
+        assert len(store) == 1
+
+    def test_stats_track_keys_and_bytes(self):
+        store = KeyStore()
+        empty = store.approx_bytes()
+        for i in range(100):
+            store.set(f"ip:{i}", [i, 1, 0])
+        stats = store.stats()
+        assert stats["keys"] == 100
+        assert stats["approx_bytes"] > empty
+        for i in range(100):
+            store.pop(f"ip:{i}")
+        assert store.stats()["keys"] == 0
+        assert store.approx_bytes() < stats["approx_bytes"]
+
+    @pytest.mark.asyncio
+    async def test_background_sweeper(self):
+        store = KeyStore(ttl_seconds=0.0, sweep_on_insert=0)
+        for i in range(10):
+            store.set(i, i)
+        task = store.start_sweeper(interval=0.01, batch=3)
+        assert store.start_sweeper() is task
+        await asyncio.sleep(0.05)
+        store.stop_sweeper()
+        assert len(store) == 0
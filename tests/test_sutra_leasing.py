@@ -0,0 +1,106 @@
+"""Tests for local quota leasing over a shared backend."""
+
+import pytest
+
+from samma.sutra import key_store
+from samma.sutra.leasing import LeasingBackend
+from samma.sutra.rate_limiter import SlidingWindowCounterBackend, acheck_many
+from samma.sutra.types import RateLimitCheck
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(key_store.time, "monotonic", lambda: now[0])
+    return now
+
+
+def check(key="agent:a", limit=100):
+    return RateLimitCheck(key, limit, 60)
+
+
+class TestLeasingBackend:
+    @pytest.mark.asyncio
+    async def test_spends_lease_locally(self, clock):
+        central = SlidingWindowCounterBackend()
+        leasing = LeasingBackend(central, lease_fraction=0.1)
+        for i in range(10):
+            results = await acheck_many(leasing, [check()])
+            assert results[0].allowed
+            assert results[0].remaining == 99 - i
+        assert leasing.central_calls == 1
+        assert central.get_count("agent:a", 60) == 10
+        await acheck_many(leasing, [check()])
+        assert leasing.central_calls == 2
+
+    @pytest.mark.asyncio
+    async def test_never_exceeds_global_limit(self, clock):
+        central = SlidingWindowCounterBackend()
+        workers = [LeasingBackend(central, lease_fraction=0.2) for _ in range(3)]
+        allowed = 0
+        for _ in range(20):
+            for worker in workers:
+                allowed += (await acheck_many(worker, [check(limit=10)]))[0].allowed
+        assert allowed <= 10
+        assert allowed >= 10 - 3 * 2  # at most one unspent lease per worker
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_exact_cost_near_limit(self, clock):
+        central = SlidingWindowCounterBackend()
+        for _ in range(98):
+            central.record_hit("agent:a", 60)
+        leasing = LeasingBackend(central, lease_fraction=0.1)
+        assert (await acheck_many(leasing, [check()]))[0].allowed
+        assert (await acheck_many(leasing, [check()]))[0].allowed
+        assert not (await acheck_many(leasing, [check()]))[0].allowed
+
+    @pytest.mark.asyncio
+    async def test_expired_lease_returns_unspent_units(self, clock):
+        central = SlidingWindowCounterBackend()
+        leasing = LeasingBackend(central, lease_fraction=0.1, lease_seconds=1.0)
+        await acheck_many(leasing, [check()])
+        assert central.get_count("agent:a", 60) == 10
+        assert await leasing.get_count("agent:a", 60) == 1
+        clock[0] += 2
+        await acheck_many(leasing, [check()])
+        # 9 unspent units went back, then a fresh lease of 10 was taken
+        assert central.get_count("agent:a", 60) == 11
+
+    @pytest.mark.asyncio
+    async def test_all_or_nothing_keeps_local_units(self, clock):
+        central = SlidingWindowCounterBackend()
+        for _ in range(5):
+            central.record_hit("agent:a", 60)
+        leasing = LeasingBackend(central, lease_fraction=0.1)
+        results = await acheck_many(leasing, [check("ip:1"), check("agent:a", limit=5)])
+        assert [r.allowed for r in results] == [True, False]
+        results = await acheck_many(leasing, [check("ip:1")])
+        assert results[0].remaining == 99
+
+    @pytest.mark.asyncio
+    async def test_first_fail_keeps_leases_granted_before_denial(self, clock):
+        central = SlidingWindowCounterBackend()
+        central.record_hit("b", 60)
+        leasing = LeasingBackend(central, lease_fraction=0.5)
+        results = await acheck_many(
+            leasing, [check("a"), check("b", limit=1)], all_or_nothing=False
+        )
+        assert [r.allowed for r in results] == [True, False]
+        # One lease of 50 for "a", recorded once and held locally
+        assert central.get_count("a", 60) == 50
+        assert central.get_count("b", 60) == 1
+        for _ in range(49):
+            assert (await acheck_many(leasing, [check("a")]))[0].allowed
+        assert central.get_count("a", 60) == 50
+
+    @pytest.mark.asyncio
+    async def test_first_fail_retries_denied_lease_at_exact_cost(self, clock):
+        central = SlidingWindowCounterBackend()
+        for _ in range(98):
+            central.record_hit("b", 60)
+        leasing = LeasingBackend(central, lease_fraction=0.1)
+        results = await acheck_many(
+            leasing, [check("a"), check("b"), check("c")], all_or_nothing=False
+        )
+        assert [r.allowed for r in results] == [True, True, True]
+        assert [central.get_count(key, 60) for key in "abc"] == [10, 99, 10]
@@ -0,0 +1,146 @@
+"""Tests for sampled, aggregated and queued SUTRA logging."""
+
+import logging
+import threading
+
+import pytest
+
+from samma.sutra import log
+from samma.sutra.log import (
+    EVENT_CLASSES,
+    LogSampler,
+    QueueLogging,
+    RejectionLog,
+    disable_queue_logging,
+    enable_queue_logging,
+)
+from samma.sutra.tls_checker import TLSChecker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(log.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _messages(caplog) -> list[str]:
+    return [record.getMessage() for record in caplog.records]
+
+
+class TestRejectionLog:
+    def test_first_rejection_logged_then_summarized(self, clock, caplog):
+        rejections = RejectionLog(interval_seconds=10)
+        with caplog.at_level(logging.WARNING, logger="samma.sutra"):
+            for _ in range(50):
+                rejections.record("rate limit exceeded", "ip:1", "/api")
+            assert len(caplog.records) == 1
+            clock[0] += 10
+            rejections.record("rate limit exceeded", "ip:2", "/api")
+        assert _messages(caplog) == [
+            "SUTRA rate limit exceeded for ip:1 (/api)",
+            "SUTRA rate limit exceeded for ip:1: 50 requests in the last 10s",
+            "SUTRA rate limit exceeded for ip:2 (/api)",
+        ]
+
+    def test_distinct_keys_are_capped(self, clock, caplog):
+        rejections = RejectionLog(interval_seconds=10, max_keys=3)
+        with caplog.at_level(logging.WARNING, logger="samma.sutra"):
+            for i in range(100):
+                rejections.record("origin denied", f"10.0.0.{i}", "evil")
+            rejections.flush()
+        messages = _messages(caplog)
+        assert len(messages) == 4
+        assert messages[-1] == "SUTRA 97 more rejections from other keys in the last 10s"
+
+    def test_zero_interval_logs_every_rejection(self, caplog):
+        rejections = RejectionLog(interval_seconds=0)
+        with caplog.at_level(logging.WARNING, logger="samma.sutra"):
+            for _ in range(3):
+                rejections.record("origin denied", "10.0.0.1", "evil")
+        assert len(caplog.records) == 3
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+        self.threads.add(threading.get_ident())
+
+
+@pytest.fixture
+def target():
+    target = logging.getLogger("samma.sutra.test_queue")
+    handler = _ListHandler()
+    target.addHandler(handler)
+    target.setLevel(logging.INFO)
+    target.propagate = False
+    yield target, handler
+    target.removeHandler(handler)
+
+
+class TestLogSampler:
+    def test_defaults_to_logging_everything(self):
+        sampler = LogSampler()
+        assert all(sampler(event) for event in EVENT_CLASSES)
+
+    def test_rates(self, monkeypatch):
+        sampler = LogSampler({"allowed": 0.0, "tls": 0.25})
+        assert not sampler("allowed")
+        monkeypatch.setattr(log.random, "random", lambda: 0.2)
+        assert sampler("tls")
+        monkeypatch.setattr(log.random, "random", lambda: 0.3)
+        assert not sampler("tls")
+
+    def test_unknown_class_rejected(self):
+        with pytest.raises(ValueError):
+            LogSampler({"everything": 0.5})
+
+
+class TestQueueLogging:
+    def test_records_written_by_background_thread(self, target):
+        logger, handler = target
+        queued = QueueLogging(logger)
+        queued.start()
+        try:
+            for i in range(5):
+                logger.info("request %d", i)
+        finally:
+            queued.stop()
+        assert handler.messages == [f"request {i}" for i in range(5)]
+        assert threading.get_ident() not in handler.threads
+        # Own handlers are restored once stopped
+        logger.info("inline")
+        assert handler.messages[-1] == "inline"
+
+    def test_full_queue_drops_instead_of_blocking(self, target):
+        logger, handler = target
+        queued = QueueLogging(logger, maxsize=2)
+        # Not started: nothing drains the queue
+        logger.removeHandler(handler)
+        logger.addHandler(queued.handler)
+        try:
+            for i in range(5):
+                logger.info("request %d", i)
+        finally:
+            logger.removeHandler(queued.handler)
+            logger.addHandler(handler)
+        assert queued.dropped == 3
+
+    def test_enable_is_idempotent(self):
+        try:
+            assert enable_queue_logging() is enable_queue_logging()
+        finally:
+            disable_queue_logging()
+
+
+class TestTLSSampling:
+    def test_warnings_sampled(self, caplog):
+        checker = TLSChecker(warn=True, warn_sample_rate=0.0)
+        with caplog.at_level(logging.WARNING, logger="samma.sutra.tls"):
+            checker.check("http", None)
+        assert not caplog.records
@@ -1,6 +1,29 @@
 """Tests for SUTRA middleware — origin, rate limiting, TLS, headers."""
 
+import logging
+
+import httpx
 import pytest
+from fastapi import FastAPI
+from httpx._transports.asgi import ASGITransport
+
+from samma import SammaSuit, SUTRASettings
+from samma.sutra import RouteLimit, log, middleware
+from samma.sutra.middleware import SUTRAMiddleware
+
+
+def make_client(**overrides) -> httpx.AsyncClient:
+    """Client for a bare app with SUTRA configured from the given settings."""
+    options = dict(tls_warn=False, log_requests=False)
+    options.update(overrides)
+    app = FastAPI()
+    SammaSuit(app).activate_sutra(settings=SUTRASettings(**options))
+
+    @app.get("/api/test")
+    async def test_endpoint():
+        return {"message": "ok"}
+
+    return httpx.AsyncClient(transport=ASGITransport(app=app), base_url="http://testserver")
 
 
 class TestOriginValidation:
@@ -44,12 +67,249 @@ class TestRateLimiting:
         assert resp.json()["layer"] == "sutra"
         assert "retry-after" in resp.headers
 
+    @pytest.mark.asyncio
+    async def test_agent_rejection_does_not_consume_ip_quota(self):
+        async with make_client(rate_limit_per_ip=4, rate_limit_per_agent=1) as client:
+            agent = {"x-agent-id": "agent-1"}
+            assert (await client.get("/api/test", headers=agent)).status_code == 200
+            for _ in range(3):
+                assert (await client.get("/api/test", headers=agent)).status_code == 429
+            resp = await client.get("/api/test")
+            assert resp.status_code == 200
+            assert resp.headers["x-ratelimit-remaining"] == "2"
+
     @pytest.mark.asyncio
     async def test_rate_limit_headers_present(self, client):
         resp = await client.get("/api/test")
         assert "x-ratelimit-remaining" in resp.headers
 
 
+class TestRejections:
+    @pytest.mark.asyncio
+    async def test_pre_rendered_bodies_are_json(self):
+        async with make_client(
+            rate_limit_per_ip=1, allowed_origins=["https://ok.example"]
+        ) as client:
+            resp = await client.get("/api/test", headers={"origin": 'https://"evil"'})
+            assert resp.status_code == 403
+            assert resp.json() == {"detail": 'Origin not allowed: https://"evil"', "layer": "sutra"}
+            assert resp.headers["content-type"] == "application/json"
+            await client.get("/api/test")
+            resp = await client.get("/api/test")
+            assert resp.json() == {"detail": "Rate limit exceeded", "layer": "sutra"}
+            assert resp.headers["content-length"] == str(len(resp.content))
+            assert resp.headers["x-samma-layer"] == "sutra"
+
+    @pytest.mark.asyncio
+    async def test_flood_is_logged_once_per_key(self, caplog):
+        async with make_client(rate_limit_per_ip=1) as client:
+            with caplog.at_level(logging.WARNING, logger="samma.sutra"):
+                for _ in range(20):
+                    await client.get("/api/test")
+        assert len([r for r in caplog.records if "rate limit" in r.getMessage()]) == 1
+
+
+class TestLogging:
+    @pytest.mark.asyncio
+    async def test_allowed_requests_sampled_out(self, caplog):
+        async with make_client(log_requests=True, log_sample_rates={"allowed": 0.0}) as client:
+            with caplog.at_level(logging.INFO, logger="samma.sutra"):
+                await client.get("/api/test")
+        assert not [r for r in caplog.records if r.getMessage().startswith("SUTRA GET")]
+
+    @pytest.mark.asyncio
+    async def test_queue_logging(self):
+        try:
+            async with make_client(log_requests=True, log_queue_size=100) as client:
+                assert (await client.get("/api/test")).status_code == 200
+            assert log.enable_queue_logging().dropped == 0
+        finally:
+            log.disable_queue_logging()
+
+
+class TestRetryAfter:
+    @pytest.mark.asyncio
+    async def test_retry_after_from_limiter_state(self):
+        async with make_client(rate_limit_per_ip=2, rate_limit_window_seconds=60) as client:
+            ok = await client.get("/api/test")
+            assert 60 < int(ok.headers["x-ratelimit-reset"]) <= 120
+            await client.get("/api/test")
+            resp = await client.get("/api/test")
+            assert resp.status_code == 429
+            # Two hits in this window: a slot opens as soon as the next one begins
+            assert 0 < int(resp.headers["retry-after"]) <= 60
+            assert resp.headers["x-ratelimit-limit"] == "2"
+            assert "x-ratelimit-reset" in resp.headers
+
+    @pytest.mark.asyncio
+    async def test_jitter(self, monkeypatch):
+        monkeypatch.setattr(middleware.random, "uniform", lambda low, high: high)
+        async with make_client(
+            rate_limit_algorithm="gcra",
+            rate_limit_per_ip=6,
+            rate_limit_burst_per_ip=1,
+            rate_limit_retry_jitter_seconds=5,
+        ) as client:
+            await client.get("/api/test")
+            resp = await client.get("/api/test")
+            assert resp.headers["retry-after"] == "15"
+
+
+class TestSharedBackends:
+    @pytest.mark.asyncio
+    async def test_leased_shared_memory_limit(self, tmp_path):
+        async with make_client(
+            rate_limit_per_ip=4,
+            rate_limit_shm_path=str(tmp_path / "rl"),
+            rate_limit_shm_slots=1024,
+            rate_limit_lease_fraction=0.5,
+        ) as client:
+            statuses = [(await client.get("/api/test")).status_code for _ in range(5)]
+            assert statuses == [200, 200, 200, 200, 429]
+
+
+class TestRouteLimits:
+    @pytest.mark.asyncio
+    async def test_route_cost_spends_more_quota(self):
+        async with make_client(
+            rate_limit_per_ip=10,
+            route_limits=[RouteLimit(path="/api/*", methods=["GET"], cost=4)],
+        ) as client:
+            resp = await client.get("/api/test")
+            assert resp.headers["x-ratelimit-remaining"] == "6"
+            assert (await client.get("/api/test")).status_code == 200
+            assert (await client.get("/api/test")).status_code == 429
+
+    @pytest.mark.asyncio
+    async def test_route_specific_limit(self):
+        async with make_client(
+            rate_limit_per_ip=10,
+            route_limits=[RouteLimit(path="/api/**", per_ip=2)],
+        ) as client:
+            statuses = [(await client.get("/api/test")).status_code for _ in range(3)]
+            assert statuses == [200, 200, 429]
+            assert (await client.get("/api/test")).json()["detail"] == "Route rate limit exceeded"
+
+
+class TestIPAggregation:
+    @pytest.mark.asyncio
+    async def test_ipv6_rotation_within_64_is_limited(self):
+        async with make_client(rate_limit_per_ip=2) as client:
+            statuses = [
+                (await client.get(
+                    "/api/test", headers={"x-forwarded-for": f"2001:db8:0:1::{i:x}"}
+                )).status_code
+                for i in range(3)
+            ]
+            assert statuses == [200, 200, 429]
+            other = await client.get("/api/test", headers={"x-forwarded-for": "2001:db8:0:2::1"})
+            assert other.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_ipv4_prefix(self):
+        async with make_client(rate_limit_per_ip=1, rate_limit_ipv4_prefix=24) as client:
+            first = await client.get("/api/test", headers={"x-forwarded-for": "10.0.0.1"})
+            second = await client.get("/api/test", headers={"x-forwarded-for": "10.0.0.2"})
+            assert (first.status_code, second.status_code) == (200, 429)
+
+
+class TestHierarchicalScopes:
+    @pytest.mark.asyncio
+    async def test_tenant_limit_spans_agents(self):
+        async with make_client(rate_limit_per_agent=5, rate_limit_per_tenant=3) as client:
+            statuses = []
+            for agent in ("a", "b", "c", "d"):
+                headers = {"x-agent-id": agent, "x-tenant-id": "t1"}
+                statuses.append((await client.get("/api/test", headers=headers)).status_code)
+            assert statuses == [200, 200, 200, 429]
+            resp = await client.get("/api/test", headers={"x-agent-id": "e", "x-tenant-id": "t2"})
+            assert resp.status_code == 200
+            assert resp.headers["x-ratelimit-tenant-remaining"] == "2"
+            assert resp.headers["x-ratelimit-agent-remaining"] == "4"
+
+    @pytest.mark.asyncio
+    async def test_tenant_header_is_configurable(self):
+        async with make_client(rate_limit_per_tenant=1, tenant_header="x-org") as client:
+            assert (await client.get("/api/test", headers={"x-org": "o"})).status_code == 200
+            resp = await client.get("/api/test", headers={"x-org": "o"})
+            assert resp.status_code == 429
+            assert resp.json()["detail"] == "Tenant rate limit exceeded"
+
+    @pytest.mark.asyncio
+    async def test_tenant_header_is_per_instance(self):
+        default = make_client(rate_limit_per_tenant=1)
+        # A later middleware with its own tenant header leaves the first one alone
+        async with make_client(rate_limit_per_tenant=1, tenant_header="x-org") as client:
+            assert (await client.get("/api/test", headers={"x-org": "o"})).status_code == 200
+        async with default as client:
+            headers = {"x-tenant-id": "t"}
+            assert (await client.get("/api/test", headers=headers)).status_code == 200
+            assert (await client.get("/api/test", headers=headers)).status_code == 429
+
+    @pytest.mark.asyncio
+    async def test_global_limit(self):
+        async with make_client(rate_limit_global=2, rate_limit_per_ip=10) as client:
+            resp = await client.get("/api/test")
+            assert resp.headers["x-ratelimit-global-remaining"] == "1"
+            await client.get("/api/test")
+            resp = await client.get("/api/test")
+            assert resp.json()["detail"] == "Global rate limit exceeded"
+            assert "x-ratelimit-tenant-remaining" not in resp.headers
+
+
+class TestIPSketch:
+    @pytest.mark.asyncio
+    async def test_sketch_limits_ip(self):
+        async with make_client(rate_limit_per_ip=3, rate_limit_ip_sketch_mb=0.1) as client:
+            statuses = [(await client.get("/api/test")).status_code for _ in range(4)]
+            assert statuses == [200, 200, 200, 429]
+
+    @pytest.mark.asyncio
+    async def test_agent_rejection_returns_ip_units(self):
+        async with make_client(
+            rate_limit_per_ip=3, rate_limit_per_agent=1, rate_limit_ip_sketch_mb=0.1
+        ) as client:
+            headers = {"x-agent-id": "a"}
+            assert (await client.get("/api/test", headers=headers)).status_code == 200
+            assert (await client.get("/api/test", headers=headers)).status_code == 429
+            resp = await client.get("/api/test")
+            assert resp.status_code == 200
+            assert resp.headers["x-ratelimit-remaining"] == "1"
+
+
+class TestGCRA:
+    @pytest.mark.asyncio
+    async def test_burst_and_retry_after(self):
+        async with make_client(
+            rate_limit_algorithm="gcra",
+            rate_limit_per_ip=6,
+            rate_limit_burst_per_ip=2,
+        ) as client:
+            assert (await client.get("/api/test")).status_code == 200
+            assert (await client.get("/api/test")).status_code == 200
+            resp = await client.get("/api/test")
+            assert resp.status_code == 429
+            # One request per 10s sustained: next slot is ~10s away, not the full window
+            assert resp.headers["retry-after"] == "10"
+
+    def test_key_ttl_covers_burst(self):
+        app = FastAPI()
+        settings = SUTRASettings(
+            tls_warn=False,
+            rate_limit_algorithm="gcra",
+            rate_limit_per_ip=2,
+            rate_limit_burst_per_ip=10,
+            rate_limit_window_seconds=60,
+        )
+        assert SUTRAMiddleware(app, settings).key_store.ttl_seconds == 300
+        settings = settings.model_copy(update={"rate_limit_burst_per_ip": None})
+        assert SUTRAMiddleware(app, settings).key_store.ttl_seconds == 120
+
+    def test_gcra_requires_in_memory_backend(self):
+        with pytest.raises(ValueError):
+            make_client(rate_limit_algorithm="gcra", rate_limit_shm_path="/tmp/unused")
+
+
 class TestExcludedPaths:
     @pytest.mark.asyncio
     async def test_health_bypasses_checks(self, client):
@@ -63,8 +323,114 @@ class TestExcludedPaths:
         assert resp.headers.get("x-samma-layer") == "sutra"
 
 
+class TestExcludedPatterns:
+    @pytest.mark.asyncio
+    async def test_prefix_exclusion_skips_rate_limit(self):
+        async with make_client(rate_limit_per_ip=1, excluded_paths=["/api/*"]) as client:
+            for _ in range(3):
+                resp = await client.get("/api/test")
+                assert resp.status_code == 200
+                assert "x-ratelimit-remaining" not in resp.headers
+
+
 class TestResponseHeaders:
     @pytest.mark.asyncio
     async def test_samma_layer_header(self, client):
         resp = await client.get("/api/test")
         assert resp.headers.get("x-samma-layer") == "sutra"
+
+
+def _ws_scope(**headers) -> dict:
+    return {
+        "type": "websocket",
+        "path": "/ws",
+        "scheme": "ws",
+        "headers": [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()],
+        "client": ("10.0.0.1", 1234),
+    }
+
+
+async def _run(asgi, scope, messages=()) -> list[dict]:
+    inbox = list(messages)
+    sent = []
+
+    async def receive():
+        return inbox.pop(0) if inbox else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi(scope, receive, send)
+    return sent
+
+
+class TestASGI:
+    @pytest.mark.asyncio
+    async def test_websocket_accept_gets_headers(self):
+        async def app(scope, receive, send):
+            await send({"type": "websocket.accept"})
+
+        sutra = SUTRAMiddleware(app, SUTRASettings(tls_warn=False, log_requests=False))
+        sent = await _run(sutra, _ws_scope())
+        assert sent[0]["type"] == "websocket.accept"
+        assert (b"x-samma-layer", b"sutra") in sent[0]["headers"]
+
+    @pytest.mark.asyncio
+    async def test_websocket_rejected_by_origin_and_rate_limit(self):
+        async def app(scope, receive, send):
+            await send({"type": "websocket.accept"})
+
+        sutra = SUTRAMiddleware(app, SUTRASettings(
+            allowed_origins=["https://ok.example"],
+            rate_limit_per_ip=1,
+            tls_warn=False,
+            log_requests=False,
+        ))
+        sent = await _run(sutra, _ws_scope(origin="https://evil.example"))
+        assert sent == [{"type": "websocket.close", "code": 1008}]
+        await _run(sutra, _ws_scope())
+        sent = await _run(sutra, _ws_scope())
+        assert sent == [{"type": "websocket.close", "code": 1013}]
+
+    @pytest.mark.asyncio
+    async def test_websocket_denial_response_extension(self):
+        sutra = SUTRAMiddleware(None, SUTRASettings(tls_enforce=True, log_requests=False))
+        scope = _ws_scope()
+        scope["extensions"] = {"websocket.http.response": {}}
+        sent = await _run(sutra, scope)
+        assert sent[0]["type"] == "websocket.http.response.start"
+        assert sent[0]["status"] == 403
+
+    @pytest.mark.asyncio
+    async def test_streamed_body_chunks_pass_through(self):
+        chunks = [b"data: 1\n\n", b"data: 2\n\n", b""]
+
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            for i, chunk in enumerate(chunks):
+                await send({
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": i < len(chunks) - 1,
+                })
+
+        sutra = SUTRAMiddleware(app, SUTRASettings(tls_warn=False, log_requests=False))
+        scope = {
+            "type": "http", "method": "GET", "path": "/stream", "scheme": "http",
+            "headers": [], "client": ("10.0.0.1", 1234),
+        }
+        sent = await _run(sutra, scope)
+        assert (b"x-ratelimit-remaining", b"99") in sent[0]["headers"]
+        assert [m["body"] for m in sent[1:]] == chunks
+        assert all(m["body"] is chunk for m, chunk in zip(sent[1:], chunks))
+
+    @pytest.mark.asyncio
+    async def test_lifespan_passes_through(self):
+        seen = []
+
+        async def app(scope, receive, send):
+            seen.append(scope["type"])
+
+        sutra = SUTRAMiddleware(app, SUTRASettings(log_requests=False))
+        await _run(sutra, {"type": "lifespan"})
+        assert seen == ["lifespan"]
@@ -0,0 +1,76 @@
+"""Tests for the compiled SUTRA origin allowlist."""
+
+import fnmatch
+
+import pytest
+
+from samma.exceptions import OriginDeniedError
+from samma.sutra.origin_validator import OriginValidator
+
+PATTERNS = [
+    "https://onezeroeight.ai",
+    "https://*.sutra.team",
+    "http://*.local.test:8080",
+    "*.bare.example",
+    "https://app-?.example.com",
+    "https://[ab]*.glob.example",
+]
+
+ORIGINS = [
+    "https://onezeroeight.ai",
+    "http://onezeroeight.ai",
+    "https://onezeroeight.ai.evil.com",
+    "https://a.sutra.team",
+    "https://a.b.sutra.team",
+    "https://.sutra.team",
+    "https://sutra.team",
+    "http://a.sutra.team",
+    "https://evil.com/.sutra.team",
+    "https://a.sutra.team.evil.com",
+    "http://dev.local.test:8080",
+    "http://dev.local.test",
+    "https://x.bare.example",
+    "bare.example",
+    "https://app-1.example.com",
+    "https://app-12.example.com",
+    "https://a1.glob.example",
+    "https://c1.glob.example",
+    "",
+]
+
+
+class TestOriginValidator:
+    @pytest.mark.parametrize("origin", ORIGINS)
+    def test_matches_fnmatch(self, origin):
+        validator = OriginValidator(PATTERNS)
+        expected = any(fnmatch.fnmatchcase(origin, pattern) for pattern in PATTERNS)
+        assert validator.is_allowed(origin) is expected
+
+    def test_patterns_are_compiled_by_kind(self):
+        validator = OriginValidator(PATTERNS)
+        assert validator._exact == {"https://onezeroeight.ai"}
+        assert set(validator._suffixes) == {"https://", "http://", ""}
+        assert validator._glob.pattern.count("|") == 1
+
+    def test_allow_all_and_missing_origin(self):
+        assert OriginValidator(["*"]).allow_all
+        assert OriginValidator(["*"]).is_allowed("https://anything.example")
+        assert not OriginValidator([]).allow_all
+        assert OriginValidator([]).is_allowed(None)
+        assert not OriginValidator([]).is_allowed("https://a.example")
+
+    def test_decisions_are_cached(self):
+        validator = OriginValidator(PATTERNS, cache_size=2)
+        for _ in range(3):
+            validator.is_allowed("https://a.sutra.team")
+        info = validator._cached_match.cache_info()
+        assert (info.hits, info.misses) == (2, 1)
+        validator.is_allowed("https://b.sutra.team")
+        validator.is_allowed("https://c.sutra.team")
+        assert validator._cached_match.cache_info().currsize == 2
+
+    def test_validate_raises(self):
+        validator = OriginValidator(PATTERNS)
+        validator.validate("https://a.sutra.team")
+        with pytest.raises(OriginDeniedError):
+            validator.validate("https://evil.com")
@@ -1,7 +1,31 @@
 """Unit tests for the SUTRA sliding window rate limiter."""
 
+import threading
+
 import pytest
-from samma.sutra.rate_limiter import RateLimiter, InMemoryBackend
+from samma.sutra import rate_limiter
+from samma.sutra.gcra import GCRABackend
+from samma.sutra.rate_limiter import (
+    InMemoryBackend,
+    RateLimitCheck,
+    RateLimiter,
+    RateLimitResult,
+    SlidingWindowCounterBackend,
+    StripedBackend,
+    SyncBackendAdapter,
+    acheck_many,
+    check_many,
+    is_async_backend,
+)
+from samma.sutra.types import result_from_window
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable monotonic clock for window arithmetic."""
+    now = [1000.0]
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: now[0])
+    return now
 
 
 class TestInMemoryBackend:
@@ -25,6 +49,128 @@ class TestInMemoryBackend:
         assert backend.get_count("key1", 60) == 1
         assert backend.get_count("key2", 60) == 1
 
+    def test_empty_keys_are_dropped(self, clock):
+        backend = InMemoryBackend()
+        backend.record_hit("key1", 60)
+        clock[0] += 61
+        assert backend.get_count("key1", 60) == 0
+        assert "key1" not in backend.store
+
+
+class TestSlidingWindowCounterBackend:
+    def test_record_hit_increments(self, clock):
+        backend = SlidingWindowCounterBackend()
+        assert backend.record_hit("key1", 60) == 1
+        assert backend.record_hit("key1", 60) == 2
+        assert backend.get_count("key1", 60) == 2
+
+    def test_unknown_key_has_zero_count(self):
+        backend = SlidingWindowCounterBackend()
+        assert backend.get_count("missing", 60) == 0
+        assert "missing" not in backend.store
+
+    def test_previous_window_is_weighted(self, clock):
+        backend = SlidingWindowCounterBackend()
+        clock[0] = 1020.0  # start of window 17
+        for _ in range(10):
+            backend.record_hit("key1", 60)
+        clock[0] = 1095.0  # 15s into window 18 -> 75% of previous overlaps
+        assert backend.get_count("key1", 60) == 7
+        assert backend.record_hit("key1", 60) == 8
+
+    def test_stale_windows_are_dropped(self, clock):
+        backend = SlidingWindowCounterBackend()
+        backend.record_hit("key1", 60)
+        clock[0] += 180
+        assert backend.get_count("key1", 60) == 0
+        assert len(backend.store) == 0
+        assert backend.record_hit("key1", 60) == 1
+
+    def test_fixed_state_per_key(self, clock):
+        backend = SlidingWindowCounterBackend()
+        for _ in range(500):
+            backend.record_hit("key1", 60)
+        assert len(backend.store.get("key1")) == 3
+
+
+class TestRetryAfter:
+    def test_result_from_window_allowed(self):
+        result = result_from_window(1, 0, 10.0, RateLimitCheck("k", 4, 60))
+        assert result == RateLimitResult(True, 2, 0.0, 4, 110.0)
+
+    def test_waits_for_previous_window_to_decay(self):
+        check = RateLimitCheck("k", 4, 60)
+        # 4 hits last window, 1 now, 6s in: floor(4 * 0.9) + 1 + 1 = 5 > 4
+        result = result_from_window(1, 4, 6.0, check)
+        assert not result.allowed
+        # Fits once the previous weight drops below 3, just after 15s in
+        assert result.retry_after == pytest.approx(9.0)
+        assert not result_from_window(1, 4, 14.9, check).allowed
+        assert result_from_window(1, 4, 15.1, check).allowed
+
+    def test_retry_after_accounts_for_truncation(self):
+        # One hit 10s into a window, checked again at 30s; limit 1
+        check = RateLimitCheck("k", 1, 60)
+        result = result_from_window(1, 0, 30.0, check)
+        assert result.retry_after == pytest.approx(30.0)
+        assert not result_from_window(0, 1, 0.0, check).allowed
+        assert result_from_window(0, 1, 0.5, check).allowed
+
+    def test_waits_for_next_window(self, clock):
+        clock[0] = 1200.0  # start of a window
+        backend = SlidingWindowCounterBackend()
+        checks = [("k", 4, 60)]
+        for _ in range(4):
+            check_many(backend, checks)
+        result = check_many(backend, checks)[0]
+        assert result.retry_after == pytest.approx(60.0)
+        assert result.reset_after == pytest.approx(120.0)
+        clock[0] += 59
+        assert not check_many(backend, checks)[0].allowed
+        clock[0] += 1
+        assert not check_many(backend, checks)[0].allowed
+        clock[0] += 0.5
+        assert check_many(backend, checks)[0].allowed
+
+    def test_sliding_log_waits_for_oldest_hit(self, clock):
+        backend = InMemoryBackend()
+        check_many(backend, [("k", 2, 60)])
+        clock[0] += 10
+        check_many(backend, [("k", 2, 60)])
+        clock[0] += 10
+        result = check_many(backend, [("k", 2, 60)])[0]
+        assert result.retry_after == pytest.approx(40.0)
+        assert result.reset_after == pytest.approx(50.0)
+
+    def test_cost_above_limit_waits_full_window(self, clock):
+        result = check_many(SlidingWindowCounterBackend(), [("k", 2, 60, 3)])[0]
+        assert not result.allowed
+        assert result.retry_after == 60.0
+
+    def test_hit_reports_exact_retry_after(self, clock):
+        clock[0] = 1200.0  # start of a window
+        limiter = RateLimiter(1, 60, backend=SlidingWindowCounterBackend())
+        limiter.hit("a")
+        clock[0] += 10
+        assert limiter.hit("a").retry_after == pytest.approx(50.0)
+        limiter = RateLimiter(1, 60)
+        limiter.hit("a")
+        clock[0] += 10
+        assert limiter.hit("a").retry_after == pytest.approx(50.0)
+
+    @pytest.mark.asyncio
+    async def test_ahit_reports_exact_retry_after(self, clock):
+        clock[0] = 1200.0
+        limiter = RateLimiter(1, 60, backend=SlidingWindowCounterBackend())
+        await limiter.ahit("a")
+        clock[0] += 10
+        assert (await limiter.ahit("a")).retry_after == pytest.approx(50.0)
+
+    def test_gcra_reset(self, clock):
+        backend = GCRABackend()
+        result = check_many(backend, [RateLimitCheck("k", 6, 60, burst=2)])[0]
+        assert result.reset_after == pytest.approx(10.0)
+
 
 class TestRateLimiter:
     def test_under_limit_allowed(self):
@@ -61,3 +207,260 @@ class TestRateLimiter:
         limiter.check("client1")
         allowed, _ = limiter.check("client2")
         assert allowed is True
+
+
+class _AsyncBackend:
+    def __init__(self):
+        self._inner = InMemoryBackend()
+
+    async def record_hit(self, key, window_seconds):
+        return self._inner.record_hit(key, window_seconds)
+
+    async def get_count(self, key, window_seconds):
+        return self._inner.get_count(key, window_seconds)
+
+
+class TestAsyncRateLimiter:
+    @pytest.mark.asyncio
+    async def test_acheck_with_sync_backend(self):
+        limiter = RateLimiter(max_requests=2, window_seconds=60)
+        assert await limiter.acheck("client1") == (True, 1)
+        assert await limiter.acheck("client1") == (True, 0)
+        assert await limiter.acheck("client1") == (False, 0)
+        # Sync and async APIs share the same state
+        assert limiter.remaining("client1") == 0
+
+    @pytest.mark.asyncio
+    async def test_acheck_with_async_backend(self):
+        limiter = RateLimiter(max_requests=2, window_seconds=60, backend=_AsyncBackend())
+        await limiter.acheck("client1")
+        assert await limiter.aremaining("client1") == 1
+
+    @pytest.mark.asyncio
+    async def test_acheck_with_cost(self):
+        limiter = RateLimiter(max_requests=10, window_seconds=60, backend=_AsyncBackend())
+        assert await limiter.acheck("client1", cost=4) == (True, 6)
+        assert await limiter.acheck("client1", cost=4) == (True, 2)
+        assert await limiter.acheck("client1", cost=4) == (False, 0)
+
+    def test_check_with_cost(self):
+        limiter = RateLimiter(max_requests=10, window_seconds=60)
+        assert limiter.check("client1", cost=6) == (True, 4)
+        assert limiter.check("client1", cost=6) == (False, 0)
+        assert limiter.limit_for("client1", cost=3).cost == 3
+
+    def test_sync_check_rejects_async_backend(self):
+        limiter = RateLimiter(max_requests=2, window_seconds=60, backend=_AsyncBackend())
+        with pytest.raises(TypeError):
+            limiter.check("client1")
+
+    def test_is_async_backend(self):
+        assert is_async_backend(_AsyncBackend()) is True
+        assert is_async_backend(InMemoryBackend()) is False
+        assert is_async_backend(SyncBackendAdapter(InMemoryBackend())) is True
+
+    @pytest.mark.asyncio
+    async def test_adapter_offloads_to_thread(self):
+        adapter = SyncBackendAdapter(InMemoryBackend(), offload=True)
+        assert await adapter.record_hit("key1", 60) == 1
+        assert await adapter.get_count("key1", 60) == 1
+
+
+class TestGCRA:
+    def test_burst_then_paced(self, clock):
+        # 60 req/60s sustained (one per second), bursts of up to 3
+        limiter = RateLimiter(max_requests=60, window_seconds=60, algorithm="gcra", burst=3)
+        assert [limiter.check("a") for _ in range(3)] == [(True, 2), (True, 1), (True, 0)]
+        result = limiter.hit("a")
+        assert result.allowed is False
+        assert result.retry_after == pytest.approx(1.0)
+        clock[0] += 1.0
+        assert limiter.check("a") == (True, 0)
+
+    def test_exact_retry_after(self, clock):
+        limiter = RateLimiter(max_requests=2, window_seconds=60, algorithm="gcra", burst=1)
+        limiter.check("a")
+        clock[0] += 10
+        result = limiter.hit("a")
+        assert result == RateLimitResult(False, 0, pytest.approx(20.0), 1)
+
+    def test_denied_requests_do_not_consume(self, clock):
+        limiter = RateLimiter(max_requests=1, window_seconds=10, algorithm="gcra")
+        limiter.check("a")
+        for _ in range(5):
+            assert limiter.check("a") == (False, 0)
+        clock[0] += 10
+        assert limiter.check("a") == (True, 0)
+
+    def test_remaining_refills(self, clock):
+        limiter = RateLimiter(max_requests=10, window_seconds=10, algorithm="gcra", burst=5)
+        for _ in range(5):
+            limiter.check("a")
+        assert limiter.remaining("a") == 0
+        clock[0] += 2
+        assert limiter.remaining("a") == 2
+
+    def test_one_float_per_key(self, clock):
+        backend = GCRABackend()
+        limiter = RateLimiter(max_requests=100, window_seconds=60, backend=backend, algorithm="gcra")
+        for _ in range(50):
+            limiter.check("a")
+        assert isinstance(backend.store.get("a"), float)
+
+    @pytest.mark.asyncio
+    async def test_async_api(self):
+        limiter = RateLimiter(max_requests=60, window_seconds=60, algorithm="gcra", burst=1)
+        assert await limiter.acheck("a") == (True, 0)
+        assert (await limiter.ahit("a")).allowed is False
+        assert await limiter.aremaining("a") == 0
+
+    def test_unknown_algorithm(self):
+        with pytest.raises(ValueError):
+            RateLimiter(max_requests=1, window_seconds=1, algorithm="leaky")
+
+
+class _CountOnlyBackend:
+    """Backend without a native check_many, to exercise the fallback."""
+
+    def __init__(self):
+        self._inner = InMemoryBackend()
+
+    def record_hit(self, key, window_seconds):
+        return self._inner.record_hit(key, window_seconds)
+
+    def get_count(self, key, window_seconds):
+        return self._inner.get_count(key, window_seconds)
+
+
+@pytest.fixture(
+    params=[InMemoryBackend, SlidingWindowCounterBackend, StripedBackend, _CountOnlyBackend]
+)
+def any_backend(request):
+    return request.param()
+
+
+class TestCheckMany:
+    def test_all_pass_records_every_key(self, any_backend):
+        results = check_many(any_backend, [("ip:1", 5, 60), ("agent:a", 2, 60)])
+        assert [(r.allowed, r.remaining) for r in results] == [(True, 4), (True, 1)]
+        assert any_backend.get_count("ip:1", 60) == 1
+        assert any_backend.get_count("agent:a", 60) == 1
+
+    def test_all_or_nothing_records_nothing_on_failure(self, any_backend):
+        any_backend.record_hit("agent:a", 60)
+        results = check_many(any_backend, [("ip:1", 5, 60), ("agent:a", 1, 60)])
+        assert [r.allowed for r in results] == [True, False]
+        assert any_backend.get_count("ip:1", 60) == 0
+        assert any_backend.get_count("agent:a", 60) == 1
+
+    def test_first_fail_records_prefix_and_stops(self, any_backend):
+        any_backend.record_hit("b", 60)
+        results = check_many(
+            any_backend,
+            [("a", 5, 60), ("b", 1, 60), ("c", 5, 60)],
+            all_or_nothing=False,
+        )
+        assert [r.allowed for r in results] == [True, False]
+        assert any_backend.get_count("a", 60) == 1
+        assert any_backend.get_count("c", 60) == 0
+
+    def test_cost_spends_and_returns_units(self, any_backend):
+        if isinstance(any_backend, _CountOnlyBackend):
+            pytest.skip("fallback cannot return units")
+        results = check_many(any_backend, [RateLimitCheck("a", 10, 60, cost=4)])
+        assert results[0].remaining == 6
+        assert check_many(any_backend, [RateLimitCheck("a", 10, 60, cost=7)])[0].allowed is False
+        check_many(any_backend, [RateLimitCheck("a", 10, 60, cost=-3)])
+        assert any_backend.get_count("a", 60) == 1
+
+    def test_gcra_batch(self):
+        backend = GCRABackend()
+        checks = [
+            RateLimitCheck("ip:1", 60, 60, burst=1),
+            RateLimitCheck("agent:a", 60, 60, burst=2),
+        ]
+        assert [r.allowed for r in check_many(backend, checks)] == [True, True]
+        results = check_many(backend, checks)
+        assert [r.allowed for r in results] == [False, True]
+        assert results[0].retry_after == pytest.approx(1.0, abs=0.1)
+        # The agent check passed but was not recorded
+        assert [r.remaining for r in check_many(backend, [checks[1]])] == [0]
+
+    @pytest.mark.asyncio
+    async def test_acheck_many_sync_and_async(self, any_backend):
+        results = await acheck_many(any_backend, [("ip:1", 1, 60)])
+        assert results[0].allowed is True
+        results = await acheck_many(_AsyncBackend(), [("ip:1", 1, 60), ("ip:2", 1, 60)])
+        assert [r.allowed for r in results] == [True, True]
+
+    def test_limit_for(self):
+        limiter = RateLimiter(max_requests=10, window_seconds=30)
+        assert limiter.limit_for("k") == RateLimitCheck("k", 10, 30)
+        gcra = RateLimiter(max_requests=10, window_seconds=30, algorithm="gcra", burst=3)
+        assert gcra.limit_for("k").burst == 3
+
+
+def _hammer(backend, keys, hits_per_thread, threads=32):
+    barrier = threading.Barrier(threads)
+
+    def worker(n):
+        barrier.wait()
+        for i in range(hits_per_thread):
+            backend.record_hit(keys[(n + i) % len(keys)], 3600)
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+
+
+class TestStripedBackend:
+    @pytest.mark.parametrize("factory", [InMemoryBackend, SlidingWindowCounterBackend])
+    def test_no_hits_lost_under_32_threads(self, factory):
+        backend = StripedBackend(factory, stripes=8)
+        keys = [f"agent:{i}" for i in range(8)]
+        hits = 100 if factory is InMemoryBackend else 2000
+        _hammer(backend, keys, hits)
+        assert sum(backend.get_count(key, 3600) for key in keys) == 32 * hits
+
+    def test_single_hot_key_under_32_threads(self):
+        backend = StripedBackend(stripes=4)
+        _hammer(backend, ["ip:hot"], 1000)
+        assert backend.get_count("ip:hot", 3600) == 32_000
+
+    def test_concurrent_batches_are_atomic(self):
+        backend = StripedBackend(stripes=4)
+        allowed = []
+        barrier = threading.Barrier(32)
+
+        def worker():
+            barrier.wait()
+            for _ in range(20):
+                results = check_many(backend, [("ip:1", 100, 3600), ("agent:a", 150, 3600)])
+                allowed.append(all(r.allowed for r in results))
+
+        pool = [threading.Thread(target=worker) for _ in range(32)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        assert sum(allowed) == 100
+        assert backend.get_count("ip:1", 3600) == 100
+        assert backend.get_count("agent:a", 3600) == 100
+
+    def test_failed_batch_rolls_back_other_stripes(self):
+        backend = StripedBackend(stripes=64)
+        keys = [f"k{i}" for i in range(10)]
+        backend.record_hit("full", 60)
+        results = check_many(backend, [(key, 5, 60) for key in keys] + [("full", 1, 60)])
+        assert results[-1].allowed is False
+        assert all(backend.get_count(key, 60) == 0 for key in keys)
+
+    def test_stats_and_sweep(self):
+        backend = StripedBackend(stripes=4, ttl_seconds=0.0)
+        for i in range(10):
+            backend.record_hit(f"k{i}", 60)
+        assert backend.stats()["keys"] <= 10
+        backend.sweep()
+        assert backend.stats()["keys"] == 0
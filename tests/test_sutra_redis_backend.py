@@ -0,0 +1,109 @@
+"""Tests for the Redis rate limiter backend (run against fakeredis)."""
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from samma.sutra.rate_limiter import RateLimiter, RateLimitCheck
+from samma.sutra.redis_backend import AsyncRedisBackend, RedisBackend
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis()
+
+
+class TestRedisBackend:
+    def test_record_hit_increments(self, redis_client):
+        backend = RedisBackend(redis_client)
+        assert backend.record_hit("key1", 60) == 1
+        assert backend.record_hit("key1", 60) == 2
+        assert backend.get_count("key1", 60) == 2
+
+    def test_get_count_does_not_record(self, redis_client):
+        backend = RedisBackend(redis_client)
+        assert backend.get_count("key1", 60) == 0
+        assert backend.get_count("key1", 60) == 0
+        assert redis_client.exists("samma:rl:key1") == 0
+
+    def test_keys_are_prefixed_and_expire(self, redis_client):
+        backend = RedisBackend(redis_client, prefix="test:")
+        backend.record_hit("key1", 60)
+        assert redis_client.exists("test:key1") == 1
+        assert 0 < redis_client.ttl("test:key1") <= 120
+
+    def test_record_hits_batches_keys(self, redis_client):
+        backend = RedisBackend(redis_client)
+        backend.record_hit("ip:1.2.3.4", 60)
+        counts = backend.record_hits([("ip:1.2.3.4", 60), ("agent:a1", 60)])
+        assert counts == [2, 1]
+        assert backend.record_hits([]) == []
+
+    def test_state_is_shared_between_instances(self, redis_client):
+        worker_a = RateLimiter(max_requests=3, window_seconds=60, backend=RedisBackend(redis_client))
+        worker_b = RateLimiter(max_requests=3, window_seconds=60, backend=RedisBackend(redis_client))
+        worker_a.check("client1")
+        worker_b.check("client1")
+        worker_a.check("client1")
+        allowed, remaining = worker_b.check("client1")
+        assert allowed is False
+        assert remaining == 0
+
+
+class TestRedisCheckMany:
+    def test_all_or_nothing(self, redis_client):
+        backend = RedisBackend(redis_client)
+        backend.record_hit("agent:a", 60)
+        results = backend.check_many(
+            [RateLimitCheck("ip:1", 5, 60), RateLimitCheck("agent:a", 1, 60)]
+        )
+        assert [(r.allowed, r.remaining) for r in results] == [(True, 4), (False, 0)]
+        assert backend.get_count("ip:1", 60) == 0
+        assert backend.get_count("agent:a", 60) == 1
+
+    def test_exact_retry_after(self, redis_client):
+        backend = RedisBackend(redis_client)
+        window = 1_000_000
+        checks = [RateLimitCheck("agent:a", 2, window)]
+        backend.check_many(checks)
+        backend.check_many(checks)
+        result = backend.check_many(checks)[0]
+        assert window / 2 < result.retry_after <= 1.5 * window
+        assert 0 < result.reset_after <= 2 * window
+
+    def test_first_fail(self, redis_client):
+        backend = RedisBackend(redis_client)
+        backend.record_hit("b", 60)
+        results = backend.check_many(
+            [RateLimitCheck("a", 5, 60), RateLimitCheck("b", 1, 60), RateLimitCheck("c", 5, 60)],
+            all_or_nothing=False,
+        )
+        assert [r.allowed for r in results] == [True, False]
+        assert backend.get_count("a", 60) == 1
+        assert backend.get_count("c", 60) == 0
+
+    @pytest.mark.asyncio
+    async def test_async_check_many(self):
+        backend = AsyncRedisBackend(fakeredis.FakeAsyncRedis())
+        agent = RateLimitCheck("agent:a", 1, 60)
+        results = await backend.check_many([RateLimitCheck("ip:1", 1, 60), agent])
+        assert [r.allowed for r in results] == [True, True]
+        results = await backend.check_many([RateLimitCheck("ip:2", 1, 60), agent])
+        assert [r.allowed for r in results] == [True, False]
+        assert await backend.get_count("ip:2", 60) == 0
+
+
+class TestAsyncRedisBackend:
+    @pytest.mark.asyncio
+    async def test_acheck_against_async_client(self):
+        backend = AsyncRedisBackend(fakeredis.FakeAsyncRedis())
+        limiter = RateLimiter(max_requests=2, window_seconds=60, backend=backend)
+        assert await limiter.acheck("client1") == (True, 1)
+        assert await limiter.acheck("client1") == (True, 0)
+        assert await limiter.acheck("client1") == (False, 0)
+        assert await limiter.aremaining("client1") == 0
+
+    @pytest.mark.asyncio
+    async def test_record_hits_batches_keys(self):
+        backend = AsyncRedisBackend(fakeredis.FakeAsyncRedis())
+        assert await backend.record_hits([("ip:1.2.3.4", 60), ("agent:a1", 60)]) == [1, 1]
@@ -0,0 +1,78 @@
+"""Tests for per-route rate limit rule matching."""
+
+import re
+
+import pytest
+
+from samma.sutra.config import RouteLimit
+from samma.sutra.routes import PathMatcher, RouteMatcher, glob_to_regex
+
+
+class TestGlobToRegex:
+    @pytest.mark.parametrize(
+        "pattern,path,matches",
+        [
+            ("/api/*", "/api/status", True),
+            ("/api/*", "/api/llm/complete", False),
+            ("/api/**", "/api/llm/complete", True),
+            ("/api/v?/items", "/api/v2/items", True),
+            ("/api/v1.0/*", "/api/v1x0/a", False),
+        ],
+    )
+    def test_translation(self, pattern, path, matches):
+        assert (re.fullmatch(glob_to_regex(pattern), path) is not None) is matches
+
+
+class TestRouteMatcher:
+    def test_first_matching_rule_wins(self):
+        matcher = RouteMatcher([
+            RouteLimit(path="/api/llm/**", cost=10),
+            RouteLimit(path="/api/**", cost=2),
+        ])
+        assert matcher.match("POST", "/api/llm/complete")[0] == 0
+        assert matcher.match("GET", "/api/status")[0] == 1
+        assert matcher.match("GET", "/health") is None
+
+    def test_method_filter_falls_through(self):
+        matcher = RouteMatcher([
+            RouteLimit(path="/api/llm/**", methods=["post"], cost=10),
+            RouteLimit(path="/api/**"),
+        ])
+        assert matcher.match("POST", "/api/llm/complete")[1].cost == 10
+        assert matcher.match("GET", "/api/llm/complete")[0] == 1
+        assert matcher.match("BREW", "/api/llm/complete")[0] == 1
+
+    def test_method_only_rules(self):
+        matcher = RouteMatcher([RouteLimit(path="/**", methods=["DELETE"])])
+        assert matcher.match("DELETE", "/x") is not None
+        assert matcher.match("GET", "/x") is None
+
+    def test_no_rules(self):
+        assert RouteMatcher([]).match("GET", "/") is None
+
+
+class TestPathMatcher:
+    def test_exact(self):
+        matcher = PathMatcher(["/health", "/"])
+        assert matcher.matches("/health")
+        assert matcher.matches("/")
+        assert not matcher.matches("/health/live")
+        assert not matcher.matches("/api")
+
+    def test_prefix(self):
+        matcher = PathMatcher(["/static/*", "/health*"])
+        assert matcher.matches("/static/css/site.css")
+        assert matcher.matches("/static/")
+        assert matcher.matches("/health")
+        assert matcher.matches("/health/live")
+        assert not matcher.matches("/stat")
+        assert not matcher.matches("/api/static/x")
+
+    def test_glob(self):
+        matcher = PathMatcher(["/api/*/health", "/v?/ping"])
+        assert matcher.matches("/api/users/health")
+        assert not matcher.matches("/api/users/x/health")
+        assert matcher.matches("/v1/ping")
+
+    def test_empty(self):
+        assert not PathMatcher([]).matches("/")
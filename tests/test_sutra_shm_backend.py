@@ -0,0 +1,85 @@
+"""Tests for the shared-memory rate limiter backend."""
+
+import multiprocessing
+import sys
+
+import pytest
+
+from samma.sutra.rate_limiter import RateLimiter, check_many
+from samma.sutra.shm_backend import SharedMemoryBackend
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="requires fcntl")
+
+
+@pytest.fixture
+def shm_path(tmp_path):
+    return str(tmp_path / "samma-rl")
+
+
+def _hammer(path, hits):
+    backend = SharedMemoryBackend(path, slots=1024, stripes=16)
+    for _ in range(hits):
+        backend.record_hit("agent:shared", 1_000_000)
+    backend.close()
+
+
+class TestSharedMemoryBackend:
+    def test_record_hit_increments(self, shm_path):
+        backend = SharedMemoryBackend(shm_path, slots=1024, stripes=16)
+        assert backend.record_hit("key1", 60) == 1
+        assert backend.record_hit("key1", 60) == 2
+        assert backend.get_count("key1", 60) == 2
+        assert backend.get_count("key2", 60) == 0
+
+    def test_state_is_shared_through_the_file(self, shm_path):
+        a = RateLimiter(3, 60, backend=SharedMemoryBackend(shm_path, slots=1024, stripes=16))
+        b = RateLimiter(3, 60, backend=SharedMemoryBackend(shm_path, slots=1024, stripes=16))
+        a.check("client1")
+        b.check("client1")
+        a.check("client1")
+        assert b.check("client1") == (False, 0)
+
+    def test_check_many_all_or_nothing(self, shm_path):
+        backend = SharedMemoryBackend(shm_path, slots=64, stripes=4)
+        backend.record_hit("agent:a", 60)
+        results = check_many(backend, [("ip:1", 5, 60), ("agent:a", 1, 60)])
+        assert [r.allowed for r in results] == [True, False]
+        assert backend.get_count("ip:1", 60) == 0
+        # Distinct new keys in one batch each get their own slot
+        checks = [(f"ip:{i}", 5, 60) for i in range(20)]
+        assert all(r.allowed for r in check_many(backend, checks))
+        assert [backend.get_count(f"ip:{i}", 60) for i in range(20)] == [1] * 20
+
+    def test_exact_retry_after(self, shm_path):
+        backend = SharedMemoryBackend(shm_path, slots=64, stripes=4)
+        window = 1_000_000
+        checks = [("agent:a", 2, window)]
+        check_many(backend, checks)
+        check_many(backend, checks)
+        result = check_many(backend, checks)[0]
+        # Two hits this window: wait for the next one, then half of it
+        assert window / 2 < result.retry_after <= 1.5 * window
+        assert result.retry_after != window
+        backend.close()
+
+    def test_size_mismatch_rejected(self, shm_path):
+        SharedMemoryBackend(shm_path, slots=1024, stripes=16)
+        with pytest.raises(ValueError):
+            SharedMemoryBackend(shm_path, slots=2048, stripes=16)
+
+    def test_full_table_evicts_instead_of_growing(self, shm_path):
+        backend = SharedMemoryBackend(shm_path, slots=64, stripes=4)
+        for i in range(1000):
+            assert backend.record_hit(f"ip:{i}", 60) == 1
+        assert backend.record_hit("ip:999", 60) == 2
+
+    def test_exact_count_across_processes(self, shm_path):
+        ctx = multiprocessing.get_context("fork")
+        SharedMemoryBackend(shm_path, slots=1024, stripes=16).close()
+        procs = [ctx.Process(target=_hammer, args=(shm_path, 250)) for _ in range(4)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        backend = SharedMemoryBackend(shm_path, slots=1024, stripes=16)
+        assert backend.get_count("agent:shared", 1_000_000) == 1000
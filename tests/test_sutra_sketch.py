@@ -0,0 +1,70 @@
+"""Tests for the count-min sketch rate limiter backend."""
+
+import pytest
+
+from samma.sutra import sketch
+from samma.sutra.rate_limiter import check_many
+from samma.sutra.sketch import SketchBackend
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1200.0]  # start of a 60s window
+    monkeypatch.setattr(sketch.time, "monotonic", lambda: now[0])
+    return now
+
+
+class TestSketchBackend:
+    def test_memory_is_fixed(self, clock):
+        backend = SketchBackend(memory_mb=0.25, depth=4)
+        for i in range(20_000):
+            backend.record_hit(f"ip:{i}", 60)
+        stats = backend.stats()
+        assert stats["sketch_bytes"] == 2 * backend.width * 4 * 4
+        assert stats["sketch_bytes"] <= 0.25 * 2**20
+
+    def test_counts_without_collisions_are_exact(self, clock):
+        backend = SketchBackend(memory_mb=1)
+        for _ in range(5):
+            backend.record_hit("ip:a", 60)
+        assert backend.get_count("ip:a", 60) == 5
+        assert backend.get_count("ip:b", 60) == 0
+
+    def test_never_undercounts_when_saturated(self, clock):
+        backend = SketchBackend(memory_mb=0.001, depth=2)
+        for i in range(500):
+            for _ in range(i % 3 + 1):
+                backend.record_hit(f"ip:{i}", 60)
+        assert all(backend.get_count(f"ip:{i}", 60) >= i % 3 + 1 for i in range(500))
+
+    def test_limits_and_promotes_heavy_hitter(self, clock):
+        backend = SketchBackend(memory_mb=1, top_k=8)
+        results = [check_many(backend, [("ip:flood", 10, 60)])[0] for _ in range(11)]
+        assert [r.allowed for r in results] == [True] * 10 + [False]
+        assert results[9].remaining == 0
+        assert "ip:flood" in backend.heavy
+        assert backend.get_count("ip:flood", 60) == 10
+
+    def test_top_k_is_bounded(self, clock):
+        backend = SketchBackend(memory_mb=1, top_k=4)
+        for i in range(50):
+            for _ in range(6):
+                check_many(backend, [(f"ip:{i}", 10, 60)])
+        assert backend.stats()["heavy_hitters"] == 4
+        # Evicted heavy hitters fall back to the sketch
+        assert backend.get_count("ip:0", 60) >= 5
+
+    def test_window_decay(self, clock):
+        backend = SketchBackend(memory_mb=1)
+        for _ in range(10):
+            backend.record_hit("ip:a", 60)
+        clock[0] += 90  # halfway into the next window
+        assert backend.get_count("ip:a", 60) == 5
+        clock[0] += 60
+        assert backend.get_count("ip:a", 60) == 0
+
+    def test_negative_cost_returns_units(self, clock):
+        backend = SketchBackend(memory_mb=1)
+        check_many(backend, [("ip:a", 100, 60, 3)])
+        check_many(backend, [("ip:a", 100, 60, -3)])
+        assert backend.get_count("ip:a", 60) == 0
@@ -0,0 +1,152 @@
+"""Tests for SUTRA stage tracing and latency histograms."""
+
+import pytest
+
+from samma.sutra.tracing import STAGES, LatencyHistogram, PipelineTracer
+
+
+class FakeSpan:
+    def __init__(self, tracer, name, start_time):
+        self.tracer = tracer
+        self.name = name
+        self.start_time = start_time
+
+    def end(self, end_time=None):
+        self.tracer.spans.append((self.name, self.start_time, end_time))
+
+
+class FakeTracer:
+    def __init__(self):
+        self.spans = []
+
+    def start_span(self, name, start_time=None):
+        return FakeSpan(self, name, start_time)
+
+
+class TestLatencyHistogram:
+    def test_small_values_are_exact(self):
+        histogram = LatencyHistogram()
+        for micros in range(1, 101):
+            histogram.record(micros)
+        assert histogram.percentile(50) == 50
+        assert histogram.percentile(99) == 99
+        assert histogram.percentile(100) == 100
+
+    def test_large_values_within_precision(self):
+        histogram = LatencyHistogram()
+        for micros in (1_234, 56_789, 2_500_000):
+            histogram.record(micros)
+        for percent, expected in ((33, 1_234), (66, 56_789), (100, 2_500_000)):
+            value = histogram.percentile(percent)
+            assert expected <= value <= expected * 1.02
+
+    def test_buckets_never_understate(self):
+        histogram = LatencyHistogram()
+        for micros in range(0, 1_000_000, 997):
+            assert histogram._highest(histogram._index(micros)) >= micros
+            assert histogram._highest(histogram._index(micros)) <= micros * 1.02 + 1
+
+    def test_clamped_to_max(self):
+        histogram = LatencyHistogram(max_seconds=1.0)
+        histogram.record(5_000_000)
+        assert histogram.max == 1_000_000
+        assert histogram.percentile(100) == 1_000_000
+
+    def test_summary_and_reset(self):
+        histogram = LatencyHistogram()
+        histogram.record(1000)
+        histogram.record(3000)
+        summary = histogram.summary()
+        assert summary["count"] == 2
+        assert summary["mean_ms"] == 2.0
+        assert summary["max_ms"] == 3.0
+        histogram.reset()
+        assert histogram.summary()["count"] == 0
+        assert histogram.percentile(99) == 0
+
+
+class TestPipelineTracer:
+    def test_unsampled_requests_get_no_trace(self):
+        assert PipelineTracer(sample_rate=0.0).begin() is None
+        assert PipelineTracer(sample_rate=1.0).begin() is not None
+
+    def test_invalid_sample_rate(self):
+        with pytest.raises(ValueError):
+            PipelineTracer(sample_rate=1.5)
+
+    def test_marks_feed_histograms_and_spans(self):
+        tracer = FakeTracer()
+        pipeline = PipelineTracer(tracer=tracer)
+        trace = pipeline.begin()
+        trace.mark("headers")
+        trace.mark("tls")
+        trace.end()
+        assert set(pipeline.summary()) == {"headers", "tls", "total"}
+        names = [name for name, _, _ in tracer.spans]
+        assert names == ["sutra.headers", "sutra.tls", "sutra.total"]
+        for _, start, end in tracer.spans:
+            assert end >= start > 0
+
+    def test_spans_without_histograms(self):
+        tracer = FakeTracer()
+        pipeline = PipelineTracer(tracer=tracer, histograms=False)
+        pipeline.begin().end()
+        assert pipeline.summary() == {}
+        assert len(tracer.spans) == 1
+
+
+class TestMiddlewareTracing:
+    @pytest.mark.asyncio
+    async def test_disabled_by_default(self, sutra_app, sutra_client):
+        app, suit = sutra_app()
+        async with sutra_client(app) as client:
+            assert (await client.get("/api/test")).status_code == 200
+        assert suit._sutra_tracing is None
+        assert "sutra_latency" not in suit.status()
+
+    @pytest.mark.asyncio
+    async def test_status_reports_stage_latencies(self, sutra_app, sutra_client):
+        app, suit = sutra_app(trace_latency_histograms=True)
+        async with sutra_client(app) as client:
+            for _ in range(3):
+                assert (await client.get("/api/test")).status_code == 200
+        latency = suit.status()["sutra_latency"]
+        assert set(latency) == set(STAGES) - {"concurrency"}
+        assert latency["total"]["count"] == 3
+        assert latency["total"]["p99_ms"] >= latency["app"]["p50_ms"]
+
+    @pytest.mark.asyncio
+    async def test_rejections_are_timed(self, sutra_app, sutra_client):
+        app, suit = sutra_app(
+            trace_latency_histograms=True, allowed_origins=["https://ok.example"]
+        )
+        async with sutra_client(app) as client:
+            resp = await client.get("/api/test", headers={"origin": "https://evil.example"})
+        assert resp.status_code == 403
+        latency = suit.status()["sutra_latency"]
+        assert latency["total"]["count"] == 1
+        assert "app" not in latency
+
+    @pytest.mark.asyncio
+    async def test_tracer_receives_stage_spans(self, sutra_app, sutra_client):
+        tracer = FakeTracer()
+        app, suit = sutra_app(tracer=tracer)
+        async with sutra_client(app) as client:
+            assert (await client.get("/api/test")).status_code == 200
+        names = [name for name, _, _ in tracer.spans]
+        assert names == [f"sutra.{stage}" for stage in STAGES if stage != "concurrency"]
+        assert "sutra_latency" not in suit.status()
+
+    @pytest.mark.asyncio
+    async def test_concurrency_stage(self, sutra_app, sutra_client):
+        app, suit = sutra_app(trace_latency_histograms=True, concurrency_limit=10)
+        async with sutra_client(app) as client:
+            assert (await client.get("/api/test")).status_code == 200
+        assert set(suit.status()["sutra_latency"]) == set(STAGES)
+
+    @pytest.mark.asyncio
+    async def test_head_sampling(self, sutra_app, sutra_client):
+        app, suit = sutra_app(trace_latency_histograms=True, trace_sample_rate=0.0)
+        async with sutra_client(app) as client:
+            assert (await client.get("/api/test")).status_code == 200
+        assert suit.status()["sutra_latency"] == {}